@@ -1,12 +1,43 @@
-from flask import Flask, request, jsonify
+import time
+
+# 记录模块导入开始时间，用于冷启动耗时统计
+_import_started = time.perf_counter()
+
+from flask import Flask, g, has_request_context, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event, exc, func, case, delete, insert, select, update
+from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 import os
 import base64
+import hashlib
+import hmac
 import re
+import logging
 import secrets
+import threading
+
+from compression import CompressionMiddleware
+from db_engine import (database_uri, engine_options, install_sqlite_pragmas, install_write_lock, is_sqlite_file,
+                       pool_status)
+from health import cache_stats, liveness, readiness, register_reporter
+from json_provider import FastJSONProvider
+from log_config import configure_logging, logging_status, summarize_values
+from metrics import install_request_metrics, registry as metrics_registry
+from profiling import install_profiler
+from migrations import applied_versions, latest_version, run_migrations
+from search_index import PinyinIndex, PrefixIndex
+from snapshot import SnapshotManager
+from sql_monitor import install_sql_monitor, slow_query_log
+from table_versions import create_table_versions
+from traffic_recorder import install_traffic_recorder
+
+# 日志经队列由后台线程写出，请求线程不等待输出；级别和格式见 log_config.py
+configure_logging()
+# 直接运行 app.py 时 __name__ 为 __main__，固定使用 app 作为日志器名称，便于 LOG_LEVELS 按模块设置
+logger = logging.getLogger('app')
 
 # 获取当前目录
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -15,15 +46,68 @@ app = Flask(__name__,
             template_folder=current_dir,
             static_folder=current_dir
             )
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+# JSON 编解码：优先使用 orjson，datetime 直接编码为 ISO 8601 字符串
+app.json = FastJSONProvider(app)
+# 默认内存数据库；设置 DB_MODE=file 使用持久化的 SQLite 文件（DB_PATH 指定路径），
+# 或通过 DATABASE_URL 连接其他数据库；连接池参数见 db_engine.engine_options
+app.config['SQLALCHEMY_DATABASE_URI'] = database_uri(current_dir)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = 'your-secret-key-2024'
 
 # 启用CORS
 CORS(app)
 
+# 请求指标：每个路由的耗时直方图、状态码计数、进行中请求数，见 /api/metrics
+install_request_metrics(app)
+
+# 按请求的性能剖析：X-Profile 签名请求头或 PROFILE_SAMPLE_RATE 抽样触发，见 profiling.py
+install_profiler(app)
+
+# /api/* 响应压缩：小于 COMPRESS_MIN_SIZE 字节的响应不压缩
+app.wsgi_app = CompressionMiddleware(
+    app.wsgi_app,
+    min_size=int(os.environ.get('COMPRESS_MIN_SIZE', '1024')),
+    gzip_level=int(os.environ.get('COMPRESS_LEVEL', '6')),
+    brotli_quality=int(os.environ.get('COMPRESS_BROTLI_QUALITY', '4'))
+)
+
+# 流量录制：设置 TRAFFIC_RECORD_DIR 后把匿名化的 /api/* 请求写入文件，供 benchmarks/replay.py 回放
+# 放在最外层，记录的耗时和响应大小包含压缩
+traffic_recorder = install_traffic_recorder(app)
+
 db = SQLAlchemy(app)
 
+with app.app_context():
+    # SQLite 文件数据库：WAL、synchronous=NORMAL、mmap、busy_timeout
+    install_sqlite_pragmas(db.engine)
+    # 每个请求的 SQL 语句数、数据库耗时和疑似 N+1 查询，见 sql_monitor.py
+    install_sql_monitor(app, db.engine)
+    shared_db_path = db.engine.url.database if is_sqlite_file(db.engine.url) else None
+    is_memory_db = db.engine.url.get_backend_name() == 'sqlite' and not shared_db_path
+    # 数据库服务器（DATABASE_URL）可能被多个 worker 连接，数据表版本号存放在数据库中
+    version_store_engine = db.engine if db.engine.url.get_backend_name() != 'sqlite' else None
+
+# 内存数据库快照：设置 SNAPSHOT_DIR 后启用，定期备份到文件，启动时从最新快照恢复
+# 快照按进程进行，内存模式下请只运行一个 worker；多 worker 请改用 DB_MODE=file
+# 所有会话共用一个连接，写事务锁保证快照中只有已提交的数据
+snapshot_manager = None
+memory_write_lock = None
+if is_memory_db and os.environ.get('SNAPSHOT_DIR'):
+    snapshot_manager = SnapshotManager(
+        os.environ['SNAPSHOT_DIR'],
+        interval=float(os.environ.get('SNAPSHOT_INTERVAL', '60')),
+        keep=int(os.environ.get('SNAPSHOT_KEEP', '3')),
+        pages=int(os.environ.get('SNAPSHOT_PAGES', '1024'))
+    )
+    with app.app_context():
+        memory_write_lock = install_write_lock(db.engine)
+    register_reporter('snapshot', snapshot_manager.status)
+register_reporter('metrics_flusher', metrics_registry.flusher_status)
+register_reporter('logging', logging_status)
+if traffic_recorder is not None:
+    register_reporter('traffic_recorder', traffic_recorder.status)
+
 
 # 学号库数据模型
 class StudentID(db.Model):
@@ -45,7 +129,7 @@ class StudentID(db.Model):
             'major': self.major,
             'class_name': self.class_name,
             'is_used': self.is_used,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
 
 
@@ -65,6 +149,7 @@ class User(db.Model):
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
+        invalidate_admin_auth(self.username)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -82,69 +167,284 @@ class User(db.Model):
             'email': self.email,
             'phone': self.phone,
             'student_id': self.student_id,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'last_login': self.last_login.isoformat() if self.last_login else None
+            'created_at': self.created_at,
+            'last_login': self.last_login
         }
 
 
-# 创建数据库表 - 修复版本
-with app.app_context():
+# 数据表版本号：每次提交写操作后递增，用作列表接口的 ETag
+# 共享数据库文件或连接数据库服务器时版本号也跨进程共享，其他 worker 的写入同样会使 ETag 失效
+table_versions = create_table_versions(
+    shared_db_path, [StudentID.__tablename__, User.__tablename__], engine=version_store_engine
+)
+# 内存检索索引对应的数据表版本号，与当前版本号不一致说明其他进程改过数据
+_index_versions = {}
+
+
+def bump_table_version(*table_names):
+    """递增指定数据表的版本号"""
+    track_index_versions(table_versions.bump(table_names))
+
+
+def track_index_versions(versions):
+    """版本号递增后更新检索索引对应的版本号"""
+    for table_name, version in versions.items():
+        # 只有本进程的这一次写入时，检索索引由调用方增量维护，仍然有效
+        if _index_versions.get(table_name) == version - 1:
+            _index_versions[table_name] = version
+
+
+def get_table_version(table_name):
+    """
+    获取数据表当前版本号
+    版本号存放在数据库中时，列表 ETag 和检索索引在一个请求中会多次读取版本号：
+    每个请求只通过请求会话的连接查询一次全部版本号，之后读取 g 中的缓存，本请求提交的写入同步更新缓存
+    """
+    if not table_versions.transactional or not has_request_context():
+        return table_versions.get(table_name)
+    versions = g.get('_table_versions')
+    if versions is None:
+        versions = g._table_versions = table_versions.get_all(db.session.connection())
+    return versions.get(table_name, 0)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_tables(session, flush_context):
+    """记录本次事务中被增删改的数据表"""
+    changed = session.info.setdefault('changed_tables', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__table__', None)
+        if table is not None:
+            changed.add(table.name)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_changed_tables(orm_execute_state):
+    """记录批量 insert/update/delete 语句涉及的数据表"""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            orm_execute_state.session.info.setdefault('changed_tables', set()).add(mapper.local_table.name)
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_changed_tables_in_transaction(session):
+    """版本号存放在数据库中时，在提交前用同一事务递增"""
+    if not table_versions.transactional:
+        return
+    session.flush()
+    changed = session.info.get('changed_tables')
+    if changed:
+        session.info['bumped_versions'] = table_versions.bump(changed, session.connection())
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_changed_tables(session):
+    changed = session.info.pop('changed_tables', None)
+    bumped = session.info.pop('bumped_versions', None)
+    if bumped:
+        track_index_versions(bumped)
+        if has_request_context() and g.get('_table_versions') is not None:
+            g._table_versions.update(bumped)
+    elif changed and not table_versions.transactional:
+        bump_table_version(*changed)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_tables(session):
+    session.info.pop('changed_tables', None)
+    session.info.pop('bumped_versions', None)
+
+
+# 学号前缀检索索引（学号 / 姓名自动补全）
+student_index = PrefixIndex()
+# 拼音模糊检索索引：学生姓名（键为学号）和用户名
+student_name_index = PinyinIndex()
+username_index = PinyinIndex()
+
+
+def student_index_record(student):
+    """学号记录转换为检索索引使用的字典"""
+    return {
+        'student_id': student.student_id,
+        'name': student.name,
+        'department': student.department,
+        'major': student.major,
+        'class_name': student.class_name
+    }
+
+
+def username_index_record(user):
+    """用户转换为检索索引使用的字典"""
+    return {'username': user.username, 'student_id': user.student_id}
+
+
+def rebuild_search_indexes():
+    """从数据库重建内存检索索引"""
+    # 先记录版本号再查询，查询期间发生的写入会在下次检索时再触发重建
+    versions = {name: get_table_version(name) for name in (StudentID.__tablename__, User.__tablename__)}
+    rows = [row._asdict() for row in db.session.query(
+        StudentID.student_id, StudentID.name, StudentID.department,
+        StudentID.major, StudentID.class_name
+    )]
+    student_index.build(rows)
+    student_name_index.build((row['student_id'], row['name'], row) for row in rows)
+    username_index.build(
+        (row.username, row.username, row._asdict())
+        for row in db.session.query(User.username, User.student_id)
+    )
+    _index_versions.update(versions)
+
+
+def refresh_search_indexes():
+    """其他进程修改过共享数据库时重建检索索引"""
+    for table_name, version in list(_index_versions.items()):
+        if get_table_version(table_name) != version:
+            rebuild_search_indexes()
+            return
+
+
+# 默认管理员账号；密码哈希预先计算好（对应 admin123），冷启动时无需执行完整的密码哈希
+# 部署时可通过 ADMIN_PASSWORD_HASH 环境变量替换为其他密码的哈希
+ADMIN_PASSWORD_HASH = os.environ.get(
+    'ADMIN_PASSWORD_HASH',
+    'pbkdf2:sha256:600000$2OPIHwyjYzxQbjjJ$93b962809cb3716f34251c337ad800254e6cdae99095a52bae66942c8432aa4b'
+)
+
+# 启动耗时统计（毫秒）：模块导入、建表/迁移、创建管理员、构建检索索引
+startup_timings = {}
+_db_initialized = False
+_db_init_lock = threading.Lock()
+
+
+def create_tables():
+    """
+    建表并执行结构迁移，可重复执行
+    create_all 只创建缺失的表；已有数据库的索引、新增列由 migrations.py 原地补齐，不会删除数据
+    数据库已是最新版本时只需一次查询
+    """
+    if latest_version() in applied_versions(db.engine):
+        return
     try:
-        # 尝试创建所有表
         db.create_all()
-        print("✅ 数据库表创建成功")
+    except exc.DBAPIError:
+        # 多个 worker 同时启动时可能并发建表，重试一次（create_all 会跳过其他进程已建好的表）
+        db.create_all()
+    executed = run_migrations(db.engine)
+    if executed:
+        logger.info('数据库迁移完成: %s', executed)
+
+
+def seed_admin():
+    """创建默认管理员账号，已存在时跳过"""
+    if User.query.filter_by(username='admin').first():
+        return
+    admin = User(
+        username='admin',
+        email='admin@example.com',
+        phone='13800138000',
+        student_id='00000000',  # 管理员学号
+        password_hash=ADMIN_PASSWORD_HASH
+    )
+    db.session.add(admin)
+
+    # 同时创建管理员对应的学号记录
+    if not StudentID.query.filter_by(student_id='00000000').first():
+        admin_student = StudentID(
+            student_id='00000000',
+            name='系统管理员',
+            department='系统管理',
+            major='系统管理',
+            class_name='管理员班',
+            is_used=True
+        )
+        db.session.add(admin_student)
 
-        # 检查表结构是否完整
-        try:
-            # 测试查询两个表
-            User.query.first()
-            StudentID.query.first()
-            print("✅ 数据库表结构完整")
-        except Exception as e:
-            print(f"🔄 检测到表结构问题，重新创建数据库: {e}")
-            db.drop_all()
-            db.create_all()
-            print("✅ 数据库表重新创建成功")
+    db.session.commit()
+    logger.info('默认管理员账号创建成功: admin / admin123')
 
-    except Exception as e:
-        print(f"❌ 数据库初始化失败: {e}")
-        # 如果创建失败，尝试删除重建
-        try:
-            db.drop_all()
-            db.create_all()
-            print("✅ 数据库表重建成功")
-        except Exception as e2:
-            print(f"❌ 数据库重建失败: {e2}")
 
-    # 创建默认管理员账号
+def get_memory_connection():
+    """内存数据库底层的 sqlite3 连接（StaticPool 下所有会话共用这一个连接）"""
+    pooled = db.engine.raw_connection()
     try:
-        if not User.query.filter_by(username='admin').first():
-            admin = User(
-                username='admin',
-                email='admin@example.com',
-                phone='13800138000',
-                student_id='00000000'  # 管理员学号
-            )
-            admin.set_password('admin123')
-            db.session.add(admin)
-
-            # 同时创建管理员对应的学号记录
-            if not StudentID.query.filter_by(student_id='00000000').first():
-                admin_student = StudentID(
-                    student_id='00000000',
-                    name='系统管理员',
-                    department='系统管理',
-                    major='系统管理',
-                    class_name='管理员班',
-                    is_used=True
+        return pooled.dbapi_connection
+    finally:
+        pooled.close()
+
+
+def init_db():
+    """
+    首次使用时初始化数据库：恢复快照、建表/迁移、创建管理员、构建检索索引
+    模块导入时不访问数据库，冷启动只在第一个 API 请求上付出初始化成本
+    """
+    global _db_initialized
+    if _db_initialized:
+        return
+    with _db_init_lock:
+        if _db_initialized:
+            return
+        with app.app_context():
+            started = time.perf_counter()
+            if snapshot_manager is not None:
+                try:
+                    restored = snapshot_manager.restore_latest(get_memory_connection())
+                    if restored:
+                        logger.info('已从快照恢复数据库: %s', restored)
+                except Exception:
+                    logger.exception('从快照恢复数据库失败')
+            restore_done = time.perf_counter()
+
+            try:
+                create_tables()
+                table_versions.setup()
+            except Exception:
+                logger.exception('数据库初始化失败')
+                raise
+            ddl_done = time.perf_counter()
+
+            try:
+                seed_admin()
+            except Exception:
+                logger.exception('创建管理员账号失败')
+                db.session.rollback()
+            seed_done = time.perf_counter()
+
+            try:
+                rebuild_search_indexes()
+            except Exception:
+                logger.exception('学号检索索引构建失败')
+            index_done = time.perf_counter()
+
+            if snapshot_manager is not None:
+                snapshot_manager.start(
+                    get_memory_connection(),
+                    lambda: tuple(get_table_version(name) for name in (StudentID.__tablename__, User.__tablename__)),
+                    write_lock=memory_write_lock
                 )
-                db.session.add(admin_student)
 
-            db.session.commit()
-            print("✅ 默认管理员账号创建成功: admin / admin123")
-    except Exception as e:
-        print(f"❌ 创建管理员账号失败: {e}")
-        db.session.rollback()
+        startup_timings.update({
+            'restore_ms': round((restore_done - started) * 1000, 2),
+            'ddl_ms': round((ddl_done - restore_done) * 1000, 2),
+            'seed_ms': round((seed_done - ddl_done) * 1000, 2),
+            'index_ms': round((index_done - seed_done) * 1000, 2),
+            'init_total_ms': round((index_done - started) * 1000, 2),
+        })
+        _db_initialized = True
+        logger.info('启动耗时: 导入 %(import_ms)sms，恢复快照 %(restore_ms)sms，建表/迁移 %(ddl_ms)sms，'
+                    '管理员 %(seed_ms)sms，检索索引 %(index_ms)sms', startup_timings)
+
+
+@app.before_request
+def ensure_db_initialized():
+    # 存活检查不访问数据库，也不触发初始化
+    if not _db_initialized and request.path.startswith('/api/') and request.path != '/api/health/live':
+        init_db()
+
+
+# 背景样式缓存：本地图片按 (路径, 修改时间) 缓存 base64 结果，首页不必每次读取并编码图片
+_background_style_cache = {}
+_background_style_stats = cache_stats('background_style')
 
 
 def get_background_style(photo_path):
@@ -152,6 +452,22 @@ def get_background_style(photo_path):
     根据照片路径生成背景样式
     支持本地图片和网络图片
     """
+    try:
+        cache_key = (photo_path, os.path.getmtime(photo_path)) if photo_path else None
+    except OSError:
+        cache_key = None
+    if cache_key in _background_style_cache:
+        _background_style_stats.hit()
+        return _background_style_cache[cache_key]
+    _background_style_stats.miss()
+    style = _build_background_style(photo_path)
+    if cache_key is not None:
+        _background_style_cache.clear()
+        _background_style_cache[cache_key] = style
+    return style
+
+
+def _build_background_style(photo_path):
     if not photo_path:
         # 默认渐变背景
         return "background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);"
@@ -182,10 +498,10 @@ def get_background_style(photo_path):
 
             return f"background: url('data:image/{mime_type};base64,{image_data}') center/cover no-repeat;"
         except Exception as e:
-            print(f"❌ 图片加载失败: {e}，使用默认背景")
+            logger.warning('图片加载失败: %s，使用默认背景', e)
             return "background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);"
     else:
-        print(f"❌ 图片文件不存在: {photo_path}，使用默认背景")
+        logger.warning('图片文件不存在: %s，使用默认背景', photo_path)
         return "background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);"
 
 
@@ -499,6 +815,46 @@ def index():
                 margin-bottom: 0;
             }}
 
+            /* 虚拟滚动列表：固定高度，只渲染可视区域内的行 */
+            .virtual-list {{
+                height: 250px;
+                position: relative;
+            }}
+
+            .virtual-spacer {{
+                position: relative;
+            }}
+
+            .virtual-rows {{
+                position: absolute;
+                top: 0;
+                left: 0;
+                right: 0;
+            }}
+
+            .virtual-list .user-item, .virtual-list .student-item {{
+                height: 41px;
+                margin-bottom: 5px;
+            }}
+
+            .virtual-list .user-item:last-child, .virtual-list .student-item:last-child {{
+                margin-bottom: 5px;
+            }}
+
+            .virtual-list .user-info, .virtual-list .student-info {{
+                white-space: nowrap;
+                overflow: hidden;
+                text-overflow: ellipsis;
+            }}
+
+            .virtual-list-footer {{
+                text-align: center;
+                font-size: 12px;
+                color: #999;
+                height: 30px;
+                line-height: 30px;
+            }}
+
             .user-info, .student-info {{
                 flex: 1;
                 font-size: 13px;
@@ -795,6 +1151,16 @@ def index():
                     <div class="loading" id="studentLoading">处理中...</div>
                 </div>
 
+                <!-- 快速查找 -->
+                <div class="form-row">
+                    <div class="form-label">快速查找</div>
+                    <input type="text" class="form-input" placeholder="输入学号、姓名或拼音（如 zjh）" id="studentSearch" oninput="onStudentSearchInput()">
+                </div>
+
+                <div class="student-list" id="studentSearchResults" style="display: none;">
+                    <!-- 查找结果将在这里显示 -->
+                </div>
+
                 <!-- 学号列表 -->
                 <div class="student-list" id="studentList">
                     <!-- 学号列表将在这里显示 -->
@@ -904,6 +1270,126 @@ def index():
         <script>
             const API_BASE = window.location.origin + '/api';
 
+            // 虚拟滚动列表参数：行高需与 .virtual-list 中的行样式保持一致
+            const VIRTUAL_ROW_HEIGHT = 46;
+            const VIRTUAL_OVERSCAN = 8;
+            const LIST_PAGE_SIZE = 200;
+
+            // 各列表第一页的 ETag，刷新时数据未变化服务器返回 304
+            const listEtags = {{}};
+
+            // 创建虚拟滚动列表：只渲染可视区域内的行，滚动接近底部时按需加载下一页
+            // fetchPage(afterId) 返回 {{ items, has_more, next_after_id }}，失败时返回 null
+            function createVirtualList(containerId, renderRow, fetchPage) {{
+                const container = document.getElementById(containerId);
+                container.innerHTML = '';
+                container.classList.add('virtual-list');
+                container.scrollTop = 0;
+
+                const spacer = document.createElement('div');
+                spacer.className = 'virtual-spacer';
+                const rows = document.createElement('div');
+                rows.className = 'virtual-rows';
+                const footer = document.createElement('div');
+                footer.className = 'virtual-list-footer';
+                spacer.appendChild(rows);
+                container.appendChild(spacer);
+                container.appendChild(footer);
+
+                const list = {{
+                    items: [],
+                    hasMore: true,
+                    nextAfterId: 0,
+                    loading: false,
+                    framePending: false
+                }};
+
+                function render() {{
+                    list.framePending = false;
+                    const count = list.items.length;
+                    spacer.style.height = (count * VIRTUAL_ROW_HEIGHT) + 'px';
+
+                    const first = Math.max(0, Math.floor(container.scrollTop / VIRTUAL_ROW_HEIGHT) - VIRTUAL_OVERSCAN);
+                    const last = Math.min(count, Math.ceil((container.scrollTop + container.clientHeight) / VIRTUAL_ROW_HEIGHT) + VIRTUAL_OVERSCAN);
+                    rows.style.transform = `translateY(${{first * VIRTUAL_ROW_HEIGHT}}px)`;
+                    rows.innerHTML = list.items.slice(first, last).map(renderRow).join('');
+
+                    footer.textContent = list.loading ? '加载中...' : (list.hasMore ? '' : `已加载全部 ${{count}} 条`);
+                    if (list.hasMore && !list.loading && last >= count - VIRTUAL_OVERSCAN) {{
+                        loadMore();
+                    }}
+                }}
+
+                async function loadMore() {{
+                    list.loading = true;
+                    footer.textContent = '加载中...';
+                    try {{
+                        const page = await fetchPage(list.nextAfterId);
+                        if (!page) {{
+                            list.hasMore = false;
+                            return;
+                        }}
+                        list.items.push(...page.items);
+                        list.hasMore = page.has_more;
+                        list.nextAfterId = page.next_after_id;
+                    }} finally {{
+                        list.loading = false;
+                        render();
+                    }}
+                }}
+
+                container.onscroll = () => {{
+                    if (!list.framePending) {{
+                        list.framePending = true;
+                        requestAnimationFrame(render);
+                    }}
+                }};
+
+                list.render = render;
+                return list;
+            }}
+
+            // 清空列表并退出虚拟滚动模式
+            function resetVirtualList(containerId) {{
+                const container = document.getElementById(containerId);
+                container.onscroll = null;
+                container.classList.remove('virtual-list');
+                container.innerHTML = '';
+                delete listEtags[containerId];
+            }}
+
+            // 列表正在显示时返回其 ETag，用于条件请求
+            function currentListEtag(containerId) {{
+                const container = document.getElementById(containerId);
+                return container.classList.contains('virtual-list') ? listEtags[containerId] : null;
+            }}
+
+            // 请求一页管理列表数据
+            async function fetchAdminListPage(endpoint, adminUsername, adminPassword, afterId, etag) {{
+                const headers = {{
+                    'Content-Type': 'application/json',
+                }};
+                if (etag) {{
+                    headers['If-None-Match'] = etag;
+                }}
+                const response = await fetch(API_BASE + endpoint, {{
+                    method: 'POST',
+                    headers: headers,
+                    body: JSON.stringify({{
+                        admin_username: adminUsername,
+                        admin_password: adminPassword,
+                        after_id: afterId,
+                        limit: LIST_PAGE_SIZE
+                    }})
+                }});
+                if (response.status === 304) {{
+                    return {{ success: true, notModified: true }};
+                }}
+                const result = await response.json();
+                result.etag = response.headers.get('ETag');
+                return result;
+            }}
+
             // 显示/隐藏密码
             function togglePassword(inputId) {{
                 const passwordInput = document.getElementById(inputId);
@@ -950,7 +1436,7 @@ def index():
                 document.getElementById('adminBox').style.display = 'block';
                 document.getElementById('chatPage').style.display = 'none';
                 // 清空用户列表
-                document.getElementById('userList').innerHTML = '';
+                resetVirtualList('userList');
             }}
 
             // 显示学号管理页面
@@ -962,8 +1448,10 @@ def index():
                 document.getElementById('forgotPasswordBox').style.display = 'none';
                 document.getElementById('studentManagementBox').style.display = 'block';
                 document.getElementById('chatPage').style.display = 'none';
-                // 清空学号列表
-                document.getElementById('studentList').innerHTML = '';
+                // 清空学号列表和查找结果
+                resetVirtualList('studentList');
+                document.getElementById('studentSearch').value = '';
+                document.getElementById('studentSearchResults').style.display = 'none';
             }}
 
             // 显示忘记密码页面
@@ -1193,21 +1681,13 @@ def index():
                 loading.style.display = 'block';
 
                 try {{
-                    const response = await fetch(API_BASE + '/admin/list_users', {{
-                        method: 'POST',
-                        headers: {{
-                            'Content-Type': 'application/json',
-                        }},
-                        body: JSON.stringify({{
-                            admin_username: adminUsername,
-                            admin_password: adminPassword
-                        }})
-                    }});
-
-                    const result = await response.json();
+                    const result = await fetchAdminListPage('/admin/list_users', adminUsername, adminPassword, 0, currentListEtag('userList'));
 
-                    if (result.success) {{
-                        displayUsers(result.data.users);
+                    if (result.notModified) {{
+                        showSuccess('adminSuccess', '用户列表没有变化');
+                    }} else if (result.success) {{
+                        displayUsers(result.data, adminUsername, adminPassword);
+                        listEtags.userList = result.etag;
                         showSuccess('adminSuccess', `共找到 ${{result.data.total}} 个用户`);
                     }} else {{
                         showError('adminError', result.message);
@@ -1220,10 +1700,20 @@ def index():
                 }}
             }}
 
-            // 显示用户列表
-            function displayUsers(users) {{
-                const userList = document.getElementById('userList');
-                userList.innerHTML = users.map(user => `
+            // 显示用户列表（虚拟滚动，第一页已随 loadUsers 返回）
+            function displayUsers(firstPage, adminUsername, adminPassword) {{
+                let pending = firstPage;
+                const list = createVirtualList('userList', renderUserRow, async (afterId) => {{
+                    const page = pending || (await fetchAdminListPage('/admin/list_users', adminUsername, adminPassword, afterId)).data;
+                    pending = null;
+                    return page ? {{ items: page.users, has_more: page.has_more, next_after_id: page.next_after_id }} : null;
+                }});
+                list.render();
+            }}
+
+            // 渲染单个用户行
+            function renderUserRow(user) {{
+                return `
                     <div class="user-item">
                         <div class="user-info">
                             <strong>${{user.username}}</strong> - 学号:${{user.student_id}} - ${{user.email}}
@@ -1231,7 +1721,7 @@ def index():
                         </div>
                         <button class="delete-btn" onclick="deleteUser('${{user.username}}')" ${{user.username === 'admin' ? 'disabled' : ''}}>删除</button>
                     </div>
-                `).join('');
+                `;
             }}
 
             // 删除用户
@@ -1388,49 +1878,120 @@ def index():
                 loading.style.display = 'block';
 
                 try {{
-                    const response = await fetch(API_BASE + '/admin/list_students', {{
+                    const result = await fetchAdminListPage('/admin/list_students', adminUsername, adminPassword, 0, currentListEtag('studentList'));
+
+                    if (result.notModified) {{
+                        showSuccess('studentSuccess', '学号库没有变化');
+                    }} else if (result.success) {{
+                        displayStudentsList(result.data, adminUsername, adminPassword);
+                        listEtags.studentList = result.etag;
+                        showSuccess('studentSuccess', `共 ${{result.data.total}} 个学号，已使用 ${{result.data.used_count}} 个，可用 ${{result.data.available_count}} 个`);
+                    }} else {{
+                        showError('studentError', result.message);
+                    }}
+                }} catch (error) {{
+                    showError('studentError', '网络错误，请检查服务器是否运行');
+                }} finally {{
+                    loading.style.display = 'none';
+                }}
+            }}
+
+            // 显示学号列表（虚拟滚动，第一页已随 loadStudents 返回）
+            function displayStudentsList(firstPage, adminUsername, adminPassword) {{
+                let pending = firstPage;
+                const list = createVirtualList('studentList', renderStudentRow, async (afterId) => {{
+                    const page = pending || (await fetchAdminListPage('/admin/list_students', adminUsername, adminPassword, afterId)).data;
+                    pending = null;
+                    return page ? {{ items: page.students, has_more: page.has_more, next_after_id: page.next_after_id }} : null;
+                }});
+                list.render();
+            }}
+
+            // 渲染单个学号行
+            function renderStudentRow(student) {{
+                return `
+                    <div class="student-item">
+                        <div class="student-info">
+                            <strong>${{student.student_id}}</strong> - ${{student.name}}
+                            ${{student.department ? `- ${{student.department}}` : ''}}
+                            ${{student.major ? `- ${{student.major}}` : ''}}
+                            ${{student.class_name ? `- ${{student.class_name}}` : ''}}
+                            <span class="student-status" style="color: ${{student.is_used ? '#ff4d4f' : '#52c41a'}}">
+                                ${{student.is_used ? '已使用' : '未使用'}}
+                            </span>
+                        </div>
+                        <button class="delete-btn" onclick="deleteStudent('${{student.student_id}}')" ${{student.is_used ? 'disabled' : ''}}>删除</button>
+                    </div>
+                `;
+            }}
+
+            // 学号自动补全：输入停顿后再请求，只显示最新一次请求的结果
+            let studentSearchTimer = null;
+            let studentSearchSeq = 0;
+
+            function onStudentSearchInput() {{
+                clearTimeout(studentSearchTimer);
+                studentSearchTimer = setTimeout(searchStudents, 150);
+            }}
+
+            async function searchStudents() {{
+                const query = document.getElementById('studentSearch').value.trim();
+                const adminUsername = document.getElementById('studentAdminUsername').value.trim();
+                const adminPassword = document.getElementById('studentAdminPassword').value;
+                const results = document.getElementById('studentSearchResults');
+
+                if (!query || !adminUsername || !adminPassword) {{
+                    results.style.display = 'none';
+                    results.innerHTML = '';
+                    return;
+                }}
+
+                const seq = ++studentSearchSeq;
+                try {{
+                    const response = await fetch(API_BASE + '/admin/autocomplete_students', {{
                         method: 'POST',
                         headers: {{
                             'Content-Type': 'application/json',
                         }},
                         body: JSON.stringify({{
                             admin_username: adminUsername,
-                            admin_password: adminPassword
+                            admin_password: adminPassword,
+                            q: query,
+                            mode: 'pinyin',
+                            limit: 10
                         }})
                     }});
 
                     const result = await response.json();
+                    if (seq !== studentSearchSeq) {{
+                        return;
+                    }}
 
                     if (result.success) {{
-                        displayStudentsList(result.data);
-                        showSuccess('studentSuccess', `共 ${{result.data.total}} 个学号，已使用 ${{result.data.used_count}} 个，可用 ${{result.data.available_count}} 个`);
+                        const matches = result.data.matches;
+                        results.innerHTML = matches.length
+                            ? matches.map(renderStudentMatch).join('')
+                            : '<div class="virtual-list-footer">没有匹配的学号</div>';
+                        results.style.display = 'block';
                     }} else {{
                         showError('studentError', result.message);
                     }}
                 }} catch (error) {{
                     showError('studentError', '网络错误，请检查服务器是否运行');
-                }} finally {{
-                    loading.style.display = 'none';
                 }}
             }}
 
-            // 显示学号列表
-            function displayStudentsList(data) {{
-                const studentList = document.getElementById('studentList');
-                studentList.innerHTML = data.students.map(student => `
+            // 渲染单个查找结果
+            function renderStudentMatch(student) {{
+                return `
                     <div class="student-item">
                         <div class="student-info">
                             <strong>${{student.student_id}}</strong> - ${{student.name}}
                             ${{student.department ? `- ${{student.department}}` : ''}}
-                            ${{student.major ? `- ${{student.major}}` : ''}}
                             ${{student.class_name ? `- ${{student.class_name}}` : ''}}
-                            <span class="student-status" style="color: ${{student.is_used ? '#ff4d4f' : '#52c41a'}}">
-                                ${{student.is_used ? '已使用' : '未使用'}}
-                            </span>
                         </div>
-                        <button class="delete-btn" onclick="deleteStudent('${{student.student_id}}')" ${{student.is_used ? 'disabled' : ''}}>删除</button>
                     </div>
-                `).join('');
+                `;
             }}
 
             // 删除学号
@@ -1714,83 +2275,234 @@ def index():
     '''
 
 
-# API路由
-@app.route('/api/register', methods=['POST'])
-def register():
+# 管理员身份验证缓存
+# 管理接口每次请求都携带管理员密码，完整的 pbkdf2 校验约需数百毫秒；管理页面分页加载、自动补全等
+# 连续请求会反复付出这一成本，因此验证成功后在 ADMIN_AUTH_CACHE_TTL 秒内缓存结果（0 表示不缓存）。
+# 缓存键是账号、密码和当前密码哈希的 HMAC，进程内不保存明文密码；每次仍从数据库读取管理员账号，
+# 账号被删除或密码被修改（包括其他 worker 中的修改）后缓存不再命中；本进程内修改密码、删除账号时
+# 还会通过 invalidate_admin_auth 立即清除对应的缓存项
+ADMIN_AUTH_CACHE_TTL = int(os.environ.get('ADMIN_AUTH_CACHE_TTL', '300'))  # 秒
+ADMIN_AUTH_CACHE_MAX = 1024
+_admin_auth_cache = {}  # 缓存键 -> (管理员用户名, 过期时间)
+_admin_auth_lock = threading.Lock()
+_admin_auth_stats = cache_stats('admin_auth')
+
+# 分页列表每页条数
+LIST_PAGE_SIZE_DEFAULT = 200
+LIST_PAGE_SIZE_MAX = 1000
+
+
+def verify_admin(admin_username, admin_password):
+    """
+    验证管理员身份，成功返回用户对象，失败返回 None
+    缓存键包含当前密码哈希，修改密码后旧缓存自动失效
+    """
+    admin_user = User.query.filter_by(username=admin_username).first()
+    if not admin_user:
+        return None
+
+    cache_key = hmac.new(
+        app.config['SECRET_KEY'].encode('utf-8'),
+        f'{admin_username}\0{admin_password}\0{admin_user.password_hash}'.encode('utf-8'),
+        hashlib.sha256
+    ).digest()
+    now = time.monotonic()
+    with _admin_auth_lock:
+        _, expires_at = _admin_auth_cache.get(cache_key, (None, 0))
+    if expires_at > now:
+        _admin_auth_stats.hit()
+        return admin_user
+    _admin_auth_stats.miss()
+
+    if not admin_user.check_password(admin_password):
+        return None
+
+    if ADMIN_AUTH_CACHE_TTL > 0:
+        with _admin_auth_lock:
+            if len(_admin_auth_cache) >= ADMIN_AUTH_CACHE_MAX:
+                # 清理过期项，仍然过多则整体清空
+                for key in [k for k, (_, v) in _admin_auth_cache.items() if v <= now]:
+                    del _admin_auth_cache[key]
+                if len(_admin_auth_cache) >= ADMIN_AUTH_CACHE_MAX:
+                    _admin_auth_cache.clear()
+            _admin_auth_cache[cache_key] = (admin_user.username, now + ADMIN_AUTH_CACHE_TTL)
+    return admin_user
+
+
+def invalidate_admin_auth(username=None):
+    """清除用户的身份验证缓存，修改密码、删除账号时调用；username 为 None 时全部清除"""
+    with _admin_auth_lock:
+        if username is None:
+            _admin_auth_cache.clear()
+            return
+        for key in [k for k, (name, _) in _admin_auth_cache.items() if name == username]:
+            del _admin_auth_cache[key]
+
+
+def make_list_etag(table_name, data):
+    """根据数据表版本号和分页参数生成列表接口的 ETag"""
+    return '{}-{}-{}-{}-{}'.format(
+        table_name, table_versions.token, get_table_version(table_name),
+        data.get('after_id') or 0, data.get('limit') or 'all'
+    )
+
+
+def not_modified_response(etag):
+    """返回 304 响应，不查询数据库也不序列化数据"""
+    response = app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    return response
+
+
+def get_page_params(data):
+    """
+    解析键集分页参数 after_id / limit
+    未提供 limit 时返回 None，表示按旧方式返回全部数据
+    """
+    if data.get('limit') is None:
+        return None
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'success': False, 'message': '请求数据为空'}), 400
+        after_id = int(data.get('after_id') or 0)
+        limit = int(data.get('limit') or LIST_PAGE_SIZE_DEFAULT)
+    except (TypeError, ValueError):
+        raise ValueError('分页参数格式错误')
+    return max(after_id, 0), max(1, min(limit, LIST_PAGE_SIZE_MAX))
 
-        student_id = data.get('student_id', '').strip()
-        username = data.get('username', '').strip()
-        email = data.get('email', '').strip()
-        phone = data.get('phone', '').strip()
-        password = data.get('password', '')
 
-        # 验证数据
-        if not student_id or not username or not email or not password or not phone:
-            return jsonify({'success': False, 'message': '所有字段都为必填项'}), 400
+# 注册/登录的各个阶段拆成独立函数：同步视图按顺序调用，
+# asgi.py 的异步视图把数据库阶段和密码哈希分别放到线程池中执行
+def parse_registration(data):
+    """校验注册参数是否齐全，返回 (字段, 错误信息)，不访问数据库"""
+    fields = {
+        'student_id': data.get('student_id', '').strip(),
+        'username': data.get('username', '').strip(),
+        'email': data.get('email', '').strip(),
+        'phone': data.get('phone', '').strip(),
+        'password': data.get('password', '')
+    }
 
-        if len(password) < 6:
-            return jsonify({'success': False, 'message': '密码长度至少6位'}), 400
+    if not all(fields.values()):
+        return fields, '所有字段都为必填项'
 
-        if len(username) < 3:
-            return jsonify({'success': False, 'message': '用户名长度至少3位'}), 400
+    if len(fields['password']) < 6:
+        return fields, '密码长度至少6位'
 
-        # 验证学号是否在学号库中且未被使用
-        student_record = StudentID.query.filter_by(student_id=student_id).first()
-        if not student_record:
-            return jsonify({'success': False, 'message': '学号不存在，请联系管理员'}), 400
+    if len(fields['username']) < 3:
+        return fields, '用户名长度至少3位'
 
-        if student_record.is_used:
-            return jsonify({'success': False, 'message': '该学号已被注册使用'}), 400
+    return fields, None
 
-        # 添加电话号码格式验证
-        if not phone.isdigit():
-            return jsonify({'success': False, 'message': '电话号码只能包含数字'}), 400
 
-        if len(phone) < 7:
-            return jsonify({'success': False, 'message': '电话号码长度至少7位'}), 400
+def check_registration(fields):
+    """检查学号、手机号格式及唯一性，返回错误信息，可以注册时返回 None"""
+    student_id = fields['student_id']
+    phone = fields['phone']
 
-        # 更严格的手机号格式验证（中国大陆手机号）
-        phone_pattern = r'^1[3-9]\d{9}$'
-        if not re.match(phone_pattern, phone):
-            return jsonify({'success': False, 'message': '请输入有效的中国大陆手机号码（11位，以1开头）'}), 400
+    # 验证学号是否在学号库中且未被使用
+    student_record = StudentID.query.filter_by(student_id=student_id).first()
+    if not student_record:
+        return '学号不存在，请联系管理员'
 
-        # 检查用户是否已存在
-        if User.query.filter_by(username=username).first():
-            return jsonify({'success': False, 'message': '用户名已存在'}), 400
+    if student_record.is_used:
+        return '该学号已被注册使用'
 
-        if User.query.filter_by(email=email).first():
-            return jsonify({'success': False, 'message': '邮箱已被注册'}), 400
+    # 添加电话号码格式验证
+    if not phone.isdigit():
+        return '电话号码只能包含数字'
 
-        if User.query.filter_by(phone=phone).first():
-            return jsonify({'success': False, 'message': '手机号已被注册'}), 400
+    if len(phone) < 7:
+        return '电话号码长度至少7位'
 
-        if User.query.filter_by(student_id=student_id).first():
-            return jsonify({'success': False, 'message': '学号已被注册'}), 400
+    # 更严格的手机号格式验证（中国大陆手机号）
+    phone_pattern = r'^1[3-9]\d{9}$'
+    if not re.match(phone_pattern, phone):
+        return '请输入有效的中国大陆手机号码（11位，以1开头）'
 
-        # 创建新用户
-        new_user = User(
-            username=username,
-            email=email,
-            phone=phone,
-            student_id=student_id
-        )
-        new_user.set_password(password)
+    # 检查用户是否已存在
+    if User.query.filter_by(username=fields['username']).first():
+        return '用户名已存在'
 
-        # 标记学号为已使用
-        student_record.is_used = True
+    if User.query.filter_by(email=fields['email']).first():
+        return '邮箱已被注册'
 
-        db.session.add(new_user)
-        db.session.commit()
+    if User.query.filter_by(phone=phone).first():
+        return '手机号已被注册'
+
+    if User.query.filter_by(student_id=student_id).first():
+        return '学号已被注册'
+
+    return None
+
+
+def create_registered_user(fields, password_hash):
+    """
+    创建用户并标记学号为已使用，返回 (用户信息, 错误信息)
+    计算密码哈希期间学号可能已被其他请求注册，提交前重新检查
+    """
+    student_record = StudentID.query.filter_by(student_id=fields['student_id']).first()
+    if not student_record or student_record.is_used:
+        return None, '该学号已被注册使用'
+
+    new_user = User(
+        username=fields['username'],
+        email=fields['email'],
+        phone=fields['phone'],
+        student_id=fields['student_id'],
+        password_hash=password_hash
+    )
+
+    # 标记学号为已使用
+    student_record.is_used = True
+
+    db.session.add(new_user)
+    db.session.commit()
+    username_index.add(new_user.username, new_user.username, username_index_record(new_user))
+    return new_user.to_dict(), None
+
+
+def find_login_user(student_id):
+    """按学号查找登录用户，返回 (用户 id, 密码哈希)，用户不存在时返回 None"""
+    user = User.query.filter_by(student_id=student_id).first()
+    if not user:
+        return None
+    return user.id, user.password_hash
+
+
+def record_login(user_id):
+    """更新最后登录时间，返回用户信息"""
+    user = db.session.get(User, user_id)
+    user.last_login = datetime.utcnow()
+    db.session.commit()
+    return user.to_dict()
+
+
+# API路由
+@app.route('/api/register', methods=['POST'])
+def register():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'message': '请求数据为空'}), 400
+
+        # 验证数据
+        fields, error = parse_registration(data)
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
+
+        error = check_registration(fields)
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
+
+        # 创建新用户
+        user, error = create_registered_user(fields, generate_password_hash(fields['password']))
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
 
         return jsonify({
             'success': True,
             'message': '注册成功',
             'data': {
-                'user': new_user.to_dict()
+                'user': user
             }
         }), 201
 
@@ -1813,18 +2525,17 @@ def login():
             return jsonify({'success': False, 'message': '请输入学号和密码'}), 400
 
         # 查找用户（现在只支持学号登录）
-        user = User.query.filter_by(student_id=student_id).first()
+        found = find_login_user(student_id)
 
-        if user and user.check_password(password):
+        if found and check_password_hash(found[1], password):
             # 更新最后登录时间
-            user.last_login = datetime.utcnow()
-            db.session.commit()
+            user = record_login(found[0])
 
             return jsonify({
                 'success': True,
                 'message': '登录成功',
                 'data': {
-                    'user': user.to_dict()
+                    'user': user
                 }
             })
         else:
@@ -1860,11 +2571,11 @@ def send_verification_code():
         # 模拟发送验证码
         if method == 'email':
             # 模拟发送邮件
-            print(f"📧 发送邮件验证码到 {user.email}: {verification_code}")
+            logger.info('发送邮件验证码到 %s: %s', user.email, verification_code)
             message = f"验证码已发送到邮箱 {user.email}，请查收"
         else:
             # 模拟发送短信
-            print(f"📱 发送短信验证码到 {user.phone}: {verification_code}")
+            logger.info('发送短信验证码到 %s: %s', user.phone, verification_code)
             message = f"验证码已发送到手机 {user.phone}，请查收"
 
         # 生成重置令牌
@@ -1977,6 +2688,113 @@ def reset_password():
         return jsonify({'success': False, 'message': f'重置密码失败: {str(e)}'}), 500
 
 
+# IN 列表分段大小，避免超过数据库的参数个数限制
+IN_CHUNK_SIZE = 500
+
+
+def chunked(values, size=IN_CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+# 学号/用户管理操作：只修改会话不提交，单个接口和 /api/batch 共用
+def add_students(students):
+    """
+    添加学号记录，返回 (新增的学号记录, 重复数, 失败数)
+    新增记录为字典（字段同 student_index_record），全部记录用一条 executemany 语句插入
+    """
+    duplicate_count = 0
+    error_count = 0
+    new_rows = []
+    duplicate_ids = []
+
+    # 一次查出已存在的学号（分段 IN 查询），不必每条记录查询一次
+    candidate_ids = list({student.get('student_id', '').strip() for student in students
+                          if isinstance(student, dict) and isinstance(student.get('student_id'), str)})
+    existing_ids = set()
+    for chunk in chunked(candidate_ids, IN_CHUNK_SIZE):
+        existing_ids.update(db.session.execute(
+            select(StudentID.student_id).where(StudentID.student_id.in_(chunk))
+        ).scalars())
+
+    for student in students:
+        # 确保student是字典类型
+        if not isinstance(student, dict):
+            error_count += 1
+            continue
+
+        student_id = student.get('student_id', '').strip()
+        name = student.get('name', '').strip()
+
+        if student_id and name:
+            # 检查学号是否已存在（包括本次导入中前面的记录）
+            if student_id not in existing_ids:
+                existing_ids.add(student_id)
+                new_rows.append({
+                    'student_id': student_id,
+                    'name': name,
+                    'department': student.get('department', ''),
+                    'major': student.get('major', ''),
+                    'class_name': student.get('class_name', '')
+                })
+            else:
+                duplicate_count += 1
+                duplicate_ids.append(student_id)
+
+    if duplicate_ids:
+        # 重复学号汇总为一条日志，大批量导入时不逐行输出
+        logger.info('学号已存在 %d 个: %s', len(duplicate_ids), summarize_values(duplicate_ids),
+                    extra={'duplicate_count': len(duplicate_ids)})
+    if new_rows:
+        db.session.execute(insert(StudentID), new_rows)
+    return new_rows, duplicate_count, error_count
+
+
+def delete_student_record(student_id):
+    """删除未被使用的学号，失败时返回 (错误信息, 状态码)，成功返回 None"""
+    student_record = StudentID.query.filter_by(student_id=student_id).first()
+    if not student_record:
+        return '学号不存在', 404
+
+    # 检查学号是否已被使用
+    if student_record.is_used:
+        return '该学号已被使用，无法删除', 400
+
+    db.session.delete(student_record)
+    return None
+
+
+def delete_user_account(target_username, admin_user):
+    """删除用户并释放学号，失败时返回 (错误信息, 状态码)，成功返回 None"""
+    target_user = User.query.filter_by(username=target_username).first()
+    if not target_user:
+        return '要删除的用户不存在', 404
+
+    # 不能删除自己
+    if target_user.username == admin_user.username:
+        return '不能删除自己的账号', 400
+
+    # 释放学号
+    student_record = StudentID.query.filter_by(student_id=target_user.student_id).first()
+    if student_record:
+        student_record.is_used = False
+
+    db.session.delete(target_user)
+    invalidate_admin_auth(target_username)
+    return None
+
+
+def add_students_to_indexes(records):
+    """records 为 add_students() 返回的学号记录"""
+    student_index.add_many(records)
+    student_name_index.add_many((record['student_id'], record['name'], record) for record in records)
+
+
+def remove_student_from_indexes(student_id):
+    student_index.remove(student_id)
+    student_name_index.remove(student_id)
+
+
 # 学号管理API
 @app.route('/api/admin/import_students', methods=['POST'])
 def import_students():
@@ -1994,49 +2812,19 @@ def import_students():
             return jsonify({'success': False, 'message': '请提供管理员账号和密码'}), 400
 
         # 验证管理员身份
-        admin_user = User.query.filter_by(username=admin_username).first()
-        if not admin_user or not admin_user.check_password(admin_password):
+        admin_user = verify_admin(admin_username, admin_password)
+        if not admin_user:
             return jsonify({'success': False, 'message': '管理员身份验证失败'}), 401
 
         # 验证students参数类型
         if not isinstance(students, list):
             return jsonify({'success': False, 'message': '学号数据格式错误，应为数组'}), 400
 
-        imported_count = 0
-        duplicate_count = 0
-        error_count = 0
-
-        for student in students:
-            # 确保student是字典类型
-            if not isinstance(student, dict):
-                error_count += 1
-                continue
-
-            student_id = student.get('student_id', '').strip()
-            name = student.get('name', '').strip()
-
-            if student_id and name:
-                # 检查学号是否已存在
-                existing_student = StudentID.query.filter_by(student_id=student_id).first()
-                if not existing_student:
-                    try:
-                        new_student = StudentID(
-                            student_id=student_id,
-                            name=name,
-                            department=student.get('department', ''),
-                            major=student.get('major', ''),
-                            class_name=student.get('class_name', '')
-                        )
-                        db.session.add(new_student)
-                        imported_count += 1
-                    except Exception as e:
-                        print(f"❌ 添加学号失败 {student_id}: {e}")
-                        error_count += 1
-                else:
-                    duplicate_count += 1
-                    print(f"⚠️  学号已存在: {student_id}")
+        new_rows, duplicate_count, error_count = add_students(students)
+        imported_count = len(new_rows)
 
         db.session.commit()
+        add_students_to_indexes(new_rows)
 
         message = f'成功导入 {imported_count} 个学号'
         if duplicate_count > 0:
@@ -2056,7 +2844,7 @@ def import_students():
 
     except Exception as e:
         db.session.rollback()
-        print(f"❌ 导入学号异常: {e}")
+        logger.exception('导入学号异常')
         return jsonify({'success': False, 'message': f'导入学号失败: {str(e)}'}), 500
 
 
@@ -2074,21 +2862,52 @@ def list_students():
         if not admin_username or not admin_password:
             return jsonify({'success': False, 'message': '请提供管理员账号和密码'}), 400
 
-        # 验证管理员身份
-        admin_user = User.query.filter_by(username=admin_username).first()
-        if not admin_user or not admin_user.check_password(admin_password):
+        try:
+            page_params = get_page_params(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+
+        # 验证管理员身份（先于条件请求判断，未通过验证的请求不能借 304 探测数据是否变化）
+        if not verify_admin(admin_username, admin_password):
             return jsonify({'success': False, 'message': '管理员身份验证失败'}), 401
 
-        students = StudentID.query.all()
-        return jsonify({
+        # 数据未变化时直接返回 304
+        etag = make_list_etag(StudentID.__tablename__, data)
+        if request.if_none_match.contains_weak(etag):
+            return not_modified_response(etag)
+
+        # 一次聚合查询得到总数和已使用数
+        total, used_count = db.session.query(
+            func.count(StudentID.id),
+            func.coalesce(func.sum(case((StudentID.is_used == True, 1), else_=0)), 0)
+        ).one()
+
+        result = {
+            'total': total,
+            'used_count': used_count,
+            'available_count': total - used_count
+        }
+
+        if page_params is None:
+            students = StudentID.query.all()
+            result['students'] = [student.to_dict() for student in students]
+        else:
+            # 键集分页：按主键顺序取下一页，多取一条用于判断是否还有更多
+            after_id, limit = page_params
+            students = StudentID.query.filter(StudentID.id > after_id) \
+                .order_by(StudentID.id).limit(limit + 1).all()
+            has_more = len(students) > limit
+            students = students[:limit]
+            result['students'] = [student.to_dict() for student in students]
+            result['has_more'] = has_more
+            result['next_after_id'] = students[-1].id if students else after_id
+
+        response = jsonify({
             'success': True,
-            'data': {
-                'students': [student.to_dict() for student in students],
-                'total': len(students),
-                'used_count': StudentID.query.filter_by(is_used=True).count(),
-                'available_count': StudentID.query.filter_by(is_used=False).count()
-            }
+            'data': result
         })
+        response.set_etag(etag, weak=True)
+        return response
     except Exception as e:
         return jsonify({'success': False, 'message': f'获取学号列表失败: {str(e)}'}), 500
 
@@ -2109,22 +2928,16 @@ def delete_student():
             return jsonify({'success': False, 'message': '请提供管理员账号、密码和学号'}), 400
 
         # 验证管理员身份
-        admin_user = User.query.filter_by(username=admin_username).first()
-        if not admin_user or not admin_user.check_password(admin_password):
+        admin_user = verify_admin(admin_username, admin_password)
+        if not admin_user:
             return jsonify({'success': False, 'message': '管理员身份验证失败'}), 401
 
-        # 查找学号记录
-        student_record = StudentID.query.filter_by(student_id=student_id).first()
-        if not student_record:
-            return jsonify({'success': False, 'message': '学号不存在'}), 404
-
-        # 检查学号是否已被使用
-        if student_record.is_used:
-            return jsonify({'success': False, 'message': '该学号已被使用，无法删除'}), 400
-
         # 删除学号记录
-        db.session.delete(student_record)
+        error = delete_student_record(student_id)
+        if error:
+            return jsonify({'success': False, 'message': error[0]}), error[1]
         db.session.commit()
+        remove_student_from_indexes(student_id)
 
         return jsonify({
             'success': True,
@@ -2136,6 +2949,205 @@ def delete_student():
         return jsonify({'success': False, 'message': f'删除学号失败: {str(e)}'}), 500
 
 
+# 批量删除：按学号列表或筛选条件执行集合操作，一条语句删除全部匹配行
+BULK_DELETE_MAX_IDS = 50000
+BULK_DELETE_FILTER_FIELDS = ('department', 'major', 'class_name')
+
+
+def parse_bulk_delete_target(data, id_field):
+    """
+    解析批量删除的目标：id_field 指定的列表，或 filter 中的院系/专业/班级条件
+    返回 (id 列表, 筛选条件, 错误信息)，两者只能提供一个
+    """
+    ids = data.get(id_field)
+    filters = data.get('filter')
+    if ids is not None and filters is not None:
+        return None, None, f'{id_field} 与 filter 只能提供一个'
+
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(value, str) for value in ids):
+            return None, None, f'{id_field} 格式错误，应为字符串数组'
+        ids = list(dict.fromkeys(value.strip() for value in ids if value.strip()))
+        if not ids:
+            return None, None, f'{id_field} 不能为空'
+        if len(ids) > BULK_DELETE_MAX_IDS:
+            return None, None, f'单次最多删除 {BULK_DELETE_MAX_IDS} 条'
+        return ids, None, None
+
+    if not isinstance(filters, dict):
+        return None, None, f'请提供 {id_field} 或 filter'
+    conditions = {field: str(filters[field]).strip() for field in BULK_DELETE_FILTER_FIELDS
+                  if filters.get(field) is not None and str(filters[field]).strip()}
+    if not conditions:
+        # 不允许空条件，避免误删整个学号库
+        return None, None, 'filter 至少需要一个条件: ' + ', '.join(BULK_DELETE_FILTER_FIELDS)
+    return None, conditions, None
+
+
+def student_filter_clauses(conditions):
+    return [getattr(StudentID, field) == value for field, value in conditions.items()]
+
+
+@app.route('/api/admin/bulk_delete_students', methods=['POST'])
+def bulk_delete_students():
+    """
+    批量删除学号
+    student_ids 指定学号列表，或 filter 指定院系/专业/班级（如清理毕业班），
+    已被使用的学号不会删除，执行 DELETE ... WHERE ... AND is_used = 0 一次完成
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'message': '请求数据为空'}), 400
+
+        admin_username = data.get('admin_username', '').strip()
+        admin_password = data.get('admin_password', '')
+
+        if not admin_username or not admin_password:
+            return jsonify({'success': False, 'message': '请提供管理员账号和密码'}), 400
+
+        student_ids, conditions, error = parse_bulk_delete_target(data, 'student_ids')
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
+
+        # 验证管理员身份
+        admin_user = verify_admin(admin_username, admin_password)
+        if not admin_user:
+            return jsonify({'success': False, 'message': '管理员身份验证失败'}), 401
+
+        if student_ids is not None:
+            clauses_list = [[StudentID.student_id.in_(chunk)]
+                            for chunk in chunked(student_ids, IN_CHUNK_SIZE)]
+        else:
+            clauses_list = [student_filter_clauses(conditions)]
+
+        deleted_ids = []
+        used_count = 0
+        for clauses in clauses_list:
+            # 已使用的学号只统计不删除
+            used_count += db.session.execute(
+                select(func.count()).select_from(StudentID).where(*clauses, StudentID.is_used == True)
+            ).scalar()
+            deleted_ids.extend(db.session.execute(
+                delete(StudentID)
+                .where(*clauses, StudentID.is_used == False)
+                .returning(StudentID.student_id)
+                .execution_options(synchronize_session=False)
+            ).scalars())
+        db.session.commit()
+
+        for student_id in deleted_ids:
+            remove_student_from_indexes(student_id)
+
+        result = {
+            'deleted_count': len(deleted_ids),
+            'used_count': used_count,
+            'deleted_student_ids': deleted_ids
+        }
+        message = f'成功删除 {len(deleted_ids)} 个学号'
+        if used_count:
+            message += f'，{used_count} 个学号已被使用未删除'
+        if student_ids is not None:
+            result['not_found_count'] = len(student_ids) - len(deleted_ids) - used_count
+            if result['not_found_count']:
+                message += f'，{result["not_found_count"]} 个学号不存在'
+
+        return jsonify({
+            'success': True,
+            'message': message,
+            'data': result
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'批量删除学号失败: {str(e)}'}), 500
+
+
+@app.route('/api/admin/autocomplete_students', methods=['POST'])
+def autocomplete_students():
+    """
+    按学号或姓名自动补全
+    mode=prefix（默认）按前缀匹配；mode=pinyin 支持拼音全拼、首字母的模糊匹配并按相关度排序
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'message': '请求数据为空'}), 400
+
+        admin_username = data.get('admin_username', '').strip()
+        admin_password = data.get('admin_password', '')
+        query = str(data.get('q', '')).strip()
+        mode = data.get('mode', 'prefix')
+
+        if not admin_username or not admin_password:
+            return jsonify({'success': False, 'message': '请提供管理员账号和密码'}), 400
+
+        if mode not in ('prefix', 'pinyin'):
+            return jsonify({'success': False, 'message': 'mode 参数只能为 prefix 或 pinyin'}), 400
+
+        try:
+            limit = max(1, min(int(data.get('limit') or 10), 50))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'limit 参数格式错误'}), 400
+
+        # 验证管理员身份
+        if not verify_admin(admin_username, admin_password):
+            return jsonify({'success': False, 'message': '管理员身份验证失败'}), 401
+
+        refresh_search_indexes()
+        if mode == 'pinyin':
+            matches = [dict(record, score=score) for score, _, record in student_name_index.search(query, limit)]
+        else:
+            matches = student_index.search(query, limit)
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'query': query,
+                'mode': mode,
+                'matches': matches
+            }
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'检索学号失败: {str(e)}'}), 500
+
+
+@app.route('/api/admin/search_users', methods=['POST'])
+def search_users():
+    """按用户名模糊检索用户，支持拼音全拼和首字母"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'message': '请求数据为空'}), 400
+
+        admin_username = data.get('admin_username', '').strip()
+        admin_password = data.get('admin_password', '')
+        query = str(data.get('q', '')).strip()
+
+        if not admin_username or not admin_password:
+            return jsonify({'success': False, 'message': '请提供管理员账号和密码'}), 400
+
+        try:
+            limit = max(1, min(int(data.get('limit') or 10), 50))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'limit 参数格式错误'}), 400
+
+        # 验证管理员身份
+        if not verify_admin(admin_username, admin_password):
+            return jsonify({'success': False, 'message': '管理员身份验证失败'}), 401
+
+        refresh_search_indexes()
+        return jsonify({
+            'success': True,
+            'data': {
+                'query': query,
+                'matches': [dict(record, score=score) for score, _, record in username_index.search(query, limit)]
+            }
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'检索用户失败: {str(e)}'}), 500
+
+
 # 原有的其他API路由保持不变
 @app.route('/api/admin/delete_user', methods=['POST'])
 def admin_delete_user():
@@ -2153,36 +3165,105 @@ def admin_delete_user():
             return jsonify({'success': False, 'message': '请提供管理员账号、密码和目标用户名'}), 400
 
         # 验证管理员身份
-        admin_user = User.query.filter_by(username=admin_username).first()
-        if not admin_user or not admin_user.check_password(admin_password):
+        admin_user = verify_admin(admin_username, admin_password)
+        if not admin_user:
             return jsonify({'success': False, 'message': '管理员身份验证失败'}), 401
 
-        # 查找要删除的用户
-        target_user = User.query.filter_by(username=target_username).first()
-        if not target_user:
-            return jsonify({'success': False, 'message': '要删除的用户不存在'}), 404
+        # 删除用户并释放学号
+        error = delete_user_account(target_username, admin_user)
+        if error:
+            return jsonify({'success': False, 'message': error[0]}), error[1]
+        db.session.commit()
+        username_index.remove(target_username)
+
+        return jsonify({
+            'success': True,
+            'message': f'用户 {target_username} 已成功删除'
+        })
 
-        # 不能删除自己
-        if target_user.username == admin_user.username:
-            return jsonify({'success': False, 'message': '不能删除自己的账号'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'删除用户失败: {str(e)}'}), 500
 
-        # 释放学号
-        student_record = StudentID.query.filter_by(student_id=target_user.student_id).first()
-        if student_record:
-            student_record.is_used = False
 
-        # 删除用户
-        db.session.delete(target_user)
+@app.route('/api/admin/bulk_delete_users', methods=['POST'])
+def bulk_delete_users():
+    """
+    批量删除用户并释放学号
+    usernames 指定用户名列表，或 filter 按学号库中的院系/专业/班级筛选；
+    同一事务中先释放匹配用户的学号，再删除用户，管理员自己的账号不会被删除
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'message': '请求数据为空'}), 400
+
+        admin_username = data.get('admin_username', '').strip()
+        admin_password = data.get('admin_password', '')
+
+        if not admin_username or not admin_password:
+            return jsonify({'success': False, 'message': '请提供管理员账号和密码'}), 400
+
+        usernames, conditions, error = parse_bulk_delete_target(data, 'usernames')
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
+
+        # 验证管理员身份
+        admin_user = verify_admin(admin_username, admin_password)
+        if not admin_user:
+            return jsonify({'success': False, 'message': '管理员身份验证失败'}), 401
+
+        if usernames is not None:
+            clauses_list = [[User.username.in_(chunk)] for chunk in chunked(usernames, IN_CHUNK_SIZE)]
+        else:
+            clauses_list = [[User.student_id.in_(
+                select(StudentID.student_id).where(*student_filter_clauses(conditions))
+            )]]
+
+        deleted_usernames = []
+        released_count = 0
+        for clauses in clauses_list:
+            # 不能删除自己
+            clauses = clauses + [User.username != admin_user.username]
+            # 释放学号
+            released_count += db.session.execute(
+                update(StudentID)
+                .where(StudentID.student_id.in_(select(User.student_id).where(*clauses)))
+                .values(is_used=False)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            deleted_usernames.extend(db.session.execute(
+                delete(User)
+                .where(*clauses)
+                .returning(User.username)
+                .execution_options(synchronize_session=False)
+            ).scalars())
         db.session.commit()
 
+        for username in deleted_usernames:
+            invalidate_admin_auth(username)
+            username_index.remove(username)
+
+        result = {
+            'deleted_count': len(deleted_usernames),
+            'released_student_count': released_count,
+            'deleted_usernames': deleted_usernames
+        }
+        message = f'成功删除 {len(deleted_usernames)} 个用户，释放 {released_count} 个学号'
+        if usernames is not None:
+            result['not_deleted_count'] = len(usernames) - len(deleted_usernames)
+            if result['not_deleted_count']:
+                message += f'，{result["not_deleted_count"]} 个用户不存在或不能删除'
+
         return jsonify({
             'success': True,
-            'message': f'用户 {target_username} 已成功删除'
+            'message': message,
+            'data': result
         })
 
     except Exception as e:
         db.session.rollback()
-        return jsonify({'success': False, 'message': f'删除用户失败: {str(e)}'}), 500
+        return jsonify({'success': False, 'message': f'批量删除用户失败: {str(e)}'}), 500
 
 
 @app.route('/api/user/delete_self', methods=['POST'])
@@ -2212,6 +3293,8 @@ def user_delete_self():
         # 删除用户
         db.session.delete(user)
         db.session.commit()
+        invalidate_admin_auth(username)
+        username_index.remove(username)
 
         return jsonify({
             'success': True,
@@ -2223,6 +3306,175 @@ def user_delete_self():
         return jsonify({'success': False, 'message': f'删除账号失败: {str(e)}'}), 500
 
 
+# 批量操作：一次请求执行多个管理操作
+BATCH_MAX_OPERATIONS = 1000
+
+
+def begin_outer_transaction():
+    """
+    pysqlite 只在 INSERT/UPDATE/DELETE 前隐式 BEGIN，在事务外执行的 SAVEPOINT 释放时会直接提交；
+    使用保存点之前先显式开启事务，保证所有操作在同一事务中、由最后的 commit 统一提交
+    """
+    connection = db.session.connection()
+    if connection.dialect.name == 'sqlite' and not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN')
+
+
+def batch_import_students(operation, admin_user):
+    students = operation.get('students', [])
+    if not isinstance(students, list):
+        return {'success': False, 'status': 400, 'message': '学号数据格式错误，应为数组'}, None
+    new_rows, duplicate_count, error_count = add_students(students)
+    result = {
+        'success': True,
+        'status': 200,
+        'message': f'成功导入 {len(new_rows)} 个学号',
+        'data': {
+            'imported_count': len(new_rows),
+            'duplicate_count': duplicate_count,
+            'error_count': error_count
+        }
+    }
+    return result, lambda: add_students_to_indexes(new_rows)
+
+
+def batch_delete_student(operation, admin_user):
+    student_id = (operation.get('student_id') or '').strip()
+    if not student_id:
+        return {'success': False, 'status': 400, 'message': '请提供学号'}, None
+    error = delete_student_record(student_id)
+    if error:
+        return {'success': False, 'status': error[1], 'message': error[0]}, None
+    return ({'success': True, 'status': 200, 'message': f'学号 {student_id} 已成功删除'},
+            lambda: remove_student_from_indexes(student_id))
+
+
+def batch_delete_user(operation, admin_user):
+    target_username = (operation.get('target_username') or '').strip()
+    if not target_username:
+        return {'success': False, 'status': 400, 'message': '请提供目标用户名'}, None
+    error = delete_user_account(target_username, admin_user)
+    if error:
+        return {'success': False, 'status': error[1], 'message': error[0]}, None
+    return ({'success': True, 'status': 200, 'message': f'用户 {target_username} 已成功删除'},
+            lambda: username_index.remove(target_username))
+
+
+# 操作名 -> 处理函数；处理函数只修改会话，返回 (结果, 提交后更新检索索引的回调)
+BATCH_OPERATIONS = {
+    'import_students': batch_import_students,
+    'delete_student': batch_delete_student,
+    'delete_user': batch_delete_user,
+}
+
+
+@app.route('/api/batch', methods=['POST'])
+def batch():
+    """
+    批量执行管理操作
+    只验证一次管理员身份，operations 按顺序执行，每个操作使用一个保存点，
+    失败的操作单独回滚，其余操作最后统一提交一次；
+    atomic=true 时任一操作失败则全部回滚；chunk_size>0 时每执行 chunk_size 个操作提交一次
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'message': '请求数据为空'}), 400
+
+        admin_username = data.get('admin_username', '').strip()
+        admin_password = data.get('admin_password', '')
+        operations = data.get('operations', [])
+        atomic = bool(data.get('atomic', False))
+
+        if not admin_username or not admin_password:
+            return jsonify({'success': False, 'message': '请提供管理员账号和密码'}), 400
+
+        if not isinstance(operations, list):
+            return jsonify({'success': False, 'message': '操作列表格式错误，应为数组'}), 400
+
+        if len(operations) > BATCH_MAX_OPERATIONS:
+            return jsonify({'success': False, 'message': f'单次最多执行 {BATCH_MAX_OPERATIONS} 个操作'}), 400
+
+        try:
+            chunk_size = int(data.get('chunk_size') or 0)
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'chunk_size 格式错误'}), 400
+
+        # 验证管理员身份
+        admin_user = verify_admin(admin_username, admin_password)
+        if not admin_user:
+            return jsonify({'success': False, 'message': '管理员身份验证失败'}), 401
+
+        results = []
+        pending_callbacks = []
+        commit_count = 0
+        failed_index = None
+        begin_outer_transaction()
+
+        for i, operation in enumerate(operations):
+            op_name = operation.get('op') if isinstance(operation, dict) else None
+            handler = BATCH_OPERATIONS.get(op_name)
+            if handler is None:
+                result, callback = {'success': False, 'status': 400, 'message': f'不支持的操作: {op_name}'}, None
+            else:
+                savepoint = db.session.begin_nested()
+                try:
+                    result, callback = handler(operation, admin_user)
+                    savepoint.commit()
+                except Exception as e:
+                    savepoint.rollback()
+                    result, callback = {'success': False, 'status': 500, 'message': f'操作失败: {str(e)}'}, None
+
+            result.update({'index': i, 'op': op_name})
+            results.append(result)
+            if callback is not None:
+                pending_callbacks.append(callback)
+
+            if not result['success'] and atomic:
+                failed_index = i
+                break
+
+            if not atomic and chunk_size > 0 and (i + 1) % chunk_size == 0:
+                db.session.commit()
+                commit_count += 1
+                for callback in pending_callbacks:
+                    callback()
+                pending_callbacks = []
+                begin_outer_transaction()
+
+        if failed_index is not None:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'message': f'第 {failed_index + 1} 个操作失败，已回滚全部操作',
+                'data': {
+                    'rolled_back': True,
+                    'results': results
+                }
+            }), results[failed_index]['status']
+
+        db.session.commit()
+        commit_count += 1
+        for callback in pending_callbacks:
+            callback()
+
+        succeeded = sum(1 for result in results if result['success'])
+        return jsonify({
+            'success': True,
+            'message': f'执行 {len(results)} 个操作，成功 {succeeded} 个，失败 {len(results) - succeeded} 个',
+            'data': {
+                'succeeded': succeeded,
+                'failed': len(results) - succeeded,
+                'commits': commit_count,
+                'results': results
+            }
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'批量操作失败: {str(e)}'}), 500
+
+
 @app.route('/api/admin/list_users', methods=['POST'])
 def list_users():
     """列出所有用户（管理员功能）"""
@@ -2237,39 +3489,203 @@ def list_users():
         if not admin_username or not admin_password:
             return jsonify({'success': False, 'message': '请提供管理员账号和密码'}), 400
 
-        # 验证管理员身份
-        admin_user = User.query.filter_by(username=admin_username).first()
-        if not admin_user or not admin_user.check_password(admin_password):
+        try:
+            page_params = get_page_params(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+
+        # 验证管理员身份（先于条件请求判断）
+        if not verify_admin(admin_username, admin_password):
             return jsonify({'success': False, 'message': '管理员身份验证失败'}), 401
 
-        users = User.query.all()
-        return jsonify({
+        # 数据未变化时直接返回 304
+        etag = make_list_etag(User.__tablename__, data)
+        if request.if_none_match.contains_weak(etag):
+            return not_modified_response(etag)
+
+        if page_params is None:
+            users = User.query.all()
+            response = jsonify({
+                'success': True,
+                'data': {
+                    'users': [user.to_dict() for user in users],
+                    'total': len(users)
+                }
+            })
+            response.set_etag(etag, weak=True)
+            return response
+
+        # 键集分页：按主键顺序取下一页，多取一条用于判断是否还有更多
+        after_id, limit = page_params
+        users = User.query.filter(User.id > after_id).order_by(User.id).limit(limit + 1).all()
+        has_more = len(users) > limit
+        users = users[:limit]
+        response = jsonify({
             'success': True,
             'data': {
                 'users': [user.to_dict() for user in users],
-                'total': len(users)
+                'total': db.session.query(func.count(User.id)).scalar(),
+                'has_more': has_more,
+                'next_after_id': users[-1].id if users else after_id
             }
         })
+        response.set_etag(etag, weak=True)
+        return response
     except Exception as e:
         return jsonify({'success': False, 'message': f'获取用户列表失败: {str(e)}'}), 500
 
 
+@app.route('/api/admin/pool_stats', methods=['POST'])
+def admin_pool_stats():
+    """数据库连接池状态（管理员功能）"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'message': '请求数据为空'}), 400
+
+        admin_username = data.get('admin_username', '').strip()
+        admin_password = data.get('admin_password', '')
+
+        if not admin_username or not admin_password:
+            return jsonify({'success': False, 'message': '请提供管理员账号和密码'}), 400
+
+        # 验证管理员身份
+        if not verify_admin(admin_username, admin_password):
+            return jsonify({'success': False, 'message': '管理员身份验证失败'}), 401
+
+        return jsonify({
+            'success': True,
+            'data': pool_status(db.engine)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'获取连接池状态失败: {str(e)}'}), 500
+
+
+@app.route('/api/admin/slow_queries', methods=['POST'])
+def admin_slow_queries():
+    """慢查询汇总（管理员功能）；reset 为 true 时返回后清空"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'message': '请求数据为空'}), 400
+
+        admin_username = data.get('admin_username', '').strip()
+        admin_password = data.get('admin_password', '')
+
+        if not admin_username or not admin_password:
+            return jsonify({'success': False, 'message': '请提供管理员账号和密码'}), 400
+
+        try:
+            limit = max(1, min(int(data.get('limit') or 50), 1000))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'limit 格式错误'}), 400
+
+        # 验证管理员身份
+        if not verify_admin(admin_username, admin_password):
+            return jsonify({'success': False, 'message': '管理员身份验证失败'}), 401
+
+        summary = slow_query_log.summary(limit)
+        if data.get('reset'):
+            slow_query_log.reset()
+        return jsonify({
+            'success': True,
+            'data': summary
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'获取慢查询失败: {str(e)}'}), 500
+
+
+@app.route('/api/admin/snapshot', methods=['POST'])
+def admin_snapshot():
+    """立即执行一次内存数据库快照（管理员功能）"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'message': '请求数据为空'}), 400
+
+        admin_username = data.get('admin_username', '').strip()
+        admin_password = data.get('admin_password', '')
+
+        if not admin_username or not admin_password:
+            return jsonify({'success': False, 'message': '请提供管理员账号和密码'}), 400
+
+        # 验证管理员身份
+        if not verify_admin(admin_username, admin_password):
+            return jsonify({'success': False, 'message': '管理员身份验证失败'}), 401
+
+        if snapshot_manager is None:
+            return jsonify({'success': False, 'message': '未启用快照（需内存数据库并设置 SNAPSHOT_DIR）'}), 400
+
+        path = snapshot_manager.snapshot(force=True)
+        return jsonify({
+            'success': True,
+            'message': f'快照已保存: {path}',
+            'data': snapshot_manager.status()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'快照失败: {str(e)}'}), 500
+
+
+def has_metrics_token():
+    """请求是否携带了正确的 METRICS_TOKEN（Authorization: Bearer <token>）；未设置 METRICS_TOKEN 时为 False"""
+    token = os.environ.get('METRICS_TOKEN')
+    return bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Prometheus 格式的运行时指标；设置 METRICS_TOKEN 后需要携带 Authorization: Bearer <token>"""
+    if os.environ.get('METRICS_TOKEN') and not has_metrics_token():
+        return jsonify({'success': False, 'message': '未授权'}), 401
+    return app.response_class(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({
-        'success': True,
-        'data': {
-            'status': 'healthy',
-            'timestamp': datetime.utcnow().isoformat(),
-            'database': 'connected',
-            'deployment':'vercel'
-        }
-    })
+    """
+    兼容原有格式的健康检查，数据库状态来自实际探测；只有数据库不可用时返回 503，探测过慢（degraded）仍返回 200
+    只返回原有字段，携带 METRICS_TOKEN 时附带探测耗时和启动耗时
+    """
+    report, _ = readiness(db.engine)
+    available = report['status'] != 'unhealthy'
+    data = {
+        'status': report['status'],
+        'timestamp': datetime.utcnow().isoformat(),
+        'database': report['database']['status'],
+        'deployment':'vercel'
+    }
+    if has_metrics_token():
+        data['database_latency_ms'] = report['database']['latency_ms']
+        data['startup'] = startup_timings
+    return jsonify({'success': available, 'data': data}), 200 if available else 503
+
+
+@app.route('/api/health/live', methods=['GET'])
+def health_live():
+    """存活检查：不访问数据库；携带 METRICS_TOKEN 时附带进程信息"""
+    report = liveness()
+    return jsonify({'success': True, 'data': report if has_metrics_token() else {'status': report['status']}})
+
+
+@app.route('/api/health/ready', methods=['GET'])
+def health_ready():
+    """就绪检查：数据库探测失败或过慢时返回 503；携带 METRICS_TOKEN 时返回详细状态，否则只返回状态"""
+    report, ready = readiness(db.engine, pool_status)
+    if has_metrics_token():
+        report['startup'] = startup_timings
+    else:
+        report = {'status': report['status']}
+    return jsonify({'success': ready, 'data': report}), 200 if ready else 503
+
+
+startup_timings['import_ms'] = round((time.perf_counter() - _import_started) * 1000, 2)
 
 
 if __name__ == '__main__':
     print("🚀 启动知识库问答系统...")
-    print("📊 数据库文件: users.db")
+    with app.app_context():
+        # DATABASE_URL 中可能包含数据库密码，只显示脱敏后的地址
+        print(f"📊 数据库: {db.engine.url.render_as_string(hide_password=True)}")
     print("🌐 访问地址: http://localhost:5000")
     print("👨‍💼 默认管理员: admin / admin123")
     print("🎓 登录方式: 学号登录")
@@ -0,0 +1,304 @@
+"""
+ASGI 异步服务入口
+登录、注册是突发流量最大的接口，这里改写为原生异步视图：
+密码哈希（PBKDF2，hashlib 计算期间释放 GIL）放到专用线程池，数据库查询/提交放到另一个线程池，
+事件循环只负责收发请求，等待中的请求只占一个协程，单进程即可同时挂起数千个登录/注册请求。
+其余路由（页面、管理接口等）通过内置的 WSGI 适配器在线程池中执行 Flask 视图。
+
+原生处理的登录、注册不经过 Flask 请求钩子和 WSGI 中间件：请求指标（metrics）和流量录制（traffic_recorder）
+在这里单独记录；响应压缩（响应只有几百字节，低于压缩阈值）、按请求剖析（profiling）和
+SQL 统计（sql_monitor 的每请求计数）不适用于这两个接口，需要剖析时请用 WSGI 模式。
+
+用法：
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+线程池大小：
+    ASGI_KDF_WORKERS   密码哈希线程数，默认 CPU 核数
+    ASGI_DB_WORKERS    数据库线程数，默认 8；文件/网络数据库时不宜超过连接池容量
+    ASGI_WSGI_WORKERS  执行其余 Flask 视图的线程数，默认 16
+"""
+import asyncio
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import metrics
+from health import register_reporter
+
+from app import (app, check_registration, create_registered_user, db, find_login_user, init_db,
+                 parse_registration, record_login, traffic_recorder)
+
+KDF_WORKERS = int(os.environ.get('ASGI_KDF_WORKERS', str(os.cpu_count() or 4)))
+DB_WORKERS = int(os.environ.get('ASGI_DB_WORKERS', '8'))
+WSGI_WORKERS = int(os.environ.get('ASGI_WSGI_WORKERS', '16'))
+MAX_BODY_SIZE = int(os.environ.get('ASGI_MAX_BODY_SIZE', str(16 * 1024 * 1024)))  # 字节
+
+kdf_executor = ThreadPoolExecutor(KDF_WORKERS, thread_name_prefix='asgi-kdf')
+db_executor = ThreadPoolExecutor(DB_WORKERS, thread_name_prefix='asgi-db')
+wsgi_executor = ThreadPoolExecutor(WSGI_WORKERS, thread_name_prefix='asgi-wsgi')
+
+
+def executor_status():
+    """各线程池的线程数和排队任务数，排队持续增长说明对应线程池已饱和"""
+    return {
+        name: {'max_workers': executor._max_workers, 'threads': len(executor._threads),
+               'queued': executor._work_queue.qsize()}
+        for name, executor in (('kdf', kdf_executor), ('db', db_executor), ('wsgi', wsgi_executor))
+    }
+
+
+register_reporter('asgi_executors', executor_status)
+
+
+class AsyncHandlerError(Exception):
+    """异步视图中需要直接返回给客户端的错误"""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _in_app_context(func, *args):
+    """在应用上下文中执行数据库操作，结束时由 Flask-SQLAlchemy 回收会话"""
+    with app.app_context():
+        try:
+            return func(*args)
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+async def run_db(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(db_executor, _in_app_context, func, *args)
+
+
+async def run_kdf(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(kdf_executor, func, *args)
+
+
+# 原生异步视图：与 app.py 中的同步视图使用同一组阶段函数，返回 (响应数据, 状态码)
+async def register(data):
+    fields, error = parse_registration(data)
+    if error:
+        raise AsyncHandlerError(error, 400)
+
+    error = await run_db(check_registration, fields)
+    if error:
+        raise AsyncHandlerError(error, 400)
+
+    password_hash = await run_kdf(generate_password_hash, fields['password'])
+    user, error = await run_db(create_registered_user, fields, password_hash)
+    if error:
+        raise AsyncHandlerError(error, 400)
+
+    return {'success': True, 'message': '注册成功', 'data': {'user': user}}, 201
+
+
+async def login(data):
+    student_id = data.get('student_id', '').strip()
+    password = data.get('password', '')
+
+    if not student_id or not password:
+        raise AsyncHandlerError('请输入学号和密码', 400)
+
+    found = await run_db(find_login_user, student_id)
+    if not found or not await run_kdf(check_password_hash, found[1], password):
+        raise AsyncHandlerError('学号或密码错误', 401)
+
+    user = await run_db(record_login, found[0])
+    return {'success': True, 'message': '登录成功', 'data': {'user': user}}, 200
+
+
+ASYNC_ROUTES = {
+    '/api/register': (register, '注册失败'),
+    '/api/login': (login, '登录失败'),
+}
+
+
+async def read_body(receive):
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_SIZE:
+            raise AsyncHandlerError('请求数据过大', 413)
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def send_response(send, status, headers, body):
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_json(send, scope, payload, status):
+    """发送 JSON 响应，返回响应体字节数"""
+    # 与 jsonify 的输出格式一致
+    body = app.json.dumps_bytes(payload) + b'\n'
+    headers = [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode('latin-1')),
+    ]
+    # 与 flask-cors 的默认配置一致：允许任意来源
+    if any(name == b'origin' for name, _ in scope.get('headers', ())):
+        headers.append((b'access-control-allow-origin', b'*'))
+    await send_response(send, status, headers, body)
+    return len(body)
+
+
+def is_json_request(scope):
+    for name, value in scope.get('headers', ()):
+        if name == b'content-type':
+            mimetype = value.split(b';', 1)[0].strip().lower()
+            return mimetype == b'application/json' or (
+                mimetype.startswith(b'application/') and mimetype.endswith(b'+json'))
+    return False
+
+
+def build_environ(scope, body):
+    """把 ASGI 请求转换为 WSGI environ（PEP 3333）"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = 'HTTP_' + name
+        environ[key] = environ[key] + ',' + value if key in environ else value
+    return environ
+
+
+def call_wsgi(environ):
+    """在线程池中执行 Flask 应用，返回 (状态码, 响应头, 响应体)"""
+    response = {}
+    chunks = []
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+        return chunks.append
+
+    iterable = app.wsgi_app(environ, start_response)
+    try:
+        chunks.extend(iterable)
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+    return response['status'], response['headers'], b''.join(chunks)
+
+
+async def handle_wsgi(scope, send, body):
+    loop = asyncio.get_running_loop()
+    status, headers, payload = await loop.run_in_executor(wsgi_executor, call_wsgi, build_environ(scope, body))
+    await send_response(send, status, headers, payload)
+
+
+async def handle_http(scope, receive, send):
+    try:
+        body = await read_body(receive)
+    except AsyncHandlerError as e:
+        await send_json(send, scope, {'success': False, 'message': e.message}, e.status)
+        return
+    if body is None:
+        return
+
+    route = ASYNC_ROUTES.get(scope['path'])
+    data = None
+    if route and scope['method'] == 'POST' and is_json_request(scope):
+        try:
+            data = app.json.loads(body)
+        except ValueError:
+            data = None
+    # 非 JSON 请求、预检请求等交给 Flask 处理，错误响应与同步模式完全一致
+    if data is None or not isinstance(data, dict):
+        await handle_wsgi(scope, send, body)
+        return
+
+    handler, failure_prefix = route
+    # 不经过 Flask 的请求钩子和 WSGI 中间件，在这里记录请求指标和录制流量
+    recording = None
+    if traffic_recorder is not None and traffic_recorder.should_record(scope['path']):
+        recording_started = time.perf_counter()
+        recording = traffic_recorder.start(
+            'POST', scope['path'], scope.get('query_string', b'').decode('latin-1'),
+            'application/json', body, len(body))
+    started = metrics.request_started('POST', scope['path'])
+    status = 500
+    try:
+        if not data:
+            payload, status = {'success': False, 'message': '请求数据为空'}, 400
+        else:
+            await run_db(init_db)
+            payload, status = await handler(data)
+    except AsyncHandlerError as e:
+        payload, status = {'success': False, 'message': e.message}, e.status
+    except Exception as e:
+        payload, status = {'success': False, 'message': f'{failure_prefix}: {str(e)}'}, 500
+    finally:
+        metrics.request_finished('POST', scope['path'], status, started)
+    response_bytes = 0
+    try:
+        response_bytes = await send_json(send, scope, payload, status)
+    finally:
+        if recording is not None:
+            traffic_recorder.finish(recording, recording_started, status, response_bytes)
+
+
+async def handle_lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                # 启动时完成数据库初始化，第一个请求不必等待
+                await run_db(init_db)
+            except Exception as e:
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            for executor in (kdf_executor, db_executor, wsgi_executor):
+                executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http':
+        await handle_http(scope, receive, send)
+    elif scope['type'] == 'lifespan':
+        await handle_lifespan(receive, send)
+    else:
+        raise NotImplementedError(f"不支持的连接类型: {scope['type']}")
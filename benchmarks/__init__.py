@@ -0,0 +1,8 @@
+"""
+性能基准测试
+    python -m benchmarks.bench_json    JSON 编码实现对比
+    python -m benchmarks.bench_api     各接口在不同数据规模下的延迟和吞吐量
+    python -m benchmarks.datagen       生成压测用的学号库和用户数据
+    python -m benchmarks.compare       对比两次 bench_api 结果，发现性能回归
+    python -m benchmarks.replay        回放 traffic_recorder 录制的流量
+"""
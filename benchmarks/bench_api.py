@@ -0,0 +1,367 @@
+"""
+API 基准测试
+在不同数据规模下逐个测试 /api/* 接口，统计 p50/p95/p99 延迟和吞吐量，结果保存为 JSON（包含原始样本），
+可以与之前保存的基准结果对比。
+
+默认通过 Flask 测试客户端在进程内测试（内存数据库，直接批量写入测试数据）；
+--url 指定已启动的服务地址时通过 HTTP 测试（经过真实的服务器、压缩和网络栈，测试数据通过接口导入）。
+
+用法：
+    python -m benchmarks.bench_api --sizes 1000 10000 100000
+    python -m benchmarks.bench_api --sizes 10000 --only login list_students_page --iterations 100
+    python -m benchmarks.bench_api --url http://127.0.0.1:5000 --sizes 1000 --concurrency 8
+    python -m benchmarks.bench_api --sizes 10000 --baseline benchmarks/results/baseline.json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from benchmarks.datagen import RosterGenerator, load_database
+
+ADMIN = {'admin_username': 'admin', 'admin_password': 'admin123'}
+# 测试用户统一使用与管理员相同的密码，进程内模式直接复用预先计算的密码哈希；测试数据由 datagen 生成
+USER_PASSWORD = 'admin123'
+# 批量删除用户场景每次删除的用户数
+BULK_USERS_PER_REQUEST = 10
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# 请求目标：进程内测试客户端 / HTTP 服务
+class InProcessTarget:
+    mode = 'in-process'
+
+    def __init__(self):
+        from app import app
+        self.app = app
+        self.client = app.test_client()
+
+    def request(self, method, path, payload=None):
+        started = time.perf_counter()
+        response = self.client.open(path, method=method, json=payload)
+        response.get_data()
+        return response.status_code, time.perf_counter() - started
+
+
+class HttpTarget:
+    mode = 'http'
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self._local = threading.local()
+
+    def _connection(self):
+        # 每个线程一个长连接
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            connection = self._local.connection = cls(self.host, self.port, timeout=120)
+        return connection
+
+    def request(self, method, path, payload=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'} if body else {}
+        started = time.perf_counter()
+        try:
+            connection = self._connection()
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            self._local.connection = None
+            raise
+        return response.status, time.perf_counter() - started
+
+
+# 测试数据
+def build_dataset(size, pools, seed=0):
+    """
+    用 datagen 生成本轮测试的数据：size 个普通学号，之后依次是供注册、删除场景消耗的学号和已注册用户的学号
+    预先创建的用户中，bench_user* 用于登录等场景，bench_bulk* / bench_self* 分别供批量删除和注销场景消耗
+    """
+    generator = RosterGenerator(seed)
+    names = [f'bench_user{i}' for i in range(pools['users'])]
+    names += [f'bench_bulk{i}' for i in range(pools['bulk'] * BULK_USERS_PER_REQUEST)]
+    names += [f'bench_self{i}' for i in range(pools['self'])]
+    total = size + pools['register'] + pools['delete'] + len(names)
+    students = list(generator.students(total))
+    register_students = students[size:size + pools['register']]
+    delete_students = students[size + pools['register']:size + pools['register'] + pools['delete']]
+    user_students = students[total - len(names):]
+    users = [generator.user(student, i, username) for i, (student, username) in enumerate(zip(user_students, names))]
+    return {
+        'size': size,
+        'students': students,
+        'users': users,
+        'user_student_ids': [user['student_id'] for user in users[:pools['users']]],
+        'register_users': [dict(generator.user(student, len(users) + i, f'bench_new{i}'), password=USER_PASSWORD)
+                           for i, student in enumerate(register_students)],
+        'delete_ids': [student['student_id'] for student in delete_students],
+        # 导入场景每次导入 100 个新学号，批量删除场景随后删除这些学号
+        'import_batches': [list(generator.students(100, start=total + i * 100)) for i in range(pools['import'])],
+        'id_prefixes': [student['student_id'][:8] for student in students[:size:max(size // 50, 1)]],
+    }
+
+
+def seed_in_process(target, dataset):
+    """清空数据后直接批量写入学号和用户，避免逐个注册时的密码哈希开销"""
+    from sqlalchemy import delete
+
+    from app import ADMIN_PASSWORD_HASH, StudentID, User, db, init_db
+    init_db()
+    with target.app.app_context():
+        db.session.execute(delete(User).where(User.username != 'admin'))
+        db.session.execute(delete(StudentID).where(StudentID.student_id != '00000000'))
+        db.session.commit()
+    users = {user['student_id']: user for user in dataset['users']}
+    load_database(((student, users.get(student['student_id'])) for student in dataset['students']),
+                  password_hash=ADMIN_PASSWORD_HASH)
+
+
+def seed_http(target, dataset):
+    """通过接口导入学号、注册用户；服务端应为空数据库"""
+    rows = dataset['students']
+    for start in range(0, len(rows), 5000):
+        status, _ = target.request('POST', '/api/admin/import_students', dict(ADMIN, students=rows[start:start + 5000]))
+        if status != 200:
+            raise RuntimeError(f'导入学号失败: HTTP {status}')
+    for user in dataset['users']:
+        status, _ = target.request('POST', '/api/register', dict(user, password=USER_PASSWORD))
+        if status not in (200, 201):
+            raise RuntimeError(f'注册测试用户失败: HTTP {status}')
+
+
+# 测试场景：(名称, 方法, 路径, 生成请求数据的函数, 类别)
+# 类别 read 可重复执行；kdf 每次都要计算密码哈希；write 修改数据；heavy 返回全部数据
+# 消耗预留数据的场景按 SCENARIO_POOLS 限制请求次数
+SCENARIOS = [
+    ('health', 'GET', '/api/health', None, 'read'),
+    ('metrics', 'GET', '/api/metrics', None, 'read'),
+    ('login', 'POST', '/api/login', lambda ctx, i: {
+        'student_id': ctx['user_student_ids'][i % len(ctx['user_student_ids'])], 'password': USER_PASSWORD}, 'kdf'),
+    ('login_wrong_password', 'POST', '/api/login', lambda ctx, i: {
+        'student_id': ctx['user_student_ids'][0], 'password': 'wrong-password'}, 'kdf'),
+    ('send_verification_code', 'POST', '/api/auth/send_verification_code', lambda ctx, i: {
+        'student_id': ctx['user_student_ids'][i % len(ctx['user_student_ids'])], 'method': 'email'}, 'read'),
+    ('verify_code', 'POST', '/api/auth/verify_code', lambda ctx, i: {
+        'student_id': ctx['user_student_ids'][i % len(ctx['user_student_ids'])], 'code': '123456'}, 'read'),
+    ('list_students_page', 'POST', '/api/admin/list_students', lambda ctx, i: dict(
+        ADMIN, limit=200, after_id=(i * 997) % max(ctx['size'], 1)), 'read'),
+    ('list_students_all', 'POST', '/api/admin/list_students', lambda ctx, i: dict(ADMIN), 'heavy'),
+    ('list_users_page', 'POST', '/api/admin/list_users', lambda ctx, i: dict(ADMIN, limit=200), 'read'),
+    ('autocomplete_prefix', 'POST', '/api/admin/autocomplete_students', lambda ctx, i: dict(
+        ADMIN, q=ctx['id_prefixes'][i % len(ctx['id_prefixes'])], mode='prefix'), 'read'),
+    ('autocomplete_pinyin', 'POST', '/api/admin/autocomplete_students', lambda ctx, i: dict(
+        ADMIN, q=['wang', 'zw', 'lifang', 'zhangm'][i % 4], mode='pinyin'), 'read'),
+    ('search_users', 'POST', '/api/admin/search_users', lambda ctx, i: dict(ADMIN, q='bench'), 'read'),
+    ('pool_stats', 'POST', '/api/admin/pool_stats', lambda ctx, i: dict(ADMIN), 'read'),
+    ('register', 'POST', '/api/register', lambda ctx, i: ctx['register_users'][i], 'kdf'),
+    ('import_students', 'POST', '/api/admin/import_students', lambda ctx, i: dict(
+        ADMIN, students=ctx['import_batches'][i]), 'write'),
+    ('delete_student', 'POST', '/api/admin/delete_student', lambda ctx, i: dict(
+        ADMIN, student_id=ctx['delete_ids'][i]), 'write'),
+    ('batch_delete', 'POST', '/api/batch', lambda ctx, i: dict(ADMIN, operations=[
+        {'op': 'delete_student', 'student_id': row['student_id']} for row in ctx['import_batches'][i][:10]]), 'write'),
+    ('bulk_delete_students', 'POST', '/api/admin/bulk_delete_students', lambda ctx, i: dict(
+        ADMIN, student_ids=[row['student_id'] for row in ctx['import_batches'][i]]), 'write'),
+    ('delete_user', 'POST', '/api/admin/delete_user', lambda ctx, i: dict(
+        ADMIN, target_username=f'bench_new{i}'), 'write'),
+    ('bulk_delete_users', 'POST', '/api/admin/bulk_delete_users', lambda ctx, i: dict(ADMIN, usernames=[
+        f'bench_bulk{j}' for j in range(i * BULK_USERS_PER_REQUEST, (i + 1) * BULK_USERS_PER_REQUEST)]), 'write'),
+    ('reset_password_invalid', 'POST', '/api/auth/reset_password', lambda ctx, i: {
+        'reset_token': f'invalid-{i}', 'new_password': USER_PASSWORD}, 'read'),
+    ('delete_self', 'POST', '/api/user/delete_self', lambda ctx, i: {
+        'username': f'bench_self{i}', 'password': USER_PASSWORD}, 'kdf'),
+]
+
+SCENARIO_POOLS = {
+    'register': 'register',
+    'delete_user': 'register',
+    'delete_student': 'delete',
+    'import_students': 'import',
+    'batch_delete': 'import',
+    'bulk_delete_students': 'import',
+    'bulk_delete_users': 'bulk',
+    'delete_self': 'self',
+}
+
+
+def percentile(sorted_values, fraction):
+    """线性插值百分位数"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(samples, errors, statuses, wall_seconds):
+    ordered = sorted(samples)
+    return {
+        'count': len(samples),
+        'errors': errors,
+        'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 3) if ordered else None,
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 3) if ordered else None,
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 3) if ordered else None,
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3) if ordered else None,
+        'max_ms': round(ordered[-1] * 1000, 3) if ordered else None,
+        'throughput_rps': round(len(samples) / wall_seconds, 2) if wall_seconds > 0 else None,
+        'samples_ms': [round(value * 1000, 4) for value in samples],
+    }
+
+
+def run_scenario(target, scenario, ctx, iterations, concurrency, warmup):
+    name, method, path, make_payload, kind = scenario
+    if kind == 'read':
+        for i in range(warmup):
+            target.request(method, path, make_payload(ctx, i) if make_payload else None)
+
+    samples = []
+    errors = 0
+    statuses = {}
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal errors
+        try:
+            status, elapsed = target.request(method, path, make_payload(ctx, i) if make_payload else None)
+        except Exception:
+            status, elapsed = None, None
+        with lock:
+            statuses[status] = statuses.get(status, 0) + 1
+            # 4xx 是场景本身预期的结果（如密码错误），只有 5xx 和连接失败计为错误
+            if status is None or status >= 500:
+                errors += 1
+            if elapsed is not None:
+                samples.append(elapsed)
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as executor:
+            list(executor.map(one, range(iterations)))
+    else:
+        for i in range(iterations):
+            one(i)
+    return summarize(samples, errors, statuses, time.perf_counter() - started)
+
+
+def iterations_for(kind, args):
+    return {'kdf': args.kdf_iterations, 'heavy': args.heavy_iterations}.get(kind, args.iterations)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare_to_baseline(results, baseline):
+    """打印与基准结果的 p50 / p95 对比；统计检验见 benchmarks/compare.py"""
+    print(f"\n{'size':>7}  {'scenario':<24} {'p50 base':>9} {'p50 now':>9} {'Δp50':>8} {'p95 base':>9} {'p95 now':>9} {'Δp95':>8}")
+    for size, scenarios in results.items():
+        for name, current in scenarios.items():
+            base = baseline.get('results', {}).get(size, {}).get(name)
+            if not base or not base.get('p50_ms') or not current.get('p50_ms'):
+                continue
+            d50 = (current['p50_ms'] / base['p50_ms'] - 1) * 100
+            d95 = (current['p95_ms'] / base['p95_ms'] - 1) * 100
+            print(f"{size:>7}  {name:<24} {base['p50_ms']:>9.2f} {current['p50_ms']:>9.2f} {d50:>+7.1f}% "
+                  f"{base['p95_ms']:>9.2f} {current['p95_ms']:>9.2f} {d95:>+7.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='API 基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='学号库规模')
+    parser.add_argument('--users', type=int, default=200, help='预先创建的用户数')
+    parser.add_argument('--iterations', type=int, default=50, help='普通场景的请求次数')
+    # 以下两项的默认值高于 compare.py 的 --min-samples（5），且每组不少于 8 个样本，检验结果才可靠
+    parser.add_argument('--kdf-iterations', type=int, default=10, help='需要计算密码哈希的场景的请求次数')
+    parser.add_argument('--heavy-iterations', type=int, default=8, help='返回全部数据的场景的请求次数')
+    parser.add_argument('--seed', type=int, default=0, help='测试数据的随机种子')
+    parser.add_argument('--warmup', type=int, default=2, help='只读场景的预热请求次数')
+    parser.add_argument('--concurrency', type=int, default=1, help='并发请求数')
+    parser.add_argument('--only', nargs='+', help='只运行指定场景')
+    parser.add_argument('--url', help='测试已启动的服务，如 http://127.0.0.1:5000')
+    parser.add_argument('--output', help='结果文件，默认 benchmarks/results/bench-<时间>.json')
+    parser.add_argument('--baseline', help='与之对比的基准结果文件')
+    args = parser.parse_args(argv)
+
+    scenarios = [s for s in SCENARIOS if not args.only or s[0] in args.only]
+    unknown = set(args.only or ()) - {s[0] for s in SCENARIOS}
+    if unknown:
+        parser.error('未知场景: ' + ', '.join(sorted(unknown)) + '；可用场景: ' + ', '.join(s[0] for s in SCENARIOS))
+
+    target = HttpTarget(args.url) if args.url else InProcessTarget()
+    if args.url and len(args.sizes) > 1:
+        parser.error('HTTP 模式下每次只能测试一种规模（服务端数据无法重置）')
+
+    pools = {
+        'users': max(args.users, 1),
+        'register': max(args.kdf_iterations, 1),
+        'delete': max(args.iterations, 1),
+        'bulk': max(args.kdf_iterations, 1),
+        'self': max(args.kdf_iterations, 1),
+        'import': max(args.iterations, 1),
+    }
+    results = {}
+    for size in args.sizes:
+        print(f'\n== 学号库规模 {size} ==')
+        started = time.perf_counter()
+        ctx = build_dataset(size, pools, args.seed)
+        (seed_http if args.url else seed_in_process)(target, ctx)
+        print(f'准备数据耗时 {time.perf_counter() - started:.1f}s')
+        results[str(size)] = {}
+        print(f"{'scenario':<24} {'n':>5} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rps':>9}")
+        for scenario in scenarios:
+            iterations = iterations_for(scenario[4], args)
+            if scenario[0] in SCENARIO_POOLS:
+                iterations = min(iterations, pools[SCENARIO_POOLS[scenario[0]]])
+            summary = run_scenario(target, scenario, ctx, iterations, args.concurrency, args.warmup)
+            results[str(size)][scenario[0]] = summary
+            print(f"{scenario[0]:<24} {summary['count']:>5} {summary['errors']:>4} {summary['p50_ms'] or 0:>9.2f} "
+                  f"{summary['p95_ms'] or 0:>9.2f} {summary['p99_ms'] or 0:>9.2f} {summary['throughput_rps'] or 0:>9.1f}")
+
+    output = {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(),
+            'git_revision': git_revision(),
+            'mode': target.mode,
+            'url': args.url,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'concurrency': args.concurrency,
+            'users': args.users,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    path = args.output or os.path.join(RESULTS_DIR, f"bench-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(output, f, ensure_ascii=False, indent=1)
+    print(f'\n结果已保存: {path}')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            compare_to_baseline(results, json.load(f))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+JSON 编码基准：对比 Flask 默认的标准库编码与 FastJSONProvider（orjson / 标准库回退）
+模拟 list_students 返回大量学号记录时的编码开销，旧实现的耗时包含 to_dict() 中逐行 isoformat()
+
+用法：
+    python -m benchmarks.bench_json --rows 40000 --repeat 7
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import json_provider
+from json_provider import FastJSONProvider
+
+
+def make_rows(count):
+    """与 StudentID.to_dict() 结构相同的记录，created_at 为 datetime"""
+    base = datetime(2024, 9, 1, 8, 0, 0)
+    return [{
+        'id': i + 1,
+        'student_id': f'2024{i:06d}',
+        'name': f'学生{i}',
+        'department': '信息与电气工程学院',
+        'major': '计算机科学与技术',
+        'class_name': f'计科{i % 40 + 1}班',
+        'is_used': i % 3 == 0,
+        'created_at': base + timedelta(seconds=i * 37, microseconds=i % 1000)
+    } for i in range(count)]
+
+
+def flask_default_response(app, rows):
+    """改造前：to_dict() 逐行 isoformat()，再由 Flask 默认 Provider 编码"""
+    provider = DefaultJSONProvider(app)
+    converted = [dict(row, created_at=row['created_at'].isoformat()) for row in rows]
+    return provider.response({'success': True, 'data': {'students': converted}}).get_data()
+
+
+def fast_response(app, rows):
+    provider = FastJSONProvider(app)
+    return provider.response({'success': True, 'data': {'students': rows}}).get_data()
+
+
+def fast_stdlib_response(app, rows):
+    """未安装 orjson 时的回退路径"""
+    saved = json_provider.orjson
+    json_provider.orjson = None
+    try:
+        return fast_response(app, rows)
+    finally:
+        json_provider.orjson = saved
+
+
+def measure(func, app, rows, repeat):
+    timings = []
+    size = 0
+    with app.app_context():
+        func(app, rows)  # 预热
+        for _ in range(repeat):
+            started = time.perf_counter()
+            size = len(func(app, rows))
+            timings.append(time.perf_counter() - started)
+    return timings, size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='JSON 编码基准测试')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 40000])
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    app = Flask(__name__)
+    cases = [('flask-default', flask_default_response), ('fast-stdlib', fast_stdlib_response)]
+    if json_provider.orjson is not None:
+        cases.append(('fast-orjson', fast_response))
+    else:
+        print('未安装 orjson，只对比标准库实现')
+
+    print(f"{'rows':>7}  {'encoder':<14} {'median ms':>10} {'min ms':>9} {'size KB':>9} {'speedup':>8}")
+    for count in args.rows:
+        rows = make_rows(count)
+        baseline = None
+        for name, func in cases:
+            timings, size = measure(func, app, rows, args.repeat)
+            median = statistics.median(timings)
+            baseline = baseline or median
+            print(f'{count:>7}  {name:<14} {median * 1000:>10.2f} {min(timings) * 1000:>9.2f} '
+                  f'{size / 1024:>9.1f} {baseline / median:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
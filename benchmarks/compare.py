@@ -0,0 +1,190 @@
+"""
+基准结果对比（性能回归检查）
+对比两份 bench_api 的结果文件，逐个接口检验延迟分布是否变化：
+    - Mann-Whitney U 检验（正态近似，含结校正），不假设延迟服从正态分布
+    - 中位数变化超过 --max-regression 且检验显著时判定为回归；p95 变化按 --max-p95-regression 同样判定
+    - 5xx / 连接错误比基准增多也判定为回归
+    - 样本数少于 --min-samples 的接口判定为 insufficient，无法检验；加 --strict 时同样视为失败
+有回归时退出码为 1，可直接用作部署前的检查步骤（CI 中建议加 --strict，避免样本不足的接口被放过）。
+
+用法：
+    python -m benchmarks.compare baseline.json current.json
+    python -m benchmarks.compare baseline.json current.json --max-regression 5 --threshold register=30 --threshold login=30
+    python -m benchmarks.compare baseline.json current.json --strict
+"""
+import argparse
+import json
+import math
+import sys
+
+from benchmarks.bench_api import percentile
+
+
+def rank(values):
+    """平均秩（从 1 开始），返回 (秩列表, 各组相同值的个数)"""
+    order = sorted(range(len(values)), key=values.__getitem__)
+    ranks = [0.0] * len(values)
+    ties = []
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2 + 1
+        if j > i:
+            ties.append(j - i + 1)
+        i = j + 1
+    return ranks, ties
+
+
+def mann_whitney_u(a, b):
+    """
+    Mann-Whitney U 检验，返回 (U, 双侧 p 值)；U 为 a 的统计量
+    样本量较小时正态近似偏保守，每组至少 8 个样本时结果较可靠
+    """
+    n1, n2 = len(a), len(b)
+    if not n1 or not n2:
+        return None, None
+    ranks, ties = rank(list(a) + list(b))
+    u1 = sum(ranks[:n1]) - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    tie_term = sum(t ** 3 - t for t in ties) / (n * (n - 1)) if n > 1 else 0
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term)
+    if variance <= 0:
+        return u1, 1.0
+    # 连续性校正
+    z = (abs(u1 - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+    return u1, min(1.0, math.erfc(max(z, 0) / math.sqrt(2)))
+
+
+def change(base, current):
+    return (current / base - 1) * 100 if base else None
+
+
+def compare_scenario(base, current, max_regression, max_p95_regression, alpha, min_samples):
+    """对比一个接口，返回结果字典；verdict 为 regression / slower / improved / unchanged / insufficient"""
+    a, b = sorted(base.get('samples_ms') or []), sorted(current.get('samples_ms') or [])
+    result = {'base_n': len(a), 'current_n': len(b), 'reasons': []}
+    if len(a) < min_samples or len(b) < min_samples:
+        result['verdict'] = 'insufficient'
+    else:
+        _, p_value = mann_whitney_u(a, b)
+        base_p50, current_p50 = percentile(a, 0.5), percentile(b, 0.5)
+        base_p95, current_p95 = percentile(a, 0.95), percentile(b, 0.95)
+        result.update({
+            'base_p50_ms': base_p50, 'current_p50_ms': current_p50, 'p50_change': change(base_p50, current_p50),
+            'base_p95_ms': base_p95, 'current_p95_ms': current_p95, 'p95_change': change(base_p95, current_p95),
+            'p_value': p_value,
+        })
+        significant = p_value is not None and p_value < alpha
+        if significant and (result['p50_change'] or 0) > max_regression:
+            result['reasons'].append(f"p50 +{result['p50_change']:.1f}% > {max_regression:g}%")
+        if significant and (result['p95_change'] or 0) > max_p95_regression:
+            result['reasons'].append(f"p95 +{result['p95_change']:.1f}% > {max_p95_regression:g}%")
+        if result['reasons']:
+            result['verdict'] = 'regression'
+        elif significant and (result['p50_change'] or 0) < -max_regression:
+            result['verdict'] = 'improved'
+        elif significant and (result['p50_change'] or 0) > 0:
+            result['verdict'] = 'slower'  # 显著变慢但未超过阈值
+        else:
+            result['verdict'] = 'unchanged'
+    if (current.get('errors') or 0) > (base.get('errors') or 0):
+        result['reasons'].append(f"errors {base.get('errors') or 0} -> {current.get('errors')}")
+        result['verdict'] = 'regression'
+    return result
+
+
+def compare(baseline, current, args):
+    thresholds = dict(args.threshold or ())
+    rows = []
+    for size, scenarios in current.get('results', {}).items():
+        base_scenarios = baseline.get('results', {}).get(size, {})
+        for name, current_result in scenarios.items():
+            if name not in base_scenarios:
+                rows.append((size, name, {'verdict': 'new', 'reasons': []}))
+                continue
+            rows.append((size, name, compare_scenario(
+                base_scenarios[name], current_result,
+                thresholds.get(name, args.max_regression),
+                thresholds.get(name, args.max_p95_regression),
+                args.alpha, args.min_samples)))
+        for name in base_scenarios:
+            if name not in scenarios:
+                rows.append((size, name, {'verdict': 'missing', 'reasons': []}))
+    return rows
+
+
+def _fmt(value, pattern):
+    return pattern.format(value) if value is not None else '-'
+
+
+def print_table(rows):
+    print(f"{'size':>7}  {'scenario':<24} {'n':>9} {'p50 base':>9} {'p50 now':>9} {'Δp50':>8} "
+          f"{'p95 base':>9} {'p95 now':>9} {'Δp95':>8} {'p':>7}  verdict")
+    for size, name, r in rows:
+        n = f"{r.get('base_n', '-')}/{r.get('current_n', '-')}"
+        print(f"{size:>7}  {name:<24} {n:>9} {_fmt(r.get('base_p50_ms'), '{:.2f}'):>9} "
+              f"{_fmt(r.get('current_p50_ms'), '{:.2f}'):>9} {_fmt(r.get('p50_change'), '{:+.1f}%'):>8} "
+              f"{_fmt(r.get('base_p95_ms'), '{:.2f}'):>9} {_fmt(r.get('current_p95_ms'), '{:.2f}'):>9} "
+              f"{_fmt(r.get('p95_change'), '{:+.1f}%'):>8} {_fmt(r.get('p_value'), '{:.4f}'):>7}  "
+              f"{r['verdict']}{'  (' + '; '.join(r['reasons']) + ')' if r['reasons'] else ''}")
+
+
+def parse_threshold(value):
+    name, sep, pct = value.partition('=')
+    try:
+        if not sep or not name:
+            raise ValueError
+        return name, float(pct)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'格式应为 场景=百分比，如 register=30: {value}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='对比两份 API 基准结果，发现性能回归')
+    parser.add_argument('baseline', help='基准结果文件')
+    parser.add_argument('current', help='本次结果文件')
+    parser.add_argument('--max-regression', type=float, default=10.0, help='中位数允许变慢的百分比，默认 10')
+    parser.add_argument('--max-p95-regression', type=float, default=25.0, help='p95 允许变慢的百分比，默认 25')
+    parser.add_argument('--threshold', type=parse_threshold, action='append',
+                        help='单个场景的阈值（同时用于中位数和 p95），如 register=30，可重复')
+    parser.add_argument('--alpha', type=float, default=0.05, help='显著性水平，默认 0.05')
+    parser.add_argument('--min-samples', type=int, default=5, help='样本数少于该值的场景不做判定')
+    parser.add_argument('--strict', action='store_true', help='样本不足（insufficient）的场景也视为失败')
+    parser.add_argument('--output', help='把对比结果写入 JSON 文件')
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+
+    base_meta, current_meta = baseline.get('meta', {}), current.get('meta', {})
+    print(f"基准: {args.baseline}（{base_meta.get('git_revision') or '?'}，{base_meta.get('mode') or '?'}）")
+    print(f"本次: {args.current}（{current_meta.get('git_revision') or '?'}，{current_meta.get('mode') or '?'}）")
+    if base_meta.get('mode') != current_meta.get('mode') or base_meta.get('cpu_count') != current_meta.get('cpu_count'):
+        print('⚠️ 两次测试的模式或机器配置不同，结果可能不可比')
+
+    rows = compare(baseline, current, args)
+    print_table(rows)
+    regressions = [(size, name) for size, name, r in rows if r['verdict'] == 'regression']
+    insufficient = [(size, name) for size, name, r in rows if r['verdict'] == 'insufficient']
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump([dict(r, size=size, scenario=name) for size, name, r in rows], f, ensure_ascii=False, indent=1)
+    if regressions:
+        print(f"\n❌ 发现 {len(regressions)} 处性能回归: " + ', '.join(f'{name}@{size}' for size, name in regressions))
+        return 1
+    if insufficient:
+        print(f"\n{'❌' if args.strict else '⚠️'} {len(insufficient)} 个场景样本不足（少于 {args.min_samples} 个），未做检验: "
+              + ', '.join(f'{name}@{size}' for size, name in insufficient))
+        if args.strict:
+            return 1
+    print('\n✅ 未发现性能回归')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""
+压测数据生成
+按随机种子确定性地生成学号库和用户数据，相同的种子和参数总是生成相同的数据：
+    - 学号：入学年份 + 学院代码 + 专业代码 + 班级序号 + 座号，每班 40 人，数量不限且不重复
+    - 姓名：按常见程度加权的姓氏 + 一到两个字的名
+    - 院系 / 专业 / 班级相互对应，班级名如“计科2401班”
+    - 手机号符合 1[3-9]\\d{9}，邮箱由姓名拼音和序号组成，两者都不重复
+数据以生成器逐条产出，可以输出为 JSON / CSV 文件，或直接批量写入数据库（用户共用一个预先计算的密码哈希）。
+
+用法：
+    python -m benchmarks.datagen --students 100000 --users 10000 --format csv --output data/
+    python -m benchmarks.datagen --students 100000 --users 10000 --format db     写入 DATABASE_URL 指定的数据库
+
+--format db 需要 DATABASE_URL 或 DB_MODE=file，默认的内存数据库随进程退出而丢失，会直接报错退出。
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import time
+
+# 姓氏及其相对权重（大致按人口比例）
+SURNAMES = [
+    ('王', 72), ('李', 71), ('张', 70), ('刘', 54), ('陈', 45), ('杨', 32), ('黄', 25), ('赵', 23),
+    ('吴', 21), ('周', 21), ('徐', 16), ('孙', 15), ('马', 13), ('朱', 13), ('胡', 12), ('郭', 11),
+    ('何', 10), ('林', 10), ('高', 10), ('罗', 9), ('郑', 9), ('梁', 8), ('谢', 7), ('宋', 6),
+    ('唐', 6), ('许', 6), ('韩', 6), ('冯', 5), ('邓', 5), ('曹', 5), ('彭', 5), ('曾', 5),
+    ('肖', 4), ('田', 4), ('董', 4), ('潘', 4), ('袁', 4), ('蔡', 3), ('蒋', 3), ('余', 3),
+    ('于', 3), ('杜', 3), ('叶', 3), ('程', 3), ('魏', 3), ('苏', 3), ('吕', 3), ('丁', 3),
+    ('任', 2), ('卢', 2), ('姚', 2), ('沈', 2), ('钟', 2), ('姜', 2), ('崔', 2), ('谭', 2),
+    ('陆', 2), ('范', 2), ('汪', 2), ('廖', 2), ('石', 2), ('金', 2), ('韦', 2), ('贾', 2),
+    ('夏', 1), ('付', 1), ('方', 1), ('邹', 1), ('熊', 1), ('白', 1), ('孟', 1), ('秦', 1),
+    ('欧阳', 1), ('司马', 1), ('诸葛', 1),
+]
+GIVEN_CHARS = (
+    '伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华建国文辉鹏宇浩然子轩梓涵欣怡雨晨思源'
+    '佳琪博文俊杰嘉怡一诺雪婷晓东志强海燕春梅丹凯旭阳晶玉兰红霞亮斌鑫宁婧琳瑶璐倩颖昊天'
+)
+
+# (学院, [(专业, 班级简称), ...])
+DEPARTMENTS = [
+    ('信息与电气工程学院', [('计算机科学与技术', '计科'), ('软件工程', '软工'), ('电子信息工程', '电信'),
+                   ('电气工程及其自动化', '电气'), ('人工智能', '智能')]),
+    ('数学与统计科学学院', [('数学与应用数学', '数学'), ('统计学', '统计'), ('信息与计算科学', '信计')]),
+    ('文学院', [('汉语言文学', '汉语言'), ('秘书学', '秘书'), ('新闻学', '新闻')]),
+    ('外国语学院', [('英语', '英语'), ('日语', '日语'), ('翻译', '翻译')]),
+    ('商学院', [('会计学', '会计'), ('财务管理', '财管'), ('市场营销', '营销'), ('国际经济与贸易', '国贸')]),
+    ('化学化工学院', [('化学', '化学'), ('应用化学', '应化'), ('化学工程与工艺', '化工')]),
+    ('法学院', [('法学', '法学'), ('社会工作', '社工')]),
+]
+# 每个专业一个编号：(学院代码, 专业代码, 学院, 专业, 班级简称)
+MAJORS = [(d + 1, m + 1, department, major, short)
+          for d, (department, majors) in enumerate(DEPARTMENTS)
+          for m, (major, short) in enumerate(majors)]
+CLASS_SIZE = 40
+ENROLLMENT_YEARS = (2021, 2022, 2023, 2024)
+
+# 中国大陆手机号段
+PHONE_PREFIXES = [str(p) for p in (
+    *range(130, 140), *range(150, 154), *range(155, 160), 166, *range(170, 179),
+    *range(180, 190), 191, 198, 199)]
+EMAIL_DOMAINS = ('qq.com', '163.com', '126.com', 'gmail.com', 'outlook.com', 'foxmail.com', 'sina.com')
+
+STUDENT_FIELDS = ('student_id', 'name', 'department', 'major', 'class_name')
+USER_FIELDS = ('username', 'email', 'phone', 'student_id')
+
+
+def _pinyin_table():
+    """姓名用字 -> 拼音；未安装 pypinyin 时返回空表，邮箱和用户名退化为 user 前缀"""
+    try:
+        from pypinyin import lazy_pinyin
+    except ImportError:
+        return {}
+    chars = set(GIVEN_CHARS) | {c for surname, _ in SURNAMES for c in surname}
+    return {c: lazy_pinyin(c)[0] for c in chars}
+
+
+class RosterGenerator:
+    def __init__(self, seed=0):
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._surnames = [surname for surname, _ in SURNAMES]
+        self._surname_weights = [weight for _, weight in SURNAMES]
+        self._pinyin = _pinyin_table()
+        # 手机号：序号经仿射变换得到 8 位尾号，乘数与 10^8 互质，变换是一一映射
+        seeded = random.Random(seed ^ 0x5EED)
+        self._phone_prefixes = seeded.sample(PHONE_PREFIXES, len(PHONE_PREFIXES))
+        self._phone_multiplier = seeded.choice((7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47)) * 1_000_003
+        self._phone_offset = seeded.randrange(10 ** 8)
+
+    def name(self):
+        rng = self._rng
+        surname = rng.choices(self._surnames, self._surname_weights)[0]
+        given = rng.choice(GIVEN_CHARS)
+        if rng.random() < 0.7:
+            given += rng.choice(GIVEN_CHARS)
+        return surname + given
+
+    @staticmethod
+    def student_id(index):
+        """第 index 个学生的学号；班级序号的位数随数量增长，座号固定两位，因此学号不会重复"""
+        class_no, seat = divmod(index, CLASS_SIZE)
+        class_seq, major_no = divmod(class_no, len(MAJORS))
+        department_code, major_code = MAJORS[major_no][:2]
+        year = ENROLLMENT_YEARS[class_seq % len(ENROLLMENT_YEARS)]
+        return f'{year}{department_code:02d}{major_code:02d}{class_seq + 1:02d}{seat + 1:02d}'
+
+    def student(self, index):
+        class_no = index // CLASS_SIZE
+        class_seq, major_no = divmod(class_no, len(MAJORS))
+        _, _, department, major, short = MAJORS[major_no]
+        year = ENROLLMENT_YEARS[class_seq % len(ENROLLMENT_YEARS)]
+        return {
+            'student_id': self.student_id(index),
+            'name': self.name(),
+            'department': department,
+            'major': major,
+            'class_name': f'{short}{year % 100:02d}{class_seq // len(ENROLLMENT_YEARS) + 1:02d}班'
+        }
+
+    def students(self, count, start=0):
+        """逐条生成第 start 到 start + count - 1 个学生"""
+        for index in range(start, start + count):
+            yield self.student(index)
+
+    def phone(self, index):
+        """index 小于 10^8 时尾号各不相同，手机号也就不会重复"""
+        suffix = (index * self._phone_multiplier + self._phone_offset) % 10 ** 8
+        return f'{self._phone_prefixes[index % len(self._phone_prefixes)]}{suffix:08d}'
+
+    def romanize(self, name):
+        return ''.join(self._pinyin.get(c, '') for c in name) or 'user'
+
+    def user(self, student, index, username=None):
+        """为学生生成用户；index 决定用户名、邮箱和手机号，不同 index 不会重复"""
+        romanized = self.romanize(student['name'])
+        return {
+            'username': username or f'{romanized}{index}',
+            'email': f"{romanized}.{index}@{EMAIL_DOMAINS[index % len(EMAIL_DOMAINS)]}",
+            'phone': self.phone(index),
+            'student_id': student['student_id']
+        }
+
+    def roster(self, student_count, user_count=0):
+        """生成 (学生, 用户) 对，前 user_count 个学生已注册，其余学生的用户为 None"""
+        for index, student in enumerate(self.students(student_count)):
+            yield student, (self.user(student, index) if index < user_count else None)
+
+
+def write_json(path, rows):
+    """逐条写入 JSON 数组，不在内存中保存全部数据"""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for row in rows:
+            f.write(',\n' if count else '\n')
+            f.write(json.dumps(row, ensure_ascii=False))
+            count += 1
+        f.write('\n]\n')
+    return count
+
+
+def write_csv(path, rows, fields):
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def uses_memory_db():
+    """按环境变量判断应用是否会使用内存数据库（在导入 app 之前判断）"""
+    from db_engine import database_uri
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return database_uri(root) == 'sqlite:///:memory:'
+
+
+def load_database(pairs, password='admin123', password_hash=None, chunk_size=20000):
+    """
+    把 (学生, 用户) 对批量写入当前应用的数据库并重建检索索引，返回 (学生数, 用户数)
+    所有用户共用一个密码哈希，只计算一次
+    """
+    from sqlalchemy import insert
+    from werkzeug.security import generate_password_hash
+
+    from app import StudentID, User, app, db, init_db, rebuild_search_indexes
+
+    password_hash = password_hash or generate_password_hash(password)
+    init_db()
+    student_count = user_count = 0
+    with app.app_context():
+        students, users = [], []
+
+        def flush():
+            if students:
+                db.session.execute(insert(StudentID), students)
+            if users:
+                db.session.execute(insert(User), users)
+            students.clear()
+            users.clear()
+
+        for student, user in pairs:
+            students.append(dict(student, is_used=user is not None))
+            if user is not None:
+                users.append(dict(user, password_hash=password_hash))
+                user_count += 1
+            student_count += 1
+            if len(students) >= chunk_size:
+                flush()
+        flush()
+        db.session.commit()
+        rebuild_search_indexes()
+    return student_count, user_count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='生成压测用的学号库和用户数据')
+    parser.add_argument('--students', type=int, default=10000, help='学号数量')
+    parser.add_argument('--users', type=int, default=0, help='已注册用户数量（不超过学号数量）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--format', choices=('json', 'csv', 'db'), default='json')
+    parser.add_argument('--output', default='.', help='json / csv 的输出目录')
+    parser.add_argument('--password', default='admin123', help='写入数据库时用户的密码')
+    args = parser.parse_args(argv)
+
+    if args.users > args.students:
+        parser.error('--users 不能超过 --students')
+    generator = RosterGenerator(args.seed)
+    started = time.perf_counter()
+    if args.format == 'db':
+        if uses_memory_db():
+            parser.error('--format db 需要设置 DATABASE_URL 或 DB_MODE=file，内存数据库中的数据会随进程退出丢失')
+        students, users = load_database(generator.roster(args.students, args.users), password=args.password)
+        print(f'已写入 {students} 个学号、{users} 个用户（{time.perf_counter() - started:.1f}s）')
+        return 0
+
+    os.makedirs(args.output, exist_ok=True)
+    student_path = os.path.join(args.output, f'students.{args.format}')
+    user_path = os.path.join(args.output, f'users.{args.format}')
+    if args.format == 'json':
+        write_json(student_path, generator.students(args.students))
+    else:
+        write_csv(student_path, generator.students(args.students), STUDENT_FIELDS)
+    print(f'已生成 {args.students} 个学号: {student_path}')
+    if args.users:
+        # 用户依赖学生的姓名，使用相同种子的生成器重新生成学生，与上面的学号一一对应
+        users = (user for _, user in RosterGenerator(args.seed).roster(args.users, args.users))
+        if args.format == 'json':
+            write_json(user_path, users)
+        else:
+            write_csv(user_path, users, USER_FIELDS)
+        print(f'已生成 {args.users} 个用户: {user_path}')
+    print(f'耗时 {time.perf_counter() - started:.1f}s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,396 @@
+"""
+流量回放
+读取 traffic_recorder.py 录制的请求（TRAFFIC_RECORD_DIR 下的 traffic-*.jsonl.gz），按原始到达时间间隔
+（--speed 倍速，0 表示不等待、尽快发送）向进程内应用或 --url 指定的服务发送，重现线上的突发和并发。
+前后依赖的请求（先注册再登录、先导入再删除）保持录制中的先后顺序：后一个请求等前一个收到响应后再发送，
+等待的次数和时间单独统计（wait 列），不计入接口耗时；--ignore-dependencies 关闭等待，只按时间发送。
+结果中的 status= 列为与录制状态码一致的比例。录制文件末尾不完整（录制进程被强制结束）时给出警告，使用已读出的请求。
+
+回放前根据录制内容准备数据：录制中成功登录、注销的用户和被删除的学号等如果不是录制中创建的，
+先写入目标数据库（用户密码统一为 --password）；占位符按以下规则替换：
+    $admin_username / $admin_password   --admin-username / --admin-password
+    $password                           --password（原请求返回 401 时替换为错误密码，保留失败路径）
+    $code / $reset_token                固定的测试值
+结果格式与 bench_api 相同（规模一栏为 replay），可以用 benchmarks/compare.py 对比两次回放。
+
+用法：
+    python -m benchmarks.replay recordings/ --inspect
+    python -m benchmarks.replay recordings/ --speed 2 --output replay.json
+    python -m benchmarks.replay recordings/traffic-123-20260101-000000.jsonl.gz --url http://127.0.0.1:5000
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmarks.bench_api import ADMIN, HttpTarget, InProcessTarget, git_revision, percentile, summarize
+from benchmarks.datagen import RosterGenerator, load_database
+from traffic_recorder import PSEUDONYM_FIELDS, REPEAT_KEY, SAMPLE_KEY
+
+REPLAY_CODE = '000000'
+REPLAY_RESET_TOKEN = 'replay-reset-token'
+
+
+def load_recording(paths):
+    """读取录制文件（或目录下的全部录制文件），按到达时间排序"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, 'traffic-*.jsonl.gz'))))
+        else:
+            files.append(path)
+    entries = []
+    for path in files:
+        read = len(entries)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        entries.append(json.loads(line))
+        except (EOFError, gzip.BadGzipFile, ValueError) as e:
+            # 录制进程被强制结束（SIGKILL、OOM）时最后一个 gzip 成员不完整，保留此前读出的记录；
+            # 截断处可能留下半行，json.loads 失败同样按截断处理
+            print(f'⚠️ {path} 不完整（{type(e).__name__}），使用前 {len(entries) - read} 个请求')
+    entries.sort(key=lambda entry: entry['ts'])
+    return entries
+
+
+def _vary(value, field, index):
+    """展开 $repeat 列表时为每一项生成不同的假名"""
+    if isinstance(value, dict):
+        return {key: _vary(item, key, index) for key, item in value.items()}
+    if not isinstance(value, str) or field not in PSEUDONYM_FIELDS or index == 0:
+        return value
+    suffix = format(index, 'x')
+    kind = PSEUDONYM_FIELDS[field]
+    if kind == 'phone':
+        return value[:11 - len(str(index))] + str(index)
+    if kind == 'email':
+        local, _, domain = value.partition('@')
+        return f'{local}{suffix}@{domain}'
+    return value + suffix
+
+
+def expand(value, substitutions, field=None):
+    """还原请求体：展开 $repeat 列表，替换占位符"""
+    if isinstance(value, dict):
+        if REPEAT_KEY in value and SAMPLE_KEY in value:
+            sample = expand(value[SAMPLE_KEY], substitutions, field)
+            return [_vary(sample, field, i) for i in range(value[REPEAT_KEY])]
+        return {key: expand(item, substitutions, key) for key, item in value.items()}
+    if isinstance(value, list):
+        return [expand(item, substitutions, field) for item in value]
+    if isinstance(value, str) and value in substitutions:
+        return substitutions[value]
+    return value
+
+
+def substitutions_for(entry, args):
+    """占位符替换表；原请求认证失败（401）时使用错误的凭据"""
+    failed = entry.get('status') == 401
+    return {
+        '$admin_username': args.admin_username,
+        '$admin_password': args.admin_password + ('-wrong' if failed else ''),
+        '$password': args.password + ('-wrong' if failed else ''),
+        '$code': REPLAY_CODE,
+        '$reset_token': REPLAY_RESET_TOKEN,
+    }
+
+
+def prepare_requests(entries, args):
+    """把录制记录转换为 (相对开始时间, 方法, 路径, 请求体, 录制记录)"""
+    if not entries:
+        return []
+    start = entries[0]['ts']
+    requests = []
+    for entry in entries:
+        body = expand(entry['body'], substitutions_for(entry, args)) if entry.get('body') is not None else None
+        path = entry['path']
+        if entry.get('query'):
+            # 查询参数只记录了参数名
+            path += '?' + '&'.join(f'{name}=' for name in entry['query'])
+        requests.append((entry['ts'] - start, entry['method'], path, body, entry))
+    return requests
+
+
+# 按学号查找用户的接口
+_USER_BY_STUDENT_ID = ('/api/login', '/api/auth/send_verification_code', '/api/auth/verify_code')
+
+
+def request_keys(path, body):
+    """
+    请求创建和使用的数据，返回 (创建的键, 使用的键)
+    键为 ('student', 学号)、('user', 用户名) 或 ('user_sid', 学号)（学号对应的用户）
+    """
+    creates, uses = set(), set()
+    if not isinstance(body, dict):
+        return creates, uses
+    if path == '/api/admin/import_students':
+        creates.update(('student', s.get('student_id')) for s in body.get('students') or ()
+                       if isinstance(s, dict) and s.get('student_id'))
+    elif path == '/api/register':
+        if body.get('student_id'):
+            uses.add(('student', body['student_id']))
+            creates.add(('user_sid', body['student_id']))
+        if body.get('username'):
+            creates.add(('user', body['username']))
+    elif path in _USER_BY_STUDENT_ID:
+        if body.get('student_id'):
+            uses.add(('user_sid', body['student_id']))
+    elif path == '/api/user/delete_self':
+        if body.get('username'):
+            uses.add(('user', body['username']))
+    elif path == '/api/admin/delete_user':
+        if body.get('target_username'):
+            uses.add(('user', body['target_username']))
+    elif path == '/api/admin/bulk_delete_users':
+        uses.update(('user', username) for username in body.get('usernames') or ())
+    elif path == '/api/admin/delete_student':
+        if body.get('student_id'):
+            uses.add(('student', body['student_id']))
+    elif path == '/api/admin/bulk_delete_students':
+        uses.update(('student', student_id) for student_id in body.get('student_ids') or ())
+    elif path == '/api/batch':
+        for operation in body.get('operations') or ():
+            if isinstance(operation, dict) and operation.get('op'):
+                op_creates, op_uses = request_keys('/api/admin/' + operation['op'], operation)
+                creates |= op_creates
+                uses |= op_uses
+    return creates, uses
+
+
+def _succeeded(entry):
+    return 200 <= (entry.get('status') or 0) < 300
+
+
+def plan_fixtures(requests):
+    """
+    回放前需要存在的数据：录制中成功的请求使用了、但录制中没有创建的学号和用户
+    返回 (学号列表, 用户 {学号: 用户名})
+    """
+    created = set()
+    students, users = {}, {}
+    for _, _, path, body, entry in requests:
+        if not _succeeded(entry):
+            continue
+        creates, uses = request_keys(path.split('?', 1)[0], body)
+        for kind, value in uses - created:
+            if kind == 'student':
+                students.setdefault(value, True)
+            elif kind == 'user_sid' and value not in users:
+                students.setdefault(value, True)
+                users[value] = 'r' + value[:19]
+            elif kind == 'user' and value not in users.values():
+                student_id = 'R' + value[:19]
+                students.setdefault(student_id, True)
+                users.setdefault(student_id, value)
+        created |= creates
+    return list(students), users
+
+
+def plan_dependencies(requests):
+    """每个请求依赖的先前请求（录制中创建了它使用的学号或用户），返回 {序号: [依赖的序号]}"""
+    creator = {}
+    dependencies = {}
+    for index, (_, _, path, body, entry) in enumerate(requests):
+        creates, uses = request_keys(path.split('?', 1)[0], body)
+        found = {creator[key] for key in uses if key in creator}
+        if found:
+            dependencies[index] = sorted(found)
+        if _succeeded(entry):
+            for key in creates:
+                creator[key] = index
+    return dependencies
+
+
+def seed_fixtures(target, students, users, password):
+    """写入回放需要的学号和用户；进程内直接写数据库，--url 时通过导入和注册接口"""
+    generator = RosterGenerator(0)
+    pairs = []
+    for index, student_id in enumerate(students):
+        student = dict(generator.student(index), student_id=student_id)
+        user = generator.user(student, index, users[student_id]) if student_id in users else None
+        pairs.append((student, user))
+    if isinstance(target, InProcessTarget):
+        load_database(pairs, password=password)
+        return
+    for start in range(0, len(pairs), 5000):
+        target.request('POST', '/api/admin/import_students',
+                       dict(ADMIN, students=[student for student, _ in pairs[start:start + 5000]]))
+    for _, user in pairs:
+        if user is not None:
+            target.request('POST', '/api/register', dict(user, password=password))
+
+
+def replay(target, requests, speed, max_concurrency, dependencies=None):
+    """
+    按录制的时间间隔发送请求，返回每个请求的 (路由, 状态码, 耗时秒, 调度延迟秒, 等待依赖秒, 录制记录)
+    dependencies 中的请求先等待所依赖的请求收到响应再发送（如登录等待注册完成），
+    依赖的请求先提交到线程池，等待不会占满线程池导致死锁
+    """
+    dependencies = dependencies or {}
+    done = [threading.Event() for _ in requests]
+    results = []
+    lock = threading.Lock()
+    in_flight = [0, 0]  # 当前, 峰值
+
+    def run(index, method, path, body, entry, scheduled_at):
+        waited = 0.0
+        if index in dependencies:
+            wait_started = time.perf_counter()
+            for dependency in dependencies[index]:
+                done[dependency].wait()
+            waited = time.perf_counter() - wait_started
+        started = time.perf_counter()
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+        try:
+            status, elapsed = target.request(method, path, body)
+        except Exception:
+            status, elapsed = None, None
+        finally:
+            with lock:
+                in_flight[0] -= 1
+            done[index].set()
+        with lock:
+            results.append((f"{method} {entry['path']}", status, elapsed, started - scheduled_at - waited,
+                            waited, entry))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_concurrency) as executor:
+        for index, (offset, method, path, body, entry) in enumerate(requests):
+            scheduled_at = started + (offset / speed if speed > 0 else 0)
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(run, index, method, path, body, entry, max(scheduled_at, time.perf_counter()))
+    return results, time.perf_counter() - started, in_flight[1]
+
+
+def summarize_routes(results, wall_seconds):
+    routes = {}
+    for route, status, elapsed, lag, waited, entry in results:
+        routes.setdefault(route, []).append((status, elapsed, lag, waited, entry))
+    summary = {}
+    for route, items in sorted(routes.items()):
+        statuses = {}
+        for status, *_ in items:
+            statuses[status] = statuses.get(status, 0) + 1
+        errors = sum(1 for status, *_ in items if status is None or status >= 500)
+        result = summarize([item[1] for item in items if item[1] is not None], errors, statuses, wall_seconds)
+        recorded = sorted(item[-1]['duration_ms'] for item in items if item[-1].get('duration_ms') is not None)
+        result['recorded_p50_ms'] = round(percentile(recorded, 0.5), 3) if recorded else None
+        result['status_match'] = round(sum(1 for item in items if item[0] == item[-1].get('status')) / len(items), 4)
+        result['schedule_lag_p95_ms'] = round(percentile(sorted(item[2] for item in items), 0.95) * 1000, 3)
+        # 因等待所依赖的请求而晚于录制时间发送的请求数及等待时间
+        waits = sorted(item[3] for item in items if item[3] > 0.001)
+        result['dependency_waits'] = len(waits)
+        result['dependency_wait_p95_ms'] = round(percentile(waits, 0.95) * 1000, 3) if waits else 0.0
+        summary[route] = result
+    return summary
+
+
+def inspect(entries):
+    if not entries:
+        print('录制为空')
+        return
+    duration = entries[-1]['ts'] - entries[0]['ts']
+    print(f"{len(entries)} 个请求，时长 {duration:.1f}s，"
+          f"开始于 {datetime.utcfromtimestamp(entries[0]['ts']).isoformat()}Z，"
+          f"峰值并发 {max(entry.get('concurrency') or 0 for entry in entries)}")
+    routes = {}
+    for entry in entries:
+        routes.setdefault(f"{entry['method']} {entry['path']}", []).append(entry)
+    print(f"{'route':<45} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'max conc':>8}")
+    for route, items in sorted(routes.items(), key=lambda item: -len(item[1])):
+        durations = sorted(item['duration_ms'] for item in items)
+        print(f"{route:<45} {len(items):>6} {percentile(durations, 0.5):>9.2f} {percentile(durations, 0.95):>9.2f} "
+              f"{max(item.get('concurrency') or 0 for item in items):>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='回放录制的请求流量')
+    parser.add_argument('recordings', nargs='+', help='录制文件或目录')
+    parser.add_argument('--speed', type=float, default=1.0, help='回放倍速，2 表示两倍速，0 表示尽快发送')
+    parser.add_argument('--max-concurrency', type=int, default=64, help='最多同时进行的请求数')
+    parser.add_argument('--limit', type=int, help='只回放前 N 个请求')
+    parser.add_argument('--url', help='回放到已启动的服务，如 http://127.0.0.1:5000')
+    parser.add_argument('--admin-username', default=ADMIN['admin_username'])
+    parser.add_argument('--admin-password', default=ADMIN['admin_password'])
+    parser.add_argument('--password', default='admin123', help='回放用户的密码')
+    parser.add_argument('--no-prepare', action='store_true', help='不预先写入回放需要的学号和用户')
+    parser.add_argument('--ignore-dependencies', action='store_true',
+                        help='不等待所依赖的请求完成，严格按录制时间发送（高倍速下可能乱序）')
+    parser.add_argument('--inspect', action='store_true', help='只输出录制内容的统计，不回放')
+    parser.add_argument('--output', help='结果文件（与 bench_api 格式相同）')
+    args = parser.parse_args(argv)
+
+    entries = load_recording(args.recordings)
+    if args.limit:
+        entries = entries[:args.limit]
+    if args.inspect:
+        inspect(entries)
+        return 0
+    if not entries:
+        print('录制为空')
+        return 1
+    if args.speed < 0:
+        parser.error('--speed 不能为负数')
+
+    target = HttpTarget(args.url) if args.url else InProcessTarget()
+    requests = prepare_requests(entries, args)
+    if not args.no_prepare:
+        started = time.perf_counter()
+        students, users = plan_fixtures(requests)
+        seed_fixtures(target, students, users, args.password)
+        print(f'准备数据: {len(students)} 个学号、{len(users)} 个用户（{time.perf_counter() - started:.1f}s）')
+    elif not args.url:
+        from app import init_db
+        init_db()
+
+    print(f"回放 {len(requests)} 个请求，录制时长 {requests[-1][0]:.1f}s，倍速 {args.speed:g}")
+    dependencies = {} if args.ignore_dependencies else plan_dependencies(requests)
+    results, wall_seconds, peak = replay(target, requests, args.speed, args.max_concurrency, dependencies)
+    summary = summarize_routes(results, wall_seconds)
+    print(f"耗时 {wall_seconds:.1f}s，峰值并发 {peak}（录制峰值 {max(e.get('concurrency') or 0 for e in entries)}）")
+    print(f"{'route':<45} {'n':>5} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rec p50':>9} {'status=':>7} {'lag p95':>8} {'wait':>5}")
+    for route, result in summary.items():
+        print(f"{route:<45} {result['count']:>5} {result['errors']:>4} {result['p50_ms'] or 0:>9.2f} "
+              f"{result['p95_ms'] or 0:>9.2f} {result['p99_ms'] or 0:>9.2f} {result['recorded_p50_ms'] or 0:>9.2f} "
+              f"{result['status_match']:>7.0%} {result['schedule_lag_p95_ms']:>8.1f} {result['dependency_waits']:>5}")
+
+    if args.output:
+        output = {
+            'meta': {
+                'created_at': datetime.utcnow().isoformat(),
+                'git_revision': git_revision(),
+                'mode': target.mode,
+                'url': args.url,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'recordings': args.recordings,
+                'speed': args.speed,
+                'requests': len(requests),
+                'peak_concurrency': peak,
+            },
+            'results': {'replay': summary},
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(output, f, ensure_ascii=False, indent=1)
+        print(f'结果已保存: {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+API 响应压缩中间件
+按 Accept-Encoding 协商 br / gzip，只压缩指定路径前缀下的文本类响应：
+    - 响应体小于 min_size 时不压缩，登录等小响应不付出压缩开销
+    - 带 Content-Length 的响应整体压缩并重新计算长度
+    - 没有 Content-Length 的流式响应逐块压缩并立即刷新，客户端可以边接收边解析
+brotli 为可选依赖，未安装时只使用 gzip
+"""
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'text/')
+
+
+def parse_accept_encoding(header):
+    """解析 Accept-Encoding，返回 {编码: q 值}"""
+    encodings = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        encodings[name] = q
+    return encodings
+
+
+class _GzipStream:
+    """gzip 格式的增量压缩器（wbits=31 输出 gzip 头和校验尾）"""
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    WSGI 压缩中间件
+    paths 为需要压缩的路径前缀；gzip_level 为 zlib 压缩级别，brotli_quality 为 brotli 质量（0-11）
+    """
+
+    def __init__(self, app, paths=('/api/',), min_size=1024, gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.paths = tuple(paths)
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def choose_encoding(self, environ):
+        accepted = parse_accept_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        candidates = (['br'] if brotli is not None else []) + ['gzip']
+        best = None
+        for name in candidates:
+            q = accepted.get(name, accepted.get('*', 0.0))
+            # q 值相同时按候选顺序优先 br
+            if q > 0 and (best is None or q > best[1]):
+                best = (name, q)
+        return best[0] if best else None
+
+    def _stream(self, encoding):
+        if encoding == 'br':
+            return _BrotliStream(self.brotli_quality)
+        return _GzipStream(self.gzip_level)
+
+    def __call__(self, environ, start_response):
+        if not environ.get('PATH_INFO', '').startswith(self.paths):
+            return self.app(environ, start_response)
+
+        captured = {}
+
+        def capture_start_response(status, headers, exc_info=None):
+            captured['status'] = status
+            captured['headers'] = headers
+            captured['exc_info'] = exc_info
+            return captured.setdefault('chunks', []).append
+
+        # Flask/werkzeug 在返回响应体之前调用 start_response，此时即可决定是否压缩
+        app_iter = self.app(environ, capture_start_response)
+        status, headers, exc_info = captured['status'], captured['headers'], captured['exc_info']
+        written = captured.get('chunks') or []
+
+        if not self._should_compress(environ, status, headers):
+            start_response(status, headers, exc_info)
+            return self._passthrough(written, app_iter)
+
+        encoding = self.choose_encoding(environ)
+        if encoding is None:
+            start_response(status, _add_vary(headers), exc_info)
+            return self._passthrough(written, app_iter)
+
+        if _header(headers, 'Content-Length') is not None:
+            # 长度已知：整体读取后压缩，小响应原样返回
+            try:
+                body = b''.join(written) + b''.join(app_iter)
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+            if len(body) < self.min_size:
+                start_response(status, _add_vary(headers), exc_info)
+                return [body]
+            stream = self._stream(encoding)
+            compressed = stream.compress(body) + stream.finish()
+            start_response(status, self._compressed_headers(headers, encoding, len(compressed)), exc_info)
+            return [compressed]
+
+        # 流式响应：逐块压缩，每块之后刷新输出
+        start_response(status, self._compressed_headers(headers, encoding, None), exc_info)
+        return self._compress_stream(self._stream(encoding), written, app_iter)
+
+    def _should_compress(self, environ, status, headers):
+        if environ.get('REQUEST_METHOD') == 'HEAD':
+            return False
+        if status[:3] in ('204', '304') or int(status[:3]) < 200:
+            return False
+        if _header(headers, 'Content-Encoding'):
+            return False
+        if 'no-transform' in (_header(headers, 'Cache-Control') or '').lower():
+            return False
+        content_type = (_header(headers, 'Content-Type') or '').lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    @staticmethod
+    def _compressed_headers(headers, encoding, length):
+        result = [(k, v) for k, v in _add_vary(headers)
+                  if k.lower() not in ('content-length', 'content-encoding', 'etag')]
+        result.append(('Content-Encoding', encoding))
+        if length is not None:
+            result.append(('Content-Length', str(length)))
+        etag = _header(headers, 'ETag')
+        if etag:
+            # 强 ETag 对应未压缩的字节，压缩后需要区分；弱 ETag 表示语义相同，保持不变
+            if not etag.startswith('W/') and etag.endswith('"'):
+                etag = etag[:-1] + '-' + encoding + '"'
+            result.append(('ETag', etag))
+        return result
+
+    @staticmethod
+    def _passthrough(written, app_iter):
+        if not written:
+            return app_iter
+        return _chain_close(written, app_iter)
+
+    @staticmethod
+    def _compress_stream(stream, written, app_iter):
+        try:
+            for source in (written, app_iter):
+                for chunk in source:
+                    if not chunk:
+                        continue
+                    data = stream.compress(chunk) + stream.flush()
+                    if data:
+                        yield data
+            yield stream.finish()
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+
+def _chain_close(written, app_iter):
+    try:
+        yield from written
+        yield from app_iter
+    finally:
+        if hasattr(app_iter, 'close'):
+            app_iter.close()
+
+
+def _add_vary(headers):
+    """响应内容随 Accept-Encoding 变化，告知缓存按该请求头区分"""
+    vary = [v for k, v in headers if k.lower() == 'vary']
+    if any('accept-encoding' in v.lower() or v.strip() == '*' for v in vary):
+        return headers
+    result = [(k, v) for k, v in headers if k.lower() != 'vary']
+    result.append(('Vary', ', '.join(vary + ['Accept-Encoding'])))
+    return result
+
+
+def _header(headers, name):
+    name = name.lower()
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
@@ -0,0 +1,237 @@
+"""
+数据库引擎配置
+DATABASE_URL 指定任意 SQLAlchemy 支持的数据库（如 PostgreSQL），优先级最高；
+否则 DB_MODE=memory（默认）使用进程内内存数据库，DB_MODE=file 使用持久化 SQLite 文件，
+以 WAL 模式打开，多个 worker 进程可共享同一个数据库并发读取。
+连接池参数通过 DB_POOL_* 环境变量配置，连接池指标见 pool_status()
+"""
+import bisect
+import os
+import re
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def database_uri(base_dir):
+    """根据环境变量生成数据库连接地址"""
+    url = os.environ.get('DATABASE_URL')
+    if url:
+        # 部分托管平台仍使用 postgres:// 前缀，SQLAlchemy 只认 postgresql://
+        if url.startswith('postgres://'):
+            url = 'postgresql://' + url[len('postgres://'):]
+        return url
+    if os.environ.get('DB_MODE', 'memory').lower() == 'file':
+        path = os.environ.get('DB_PATH', os.path.join(base_dir, 'users.db'))
+        return 'sqlite:///' + os.path.abspath(path)
+    return 'sqlite:///:memory:'
+
+
+def is_sqlite_file(url):
+    """是否为 SQLite 文件数据库（内存库不支持 WAL 等设置）"""
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def engine_options(uri):
+    """
+    生成 SQLALCHEMY_ENGINE_OPTIONS
+    内存 SQLite 由 Flask-SQLAlchemy 使用单连接的 StaticPool，不需要连接池参数
+    """
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite' and not is_sqlite_file(url):
+        return {}
+    return {
+        'poolclass': MeteredQueuePool,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', '1800')),  # 秒，-1 表示不回收
+        # SQLite 文件不会断开连接，默认不做 pre-ping；网络数据库默认开启
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', url.get_backend_name() != 'sqlite'),
+    }
+
+
+class PoolMetrics:
+    """连接池指标：连接获取耗时分布、溢出连接和超时次数"""
+
+    # 获取连接耗时直方图的桶上界（秒）
+    BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_seconds = 0.0
+        self.checkout_max_seconds = 0.0
+        self.bucket_counts = [0] * (len(self.BUCKETS) + 1)
+        self.overflow_events = 0
+        self.timeouts = 0
+
+    def observe_checkout(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_seconds += seconds
+            if seconds > self.checkout_max_seconds:
+                self.checkout_max_seconds = seconds
+            self.bucket_counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+
+    def record_overflow(self):
+        with self._lock:
+            self.overflow_events += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'checkout_avg_ms': round(self.checkout_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'checkout_max_ms': round(self.checkout_max_seconds * 1000, 3),
+                'checkout_seconds_total': self.checkout_seconds,
+                'checkout_buckets': dict(zip([str(b) for b in self.BUCKETS] + ['+Inf'], self.bucket_counts)),
+                'overflow_events': self.overflow_events,
+                'timeouts': self.timeouts,
+            }
+
+
+# 进程内所有计量连接池共享一份指标（dispose 后重建的连接池继续累计）
+pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(QueuePool):
+    """记录连接获取耗时、溢出连接和超时次数的 QueuePool"""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            pool_metrics.record_timeout()
+            raise
+        finally:
+            pool_metrics.observe_checkout(time.perf_counter() - start)
+
+    def _inc_overflow(self):
+        # QueuePool 在连接数超过 pool_size 时通过这里申请溢出连接
+        acquired = super()._inc_overflow()
+        if acquired and self._overflow > 0:
+            pool_metrics.record_overflow()
+        return acquired
+
+
+def pool_status(engine):
+    """连接池当前状态和累计指标"""
+    pool = engine.pool
+    status = {
+        'backend': engine.url.get_backend_name(),
+        'pool_class': type(pool).__name__,
+    }
+    if isinstance(pool, QueuePool):
+        status.update({
+            'pool_size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+        })
+    if isinstance(pool, MeteredQueuePool):
+        status['metrics'] = pool_metrics.snapshot()
+    return status
+
+
+def sqlite_pragmas():
+    """SQLite 文件数据库在每个新连接上执行的 PRAGMA"""
+    return [
+        ('journal_mode', 'WAL'),          # 读写互不阻塞，多进程可并发读
+        ('synchronous', 'NORMAL'),        # WAL 模式下安全且比 FULL 少一次 fsync
+        ('mmap_size', int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))),
+        ('busy_timeout', int(os.environ.get('SQLITE_BUSY_TIMEOUT', '5000'))),  # 毫秒
+        ('cache_size', int(os.environ.get('SQLITE_CACHE_SIZE', '-65536'))),    # 负数表示 KiB
+        ('temp_store', 'MEMORY'),
+    ]
+
+
+def install_sqlite_pragmas(engine):
+    """为 SQLite 文件数据库注册连接事件，新连接建立时设置 PRAGMA"""
+    if not is_sqlite_file(engine.url):
+        return
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+# 开始写事务的语句；BEGIN、SAVEPOINT 在事务外执行时同样开启事务（批量接口先显式 BEGIN 再使用保存点）
+_WRITE_STATEMENT = re.compile(r'\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER|BEGIN|SAVEPOINT)\b', re.IGNORECASE)
+
+
+class WriteTransactionLock:
+    """
+    内存 SQLite 的写事务锁
+    StaticPool 下所有会话共用一个 sqlite3 连接，一个线程未提交的写入对这个连接上的其他操作可见。
+    线程在连接上开始写事务（事务中第一条写语句）时获得锁，提交或回滚时释放；
+    快照持有这把锁备份，只会复制已提交的数据。只读查询不开启事务，不受影响。
+    commit / rollback 事件先于 DBAPI 的提交执行，获得锁后还要等上一个事务真正结束，
+    否则本事务的第一条语句会并入上一个事务，被它提交，之后本事务提交时已没有事务
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def acquire(self, timeout=-1):
+        return self._lock.acquire(timeout=timeout)
+
+    def release(self):
+        self._lock.release()
+
+    def _begin_write(self, dbapi_connection):
+        if getattr(self._local, 'held', False):
+            return
+        self._lock.acquire()
+        self._local.held = True
+        # 最多等待 1 秒：未经过锁开启的事务（不应出现）不会让写操作一直等下去
+        deadline = time.monotonic() + 1
+        while dbapi_connection.in_transaction and time.monotonic() < deadline:
+            time.sleep(0.0005)
+
+    def _end_transaction(self):
+        if getattr(self._local, 'held', False):
+            self._local.held = False
+            self._lock.release()
+
+
+def install_write_lock(engine):
+    """为内存 SQLite 注册连接事件，返回 WriteTransactionLock"""
+    lock = WriteTransactionLock()
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _lock_before_write(conn, cursor, statement, parameters, context, executemany):
+        if _WRITE_STATEMENT.match(statement):
+            lock._begin_write(cursor.connection)
+
+    @event.listens_for(engine, 'commit')
+    def _unlock_after_commit(conn):
+        lock._end_transaction()
+
+    @event.listens_for(engine, 'rollback')
+    def _unlock_after_rollback(conn):
+        lock._end_transaction()
+
+    return lock
@@ -0,0 +1,158 @@
+"""
+健康检查
+    /api/health/live   存活检查：不访问数据库，只要进程能处理请求就返回 200
+    /api/health/ready  就绪检查：执行一次 SELECT 1 并计时，附带连接池、缓存命中率、后台任务和进程状态；
+                       数据库不可用或探测耗时超过 HEALTH_DB_SLOW_MS 毫秒时返回 503，负载均衡据此摘除慢实例
+未认证的请求只返回状态；进程、连接池等详细信息需要携带与 /api/metrics 相同的 METRICS_TOKEN。
+错误只报告异常类型，异常信息（可能包含数据库地址等）写入日志。
+后台任务（快照、指标写入、ASGI 线程池等）通过 register_reporter 注册状态函数，就绪检查中逐个调用
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+from metrics import registry
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+DB_SLOW_MS = float(os.environ.get('HEALTH_DB_SLOW_MS', '200'))
+
+process_started_at = datetime.utcnow()
+_process_started = time.monotonic()
+
+cache_requests_total = registry.counter(
+    'cache_requests_total', '缓存查询次数', ('cache', 'result'))
+
+
+class CacheStats:
+    """缓存命中统计，同时写入 /api/metrics 的 cache_requests_total"""
+
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+        cache_requests_total.inc((self.name, 'hit'))
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+        cache_requests_total.inc((self.name, 'miss'))
+
+    def status(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else None
+        }
+
+
+_caches = {}
+_reporters = {}
+
+
+def cache_stats(name):
+    """返回名为 name 的缓存统计，不存在时创建"""
+    if name not in _caches:
+        _caches[name] = CacheStats(name)
+    return _caches[name]
+
+
+def register_reporter(name, func):
+    """注册后台任务的状态函数，返回可以 JSON 序列化的字典"""
+    _reporters[name] = func
+
+
+def reporter_status():
+    status = {}
+    for name, func in _reporters.items():
+        try:
+            status[name] = func()
+        except Exception as e:
+            logger.exception('获取 %s 状态失败', name)
+            status[name] = {'error': type(e).__name__}
+    return status
+
+
+def uptime_seconds():
+    return round(time.monotonic() - _process_started, 3)
+
+
+def process_memory():
+    """当前常驻内存和峰值常驻内存（字节）；无法获取时为 None"""
+    rss = None
+    try:
+        with open('/proc/self/statm') as f:
+            rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    peak = None
+    if resource is not None:
+        # Linux 上 ru_maxrss 单位为 KiB，macOS 上为字节
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    return {'rss_bytes': rss, 'max_rss_bytes': peak}
+
+
+def probe_database(engine):
+    """从连接池取一个连接执行 SELECT 1，返回 (是否成功, 耗时毫秒, 异常类型)；耗时包含等待连接的时间"""
+    started = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.exec_driver_sql('SELECT 1').scalar()
+    except Exception as e:
+        logger.warning('数据库探测失败: %s', e)
+        return False, round((time.perf_counter() - started) * 1000, 3), type(e).__name__
+    return True, round((time.perf_counter() - started) * 1000, 3), None
+
+
+def liveness():
+    return {
+        'status': 'alive',
+        'pid': os.getpid(),
+        'uptime_seconds': uptime_seconds()
+    }
+
+
+def readiness(engine, pool_status=None):
+    """返回 (就绪状态, 是否就绪)；状态为 healthy / degraded（数据库探测过慢）/ unhealthy（数据库不可用）"""
+    ok, latency_ms, error = probe_database(engine)
+    if not ok:
+        status = 'unhealthy'
+    elif latency_ms > DB_SLOW_MS:
+        status = 'degraded'
+    else:
+        status = 'healthy'
+    database = {
+        'status': 'connected' if ok else 'error',
+        'latency_ms': latency_ms,
+        'slow_threshold_ms': DB_SLOW_MS
+    }
+    if error:
+        database['error'] = error
+    if pool_status is not None:
+        database['pool'] = pool_status(engine)
+    return {
+        'status': status,
+        'database': database,
+        'caches': {name: stats.status() for name, stats in _caches.items()},
+        'workers': reporter_status(),
+        'process': dict(
+            liveness(),
+            started_at=process_started_at,
+            threads=threading.active_count(),
+            **process_memory()
+        )
+    }, status == 'healthy'
@@ -0,0 +1,104 @@
+"""
+JSON 编码
+jsonify / request.get_json 都通过 app.json 编解码。安装了 orjson 时使用 orjson（C 实现，
+直接输出 UTF-8 字节，原生支持 datetime），否则退回标准库 json；两种实现输出的数据一致：
+    - datetime / date / time 编码为 ISO 8601 字符串（与 isoformat() 相同），
+      模型的 to_dict() 可以直接返回 datetime，不必逐行调用 isoformat()
+    - 中文不转义为 \\uXXXX，响应体更小
+"""
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime, time
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(o):
+    """两种实现都不能直接编码的类型"""
+    # datetime 最常见，放在最前面；标准库编码时每个时间字段都会调用一次
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+# 使用 orjson 时可以忽略的参数：orjson 总是输出紧凑格式的 UTF-8
+_ORJSON_COMPATIBLE_KWARGS = {'separators', 'ensure_ascii', 'sort_keys'}
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    优先使用 orjson 的 JSON Provider
+    sort_keys 与 Flask 默认设置一致；compact 为 None 时调试模式下缩进输出
+    """
+
+    sort_keys = True
+    compact = None
+    mimetype = 'application/json'
+
+    @property
+    def backend(self):
+        return 'orjson' if orjson is not None else 'json'
+
+    def _orjson_option(self, sort_keys, indent):
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj, indent=False):
+        """编码为 UTF-8 字节，响应体直接使用，省去一次 str/bytes 转换"""
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=_default, option=self._orjson_option(self.sort_keys, indent))
+            except TypeError:
+                # 超过 64 位的整数等 orjson 不支持的数据，交给标准库处理
+                pass
+        return self._stdlib_dumps(obj, sort_keys=self.sort_keys, indent=2 if indent else None).encode('utf-8')
+
+    @staticmethod
+    def _stdlib_dumps(obj, **kwargs):
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', False)
+        if kwargs.get('indent') is None:
+            kwargs.setdefault('separators', (',', ':'))
+        return json.dumps(obj, **kwargs)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and set(kwargs) <= _ORJSON_COMPATIBLE_KWARGS:
+            try:
+                option = self._orjson_option(kwargs.get('sort_keys', self.sort_keys), False)
+                return orjson.dumps(obj, default=_default, option=option).decode('utf-8')
+            except TypeError:
+                pass
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return self._stdlib_dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            # orjson.JSONDecodeError 是 ValueError 的子类，request.get_json() 的错误处理不变
+            return orjson.loads(s)
+        if isinstance(s, (bytes, bytearray)):
+            s = s.decode('utf-8')
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent) + b'\n', mimetype=self.mimetype)
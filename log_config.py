@@ -0,0 +1,145 @@
+"""
+日志配置
+请求线程只把日志记录放入内存队列（QueueHandler），由后台线程（QueueListener）格式化并写入 stderr，
+写日志不会因为终端或日志收集器变慢而阻塞请求。队列已满时直接丢弃并计数，丢弃数见 /api/health/ready。
+
+环境变量：
+    LOG_LEVEL        默认级别，默认 INFO
+    LOG_LEVELS       按模块设置级别，如 "sql_monitor=WARNING,profiling=DEBUG,werkzeug=WARNING"
+    LOG_FORMAT       text（默认）或 json；json 每行一个对象，包含时间、级别、模块、消息和 extra 字段
+    LOG_QUEUE_SIZE   队列长度，默认 10000
+
+逐行产生的大量日志（如导入学号时的重复学号）应汇总后输出，见 summarize_values
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime
+
+# LogRecord 自带的属性，其余属性视为 extra 字段
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.utcfromtimestamp(record.created).isoformat(timespec='milliseconds') + 'Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'pid': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """队列已满时丢弃日志而不是等待"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_levels(spec):
+    """解析 "模块=级别,模块=级别"，忽略格式错误的项"""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, _, level = item.partition('=')
+        level = level.strip().upper()
+        if name.strip() and isinstance(logging.getLevelName(level), int):
+            levels[name.strip()] = level
+    return levels
+
+
+def summarize_values(values, limit=10):
+    """大量同类日志汇总为一行：前 limit 个值，其余只给出数量"""
+    values = list(values)
+    shown = ', '.join(str(value) for value in values[:limit])
+    return shown if len(values) <= limit else f'{shown} 等 {len(values)} 个'
+
+
+_state = {}
+_lock = threading.Lock()
+
+
+def _start_listener():
+    listener = logging.handlers.QueueListener(_state['queue'], _state['output'], respect_handler_level=True)
+    listener.start()
+    _state['listener'] = listener
+    _state['pid'] = os.getpid()
+
+
+def _after_fork():
+    # fork 出的子进程中后台线程不存在，重新启动；父进程队列中未写出的日志由父进程负责
+    if _state.get('listener') is not None and _state.get('pid') != os.getpid():
+        _state['queue'] = queue.Queue(_state['queue'].maxsize)
+        _state['handler'].queue = _state['queue']
+        _start_listener()
+
+
+def stop_logging():
+    """写出队列中剩余的日志并停止后台线程；进程退出时自动调用"""
+    listener = _state.get('listener')
+    if listener is not None and _state.get('pid') == os.getpid():
+        listener.stop()
+        _state['listener'] = None
+
+
+def configure_logging(stream=None):
+    """配置根日志器，可重复调用，只生效一次"""
+    with _lock:
+        if _state:
+            return _state['handler']
+        log_format = os.environ.get('LOG_FORMAT', 'text').lower()
+        output = logging.StreamHandler(stream or sys.stderr)
+        if log_format == 'json':
+            output.setFormatter(JSONFormatter())
+        else:
+            output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(name)s] %(message)s'))
+
+        _state['queue'] = queue.Queue(int(os.environ.get('LOG_QUEUE_SIZE', '10000')))
+        _state['output'] = output
+        _state['handler'] = handler = NonBlockingQueueHandler(_state['queue'])
+
+        root = logging.getLogger()
+        root.addHandler(handler)
+        root.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+        for name, level in parse_levels(os.environ.get('LOG_LEVELS')).items():
+            logging.getLogger(name).setLevel(level)
+
+        _start_listener()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_after_fork)
+        atexit.register(stop_logging)
+        return handler
+
+
+def logging_status():
+    """日志队列状态，用于健康检查"""
+    if not _state:
+        return {'configured': False}
+    listener = _state.get('listener')
+    return {
+        'configured': True,
+        'running': listener is not None and listener._thread is not None and listener._thread.is_alive(),
+        'queued': _state['queue'].qsize(),
+        'capacity': _state['queue'].maxsize,
+        'dropped': _state['handler'].dropped,
+    }
@@ -0,0 +1,304 @@
+"""
+运行时指标
+每个路由的请求耗时直方图、按状态码计数、进行中请求数，以 Prometheus 文本格式输出。
+
+多进程部署时设置 METRICS_DIR：每个 worker 定期（METRICS_FLUSH_INTERVAL 秒）把本进程的指标
+写入 METRICS_DIR/metrics-<pid>.json，/api/metrics 读取全部文件汇总后输出：
+    - 计数器、直方图累加所有进程（包括已退出的进程，保证计数单调递增）
+    - 进行中请求数只累加仍在运行的进程
+部署新版本时应清空 METRICS_DIR。未设置时只输出当前进程的指标。
+"""
+import atexit
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+
+# 请求耗时直方图的桶上界（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_LABEL_SEP = '\t'
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, registry, name, documentation, labelnames):
+        self._registry = registry
+        self._lock = registry._lock
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def _key(self, labels):
+        return _LABEL_SEP.join(str(value) for value in labels)
+
+    def state(self):
+        return {
+            'type': self.type_name,
+            'help': self.documentation,
+            'labelnames': list(self.labelnames),
+            'values': {key: (list(value) if isinstance(value, list) else value)
+                       for key, value in self._values.items()},
+        }
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def inc(self, labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+            self._registry._dirty = True
+
+
+class Gauge(_Metric):
+    """多进程汇总时只累加存活进程的值"""
+    type_name = 'gauge'
+
+    def inc(self, labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+            self._registry._dirty = True
+
+    def dec(self, labels, amount=1):
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    """值为 [各桶计数..., +Inf 桶计数, 总和]，输出时换算为累计计数"""
+    type_name = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames, buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels, value):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            values[index] += 1
+            values[-1] += value
+            self._registry._dirty = True
+
+    def state(self):
+        state = super().state()
+        state['buckets'] = list(self.buckets)
+        return state
+
+
+class MetricsRegistry:
+    def __init__(self, directory=None, flush_interval=5.0):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._dirty = False
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._flusher = None
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def state(self):
+        with self._lock:
+            return {name: metric.state() for name, metric in self._metrics.items()}
+
+    # 多进程：写入/汇总各 worker 的指标文件
+    def _path(self, pid):
+        return os.path.join(self.directory, f'metrics-{pid}.json')
+
+    def flush(self):
+        """把本进程的指标写入文件（先写临时文件再原子替换）"""
+        if not self.directory:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            state = {name: metric.state() for name, metric in self._metrics.items()}
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(os.getpid())
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'pid': os.getpid(), 'written_at': time.time(), 'metrics': state}, f)
+        os.replace(tmp_path, path)
+
+    def start_flusher(self):
+        """后台线程定期写入指标文件；fork 出的 worker 第一次记录指标时各自启动"""
+        if not self.directory or (self._flusher is not None and self._flusher[0] == os.getpid()):
+            return
+        thread = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+        self._flusher = (os.getpid(), thread)
+        thread.start()
+        atexit.register(self.flush)
+
+    def flusher_status(self):
+        """后台写入线程的状态，用于健康检查"""
+        running = (self._flusher is not None and self._flusher[0] == os.getpid()
+                   and self._flusher[1].is_alive())
+        return {
+            'enabled': bool(self.directory),
+            'running': running,
+            'interval_seconds': self.flush_interval,
+            'pending': self._dirty
+        }
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def collect(self):
+        """返回汇总后的指标状态"""
+        if not self.directory:
+            return self.state()
+        self.flush()
+        merged = {}
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    content = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = _pid_alive(content.get('pid'))
+            for name, state in content.get('metrics', {}).items():
+                if state['type'] == 'gauge' and not alive:
+                    continue
+                target = merged.setdefault(name, dict(state, values={}))
+                for key, value in state['values'].items():
+                    current = target['values'].get(key)
+                    if current is None:
+                        target['values'][key] = value
+                    elif isinstance(value, list):
+                        target['values'][key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        target['values'][key] = current + value
+        return merged
+
+    def render(self):
+        """Prometheus 文本格式（0.0.4）"""
+        lines = []
+        for name, state in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {state['help']}")
+            lines.append(f"# TYPE {name} {state['type']}")
+            labelnames = state['labelnames']
+            for key, value in sorted(state['values'].items()):
+                labels = list(zip(labelnames, key.split(_LABEL_SEP))) if labelnames else []
+                if state['type'] == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip(state['buckets'] + ['+Inf'], value[:-1]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(labels + [('le', _format_value(bound))])} {cumulative}")
+                    lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(value[-1])}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+                else:
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _format_value(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = []
+    for name, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+registry = MetricsRegistry(
+    directory=os.environ.get('METRICS_DIR') or None,
+    flush_interval=float(os.environ.get('METRICS_FLUSH_INTERVAL', '5'))
+)
+
+request_latency = registry.histogram(
+    'http_request_duration_seconds', '请求处理耗时（秒）', ('method', 'route'))
+request_total = registry.counter(
+    'http_requests_total', '按状态码统计的请求数', ('method', 'route', 'status'))
+requests_in_flight = registry.gauge(
+    'http_requests_in_flight', '正在处理的请求数', ('method', 'route'))
+
+
+def request_started(method, route):
+    registry.start_flusher()
+    requests_in_flight.inc((method, route))
+    return time.perf_counter()
+
+
+def request_finished(method, route, status, started):
+    request_latency.observe((method, route), time.perf_counter() - started)
+    request_total.inc((method, route, status))
+    requests_in_flight.dec((method, route))
+
+
+def install_request_metrics(app):
+    """
+    为 Flask 应用注册请求指标；路由标签使用 URL 规则（如 /api/login），
+    未匹配任何路由的请求统一记为 unmatched，避免标签数量随任意路径增长
+    """
+    from flask import request
+
+    def route_label():
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    @app.before_request
+    def _metrics_before_request():
+        request.environ['metrics.route'] = route_label()
+        request.environ['metrics.started'] = request_started(request.method, request.environ['metrics.route'])
+
+    @app.after_request
+    def _metrics_after_request(response):
+        started = request.environ.pop('metrics.started', None)
+        if started is not None:
+            request_finished(request.method, request.environ['metrics.route'], response.status_code, started)
+        return response
+
+    @app.teardown_request
+    def _metrics_teardown_request(exc):
+        # 视图抛出未处理的异常时 after_request 不会执行
+        started = request.environ.pop('metrics.started', None)
+        if started is not None:
+            request_finished(request.method, request.environ['metrics.route'], 500, started)
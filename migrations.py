@@ -0,0 +1,249 @@
+"""
+数据库结构迁移
+每个迁移有一个递增的版本号，已执行的版本记录在 schema_migrations 表中。
+迁移只包含增量 DDL（添加索引、添加列），可以在已有数据库上原地执行，不会删除数据。
+多个 worker 同时启动时可能并发执行同一个迁移：DDL 尽量使用 IF NOT EXISTS，
+迁移失败后以迁移记录为准，其他进程已执行完则跳过，否则重试一次。
+
+用法：
+    python migrations.py status    查看已执行/待执行的迁移
+    python migrations.py upgrade   执行待执行的迁移
+    python migrations.py report    列出每个索引服务的查询（SQLite 下附带 EXPLAIN QUERY PLAN）
+"""
+import sys
+from datetime import datetime
+
+from sqlalchemy import exc, inspect, text
+
+MIGRATIONS_TABLE = 'schema_migrations'
+
+# 支持 CREATE INDEX IF NOT EXISTS 的数据库；MySQL 不支持，只能依赖执行前的检查
+IF_NOT_EXISTS_DIALECTS = ('sqlite', 'postgresql')
+
+
+class AddIndex:
+    """添加二级索引；serves 列出该索引服务的查询 (说明, 示例 SQL)"""
+
+    def __init__(self, name, table, columns, serves=()):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.serves = serves
+
+    def apply(self, conn):
+        existing = {index['name'] for index in inspect(conn).get_indexes(self.table)}
+        if self.name in existing:
+            return False
+        quote = conn.dialect.identifier_preparer.quote
+        if_not_exists = 'IF NOT EXISTS ' if conn.dialect.name in IF_NOT_EXISTS_DIALECTS else ''
+        conn.execute(text('CREATE INDEX {}{} ON {} ({})'.format(
+            if_not_exists, quote(self.name), quote(self.table), ', '.join(quote(c) for c in self.columns)
+        )))
+        return True
+
+    def describe(self):
+        return f'索引 {self.name} ON {self.table}({", ".join(self.columns)})'
+
+
+class AddColumn:
+    """为已有数据表添加列；ddl 为列类型及约束，如 'VARCHAR(20)' 或 'BOOLEAN DEFAULT 0'"""
+
+    def __init__(self, table, column, ddl):
+        self.table = table
+        self.column = column
+        self.ddl = ddl
+
+    def apply(self, conn):
+        existing = {column['name'] for column in inspect(conn).get_columns(self.table)}
+        if self.column in existing:
+            return False
+        quote = conn.dialect.identifier_preparer.quote
+        conn.execute(text(f'ALTER TABLE {quote(self.table)} ADD COLUMN {quote(self.column)} {self.ddl}'))
+        return True
+
+    def describe(self):
+        return f'列 {self.table}.{self.column} {self.ddl}'
+
+
+class Migration:
+    def __init__(self, version, description, operations):
+        self.version = version
+        self.description = description
+        self.operations = operations
+
+
+# 迁移列表，版本号只增不改；已发布的迁移不要修改，新的结构变化追加新版本
+MIGRATIONS = [
+    Migration(1, '为常用过滤和排序列添加二级索引', [
+        AddIndex('ix_student_id_is_used', 'student_id', ['is_used'], serves=[
+            ('list_students 总数和已使用数（一次聚合查询，扫描覆盖索引，不读取数据表）',
+             'SELECT count(student_id.id), coalesce(sum(CASE WHEN (student_id.is_used = 1) THEN 1 ELSE 0 END), 0) '
+             'FROM student_id'),
+        ]),
+        AddIndex('ix_student_id_department', 'student_id', ['department'], serves=[
+            ('按院系筛选学号',
+             'SELECT * FROM student_id WHERE department = :department'),
+        ]),
+        AddIndex('ix_student_id_major', 'student_id', ['major'], serves=[
+            ('按专业筛选学号',
+             'SELECT * FROM student_id WHERE major = :major'),
+        ]),
+        AddIndex('ix_student_id_class_name', 'student_id', ['class_name'], serves=[
+            ('按班级筛选学号（毕业班清理）',
+             'SELECT * FROM student_id WHERE class_name = :class_name'),
+        ]),
+        AddIndex('ix_student_id_created_at', 'student_id', ['created_at'], serves=[
+            ('按导入时间排序/筛选学号',
+             'SELECT * FROM student_id WHERE created_at >= :since ORDER BY created_at'),
+        ]),
+        AddIndex('ix_user_reset_token', 'user', ['reset_token'], serves=[
+            ('reset_password 按重置令牌查找用户',
+             'SELECT * FROM "user" WHERE reset_token = :token'),
+        ]),
+        AddIndex('ix_user_last_login', 'user', ['last_login'], serves=[
+            ('按最近登录时间排序/统计活跃用户',
+             'SELECT * FROM "user" WHERE last_login >= :since ORDER BY last_login DESC'),
+        ]),
+        AddIndex('ix_user_created_at', 'user', ['created_at'], serves=[
+            ('按注册时间排序/统计新用户',
+             'SELECT * FROM "user" WHERE created_at >= :since ORDER BY created_at'),
+        ]),
+    ]),
+]
+
+
+def _ensure_migrations_table(engine):
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(
+                f'CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ('
+                'version INTEGER PRIMARY KEY, '
+                'description VARCHAR(200) NOT NULL, '
+                'applied_at TIMESTAMP NOT NULL)'
+            ))
+    except exc.DBAPIError:
+        # PostgreSQL 并发执行 CREATE TABLE IF NOT EXISTS 仍可能因系统表唯一约束失败
+        if not inspect(engine).has_table(MIGRATIONS_TABLE):
+            raise
+
+
+def _apply(engine, migration):
+    with engine.begin() as conn:
+        for operation in migration.operations:
+            operation.apply(conn)
+        conn.execute(
+            text(f'INSERT INTO {MIGRATIONS_TABLE} (version, description, applied_at) '
+                 'VALUES (:version, :description, :applied_at)'),
+            {'version': migration.version, 'description': migration.description,
+             'applied_at': datetime.utcnow()}
+        )
+
+
+def latest_version():
+    """迁移列表中的最新版本号"""
+    return max(migration.version for migration in MIGRATIONS)
+
+
+def applied_versions(engine):
+    """已执行的迁移版本号；只读，迁移记录表不存在时返回空集合"""
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(MIGRATIONS_TABLE):
+            return set()
+        return {row[0] for row in conn.execute(text(f'SELECT version FROM {MIGRATIONS_TABLE}'))}
+
+
+def run_migrations(engine):
+    """
+    按版本顺序执行待执行的迁移，每个迁移一个事务，返回本次执行的版本号列表
+    与其他进程并发执行时，对方已执行的迁移不计入返回值
+    """
+    _ensure_migrations_table(engine)
+    done = applied_versions(engine)
+    executed = []
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        if migration.version in done:
+            continue
+        for attempt in range(2):
+            try:
+                _apply(engine, migration)
+            except exc.DBAPIError:
+                # 迁移记录主键冲突或 DDL 冲突：其他进程已执行完则跳过，否则重试一次（已存在的索引/列会被跳过）
+                if migration.version in applied_versions(engine):
+                    break
+                if attempt:
+                    raise
+            else:
+                executed.append(migration.version)
+                break
+    return executed
+
+
+def index_report(engine):
+    """
+    每个索引服务的查询；SQLite 下附带示例查询的 EXPLAIN QUERY PLAN，
+    可确认查询确实走了对应的索引
+    """
+    report = []
+    inspector = inspect(engine)
+    is_sqlite = engine.url.get_backend_name() == 'sqlite'
+    with engine.connect() as conn:
+        for migration in MIGRATIONS:
+            for operation in migration.operations:
+                if not isinstance(operation, AddIndex):
+                    continue
+                table_exists = inspector.has_table(operation.table)
+                existing = {index['name'] for index in inspector.get_indexes(operation.table)} if table_exists else set()
+                queries = []
+                for description, sql in operation.serves:
+                    entry = {'description': description, 'sql': sql}
+                    if is_sqlite and table_exists:
+                        params = {name: None for name in text(sql).compile().params}
+                        plan = conn.execute(text('EXPLAIN QUERY PLAN ' + sql), params).fetchall()
+                        entry['plan'] = [row[-1] for row in plan]
+                    queries.append(entry)
+                report.append({
+                    'index': operation.name,
+                    'table': operation.table,
+                    'columns': operation.columns,
+                    'version': migration.version,
+                    'exists': operation.name in existing,
+                    'queries': queries,
+                })
+    return report
+
+
+def main(argv):
+    """status / report 只读取数据库，不建表、不执行迁移；只有 upgrade 修改数据库结构"""
+    command = argv[1] if len(argv) > 1 else 'status'
+    from app import app, db
+
+    with app.app_context():
+        engine = db.engine
+        if command == 'upgrade':
+            db.create_all()
+            executed = run_migrations(engine)
+            print(f'执行迁移: {executed}' if executed else '数据库已是最新版本')
+        elif command == 'status':
+            done = applied_versions(engine)
+            for migration in MIGRATIONS:
+                state = '已执行' if migration.version in done else '待执行'
+                print(f'[{state}] {migration.version:>3}  {migration.description}')
+                for operation in migration.operations:
+                    print(f'          - {operation.describe()}')
+        elif command == 'report':
+            for item in index_report(engine):
+                state = '' if item['exists'] else '（未创建）'
+                print(f"{item['index']} ON {item['table']}({', '.join(item['columns'])}){state}")
+                for query in item['queries']:
+                    print(f"    - {query['description']}")
+                    print(f"      {query['sql']}")
+                    for line in query.get('plan', []):
+                        print(f'      计划: {line}')
+        else:
+            print(__doc__)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,243 @@
+"""
+按请求的性能剖析
+两种触发方式，都不需要重新部署：
+    - 请求头 X-Profile 携带签名令牌（需要设置 PROFILE_SECRET），用于剖析指定的慢请求：
+          python profiling.py sign [路径前缀]      生成令牌
+          curl -H "X-Profile: <令牌>" ...
+    - 按 PROFILE_SAMPLE_RATE（0~1，默认 0）随机抽样
+被剖析的请求在 PROFILE_DIR 中生成两个文件：
+    <名称>.prof       pstats 格式，可用 python -m pstats / snakeviz 查看
+    <名称>.collapsed  折叠调用栈格式，可直接交给 flamegraph.pl / speedscope 生成火焰图
+目录中最多保留 PROFILE_MAX_FILES 份剖析结果，超出时删除最旧的；响应头 X-Profile-Id 为本次结果的名称
+同一时间只剖析一个请求（Python 3.12 起解释器内只能有一个活动的 cProfile），其余被选中的请求照常处理、不剖析。
+结果文件（pstats 和折叠调用栈）由后台线程生成和写入，请求线程只负责停止剖析；写入队列已满时丢弃
+"""
+import cProfile
+import glob
+import logging
+import os
+import pstats
+import queue
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+_SALT = 'request-profile'
+
+
+def _serializer(secret):
+    return URLSafeTimedSerializer(secret, salt=_SALT)
+
+
+def sign_profile_token(secret, path_prefix=''):
+    """生成剖析令牌；path_prefix 非空时只对该路径前缀下的请求有效"""
+    return _serializer(secret).dumps({'path': path_prefix})
+
+
+def verify_profile_token(secret, token, path, max_age):
+    try:
+        payload = _serializer(secret).loads(token, max_age=max_age)
+    except BadSignature:
+        return False
+    return isinstance(payload, dict) and path.startswith(payload.get('path') or '')
+
+
+def collapsed_stacks(stats, min_fraction=0.0005, max_depth=128):
+    """
+    把 pstats 数据转换为折叠调用栈（每行 "根;...;函数 权重"，权重单位微秒）
+    pstats 只记录调用者-被调用者关系，沿调用边从根函数展开，
+    每条调用边按其累计耗时占被调用函数累计耗时的比例分配时间。
+    调用图中的路径数可能呈指数增长，分到的时间不足总耗时 min_fraction 的分支不再展开，
+    同一深度上的分支数因此不超过 1 / min_fraction
+    """
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge[3]
+    # 开始剖析前已在执行的函数不在统计中，调用者都不在统计中的函数就是根
+    roots = [func for func, entry in stats.stats.items()
+             if not any(caller in stats.stats for caller in entry[4])]
+
+    def label(func):
+        filename, line, name = func
+        if filename == '~':
+            return name
+        return f'{name} ({os.path.basename(filename)}:{line})'.replace(';', ',')
+
+    lines = {}
+    min_budget = sum(stats.stats[root][3] for root in roots) * min_fraction
+    stack = [(root, stats.stats[root][3], (label(root),), frozenset([root])) for root in roots]
+    while stack:
+        func, budget, path, seen = stack.pop()
+        _, _, own, cumulative, _ = stats.stats[func]
+        if cumulative <= 0 or budget <= 0 or budget < min_budget or len(path) > max_depth:
+            continue
+        scale = min(budget / cumulative, 1.0)
+        weight = int(own * scale * 1_000_000)
+        if weight:
+            key = ';'.join(path)
+            lines[key] = lines.get(key, 0) + weight
+        for callee, edge_time in callees.get(func, {}).items():
+            if callee in seen:
+                continue  # 递归调用只展开一层，避免无限展开
+            stack.append((callee, edge_time * scale, path + (label(callee),), seen | {callee}))
+    return [f'{key} {weight}' for key, weight in sorted(lines.items())]
+
+
+class RequestProfiler:
+    def __init__(self, directory, sample_rate=0.0, max_files=50, secret=None, token_max_age=3600, queue_size=16):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        self.secret = secret
+        self.token_max_age = token_max_age
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._queue = None
+        self._writer_pid = None
+
+    @property
+    def enabled(self):
+        return bool(self.secret) or self.sample_rate > 0
+
+    def should_profile(self, path, headers):
+        token = headers.get(PROFILE_HEADER)
+        if token and self.secret:
+            return verify_profile_token(self.secret, token, path, self.token_max_age)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    @staticmethod
+    def profile_name(method, route):
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+        return f"{datetime.utcnow().strftime('%Y%m%d-%H%M%S-%f')}-{method}-{slug}"
+
+    def save(self, profiler, name):
+        """写入 <名称>.prof 和 <名称>.collapsed，并删除超出数量限制的旧结果"""
+        base = os.path.join(self.directory, name)
+        os.makedirs(self.directory, exist_ok=True)
+        stats = pstats.Stats(profiler)
+        stats.dump_stats(base + '.prof')
+        with open(base + '.collapsed', 'w', encoding='utf-8') as f:
+            f.write('\n'.join(collapsed_stacks(stats)) + '\n')
+        self._rotate()
+
+    def submit(self, profiler, name, elapsed):
+        """把已停止的剖析器交给后台线程保存，不阻塞请求；队列已满时丢弃"""
+        try:
+            self._get_queue().put_nowait((profiler, name, elapsed))
+        except queue.Full:
+            self.dropped += 1
+            logger.warning('剖析结果写入队列已满，丢弃 %s', name)
+
+    def _get_queue(self):
+        # 每个进程一个写入线程；fork 出的 worker 第一次提交时创建
+        if self._writer_pid != os.getpid():
+            with self._lock:
+                if self._writer_pid != os.getpid():
+                    self._queue = queue.Queue(self.queue_size)
+                    threading.Thread(target=self._run, args=(self._queue,), name='profile-writer', daemon=True).start()
+                    self._writer_pid = os.getpid()
+        return self._queue
+
+    def _run(self, jobs):
+        while True:
+            profiler, name, elapsed = jobs.get()
+            try:
+                self.save(profiler, name)
+                logger.info('已保存请求剖析: %s（%.1fms）', name, elapsed * 1000)
+            except Exception:
+                logger.exception('保存请求剖析失败')
+
+    def _rotate(self):
+        with self._lock:
+            profiles = sorted(glob.glob(os.path.join(self.directory, '*.prof')), key=os.path.getmtime)
+            for path in profiles[:max(len(profiles) - self.max_files, 0)]:
+                for extension in ('.prof', '.collapsed'):
+                    try:
+                        os.remove(path[:-len('.prof')] + extension)
+                    except OSError:
+                        pass
+
+
+def install_profiler(app, profiler=None):
+    """
+    注册剖析钩子：before_request 中开始剖析，teardown_request 中结束并交给后台线程写入文件，
+    剖析范围包括视图函数和其后的 after_request 处理；未启用时不注册任何钩子
+    """
+    from flask import request
+
+    profiler = profiler or RequestProfiler(
+        os.environ.get('PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'kb-profiles'),
+        sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', '0')),
+        max_files=int(os.environ.get('PROFILE_MAX_FILES', '50')),
+        secret=os.environ.get('PROFILE_SECRET') or None,
+        token_max_age=int(os.environ.get('PROFILE_TOKEN_MAX_AGE', '3600'))
+    )
+    if not profiler.enabled:
+        return profiler
+    active = threading.Lock()
+
+    @app.before_request
+    def _profile_before_request():
+        if not profiler.should_profile(request.path, request.headers):
+            return
+        if not active.acquire(blocking=False):
+            logger.debug('已有请求正在剖析，跳过 %s', request.path)
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 其他剖析器（如调试器、另一个 cProfile）已在运行
+            active.release()
+            logger.warning('无法启动剖析器，跳过 %s', request.path)
+            return
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        request.environ['profiling.profile'] = profile
+        request.environ['profiling.name'] = profiler.profile_name(request.method, route)
+        request.environ['profiling.started'] = time.perf_counter()
+
+    @app.after_request
+    def _profile_after_request(response):
+        if 'profiling.profile' in request.environ:
+            response.headers['X-Profile-Id'] = request.environ['profiling.name']
+        return response
+
+    @app.teardown_request
+    def _profile_teardown_request(exc):
+        profile = request.environ.pop('profiling.profile', None)
+        if profile is None:
+            return
+        profile.disable()
+        active.release()
+        elapsed = time.perf_counter() - request.environ.pop('profiling.started')
+        name = request.environ.pop('profiling.name')
+        profiler.submit(profile, name, elapsed)
+
+    return profiler
+
+
+def main(argv):
+    if len(argv) >= 2 and argv[1] == 'sign':
+        secret = os.environ.get('PROFILE_SECRET')
+        if not secret:
+            print('请先设置 PROFILE_SECRET 环境变量（与服务端一致）')
+            return 1
+        print(sign_profile_token(secret, argv[2] if len(argv) > 2 else ''))
+        return 0
+    print(__doc__)
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,326 @@
+"""
+学号库内存检索索引
+启动时从数据库构建，导入/删除学号时增量维护
+拼音检索依赖 pypinyin，未安装时只能按汉字和字母匹配
+"""
+import bisect
+import threading
+
+# pypinyin 加载词典较慢（约 0.2 秒），首次转换拼音时才导入，不拖慢冷启动
+_pypinyin = None
+_pypinyin_loaded = False
+
+
+def _get_pypinyin():
+    """返回 pypinyin 模块；未安装时返回 None，退化为只按汉字/字母匹配"""
+    global _pypinyin, _pypinyin_loaded
+    if not _pypinyin_loaded:
+        try:
+            import pypinyin
+            _pypinyin = pypinyin
+        except ImportError:
+            _pypinyin = None
+        _pypinyin_loaded = True
+    return _pypinyin
+
+
+class PrefixIndex:
+    """
+    基于有序数组的前缀索引
+    每条学号记录按 (检索键, 学号) 存入有序列表，检索键为学号和小写姓名，
+    前缀查询时二分定位起点后顺序扫描，复杂度 O(log n + k)
+    """
+
+    def __init__(self):
+        self._entries = []   # 有序列表，元素为 (key, student_id)
+        self._records = {}   # student_id -> 学号摘要
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _summary(record):
+        return {
+            'student_id': record['student_id'],
+            'name': record['name'],
+            'department': record.get('department') or '',
+            'major': record.get('major') or '',
+            'class_name': record.get('class_name') or ''
+        }
+
+    @staticmethod
+    def _keys(record):
+        return {record['student_id'].lower(), record['name'].lower()}
+
+    def build(self, records):
+        """用全部学号重建索引"""
+        entries = []
+        summaries = {}
+        for record in records:
+            summary = self._summary(record)
+            summaries[summary['student_id']] = summary
+            entries.extend((key, summary['student_id']) for key in self._keys(summary))
+        entries.sort()
+        with self._lock:
+            self._entries = entries
+            self._records = summaries
+
+    def add(self, record):
+        """增量添加一条学号记录"""
+        self.add_many([record])
+
+    def add_many(self, records):
+        """增量添加多条学号记录，数量较多时合并后整体排序"""
+        summaries = [self._summary(record) for record in records]
+        if not summaries:
+            return
+        with self._lock:
+            for summary in summaries:
+                self._remove_locked(summary['student_id'])
+                self._records[summary['student_id']] = summary
+            new_entries = [(key, s['student_id']) for s in summaries for key in self._keys(s)]
+            if len(new_entries) > 64:
+                self._entries.extend(new_entries)
+                self._entries.sort()
+            else:
+                for entry in new_entries:
+                    bisect.insort(self._entries, entry)
+
+    def remove(self, student_id):
+        """删除一条学号记录"""
+        with self._lock:
+            self._remove_locked(student_id)
+
+    def _remove_locked(self, student_id):
+        summary = self._records.pop(student_id, None)
+        if summary is None:
+            return
+        for key in self._keys(summary):
+            entry = (key, student_id)
+            pos = bisect.bisect_left(self._entries, entry)
+            if pos < len(self._entries) and self._entries[pos] == entry:
+                del self._entries[pos]
+
+    def search(self, prefix, limit=10):
+        """返回学号或姓名以 prefix 开头的前 limit 条记录"""
+        prefix = prefix.strip().lower()
+        if not prefix or limit <= 0:
+            return []
+        results = []
+        seen = set()
+        with self._lock:
+            pos = bisect.bisect_left(self._entries, (prefix, ''))
+            entries = self._entries
+            while pos < len(entries) and len(results) < limit:
+                key, student_id = entries[pos]
+                if not key.startswith(prefix):
+                    break
+                if student_id not in seen:
+                    seen.add(student_id)
+                    results.append(self._records[student_id])
+                pos += 1
+        return results
+
+    def __len__(self):
+        return len(self._records)
+
+
+def _is_hanzi(ch):
+    return '一' <= ch <= '鿿'
+
+
+_reading_cache = {}
+
+
+def _char_readings(ch):
+    """单个汉字的全部拼音读音（多音字返回多个），结果缓存"""
+    readings = _reading_cache.get(ch)
+    if readings is None:
+        pypinyin = _get_pypinyin()
+        if pypinyin is not None:
+            readings = pypinyin.pinyin(ch, style=pypinyin.Style.NORMAL, heteronym=True)[0]
+            readings = tuple(dict.fromkeys(readings)) + (ch,)
+        else:
+            readings = (ch,)
+        _reading_cache[ch] = readings
+    return readings
+
+
+def to_syllables(text):
+    """
+    把文本拆成音节列表，每个音节是候选读音元组
+    汉字逐字转拼音，连续的字母数字作为一个音节
+    """
+    syllables = []
+    run = ''
+    for ch in text.lower():
+        if _is_hanzi(ch):
+            if run:
+                syllables.append((run,))
+                run = ''
+            syllables.append(_char_readings(ch))
+        elif ch.isalnum():
+            run += ch
+        elif run:
+            syllables.append((run,))
+            run = ''
+    if run:
+        syllables.append((run,))
+    return syllables
+
+
+def normalize_query(query):
+    """查询词转小写并去掉空格、隔音符号"""
+    return ''.join(ch for ch in query.strip().lower() if ch.isalnum())
+
+
+class PinyinIndex:
+    """
+    拼音 / 首字母模糊检索索引
+    预先计算每个名称的音节读音，并按每个音节的首字母建立倒排表；
+    查询时先用查询词首字符取候选集，再逐个做音节前缀匹配并打分排序。
+    支持全拼（zhangjianhao）、首字母（zjh）、混合（zhangjh）、名字部分（jianhao）。
+    build() 只暂存数据，第一次检索时才计算拼音，避免启动时加载拼音词典
+    """
+
+    def __init__(self):
+        self._entries = {}   # key -> (text, syllables, record)
+        self._postings = {}  # 首字符 -> set(key)
+        self._pending = None  # 尚未计算拼音的数据：key -> (text, record)
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _initials(key, syllables):
+        heads = {key[:1].lower()} if key else set()
+        for readings in syllables:
+            heads.update(reading[:1] for reading in readings)
+        return heads
+
+    def build(self, items):
+        """用 (key, text, record) 序列重建索引，拼音在第一次检索时计算"""
+        pending = {key: (text, record) for key, text, record in items}
+        with self._lock:
+            self._entries = {}
+            self._postings = {}
+            self._pending = pending
+
+    def _materialize_locked(self):
+        if self._pending is None:
+            return
+        pending, self._pending = self._pending, None
+        for key, (text, record) in pending.items():
+            self._add_locked(key, text, record)
+
+    def add(self, key, text, record=None):
+        """增量添加或更新一条记录"""
+        self.add_many([(key, text, record)])
+
+    def add_many(self, items):
+        with self._lock:
+            for key, text, record in items:
+                if self._pending is not None:
+                    self._pending[key] = (text, record)
+                    continue
+                self._remove_locked(key)
+                self._add_locked(key, text, record)
+
+    def remove(self, key):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.pop(key, None)
+            else:
+                self._remove_locked(key)
+
+    def _add_locked(self, key, text, record):
+        syllables = to_syllables(text)
+        self._entries[key] = (text.lower(), syllables, record)
+        for head in self._initials(key, syllables):
+            self._postings.setdefault(head, set()).add(key)
+
+    def _remove_locked(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for head in self._initials(key, entry[1]):
+            keys = self._postings.get(head)
+            if keys:
+                keys.discard(key)
+
+    @staticmethod
+    def _match_from(query, syllables, start):
+        """
+        从第 start 个音节开始，把查询词拆成连续音节的非空前缀
+        返回 (用到的音节数, 完整拼写的音节数)，取完整音节最多的方案；不匹配返回 None
+        """
+        best = None
+        stack = [(start, 0, 0)]  # (音节下标, 查询词位置, 完整音节数)
+        while stack:
+            i, pos, full = stack.pop()
+            if pos == len(query):
+                candidate = (i - start, full)
+                if best is None or candidate[1] > best[1]:
+                    best = candidate
+                continue
+            if i >= len(syllables):
+                continue
+            rest = query[pos:]
+            for reading in syllables[i]:
+                k = 0
+                limit = min(len(reading), len(rest))
+                while k < limit and reading[k] == rest[k]:
+                    k += 1
+                for n in range(k, 0, -1):
+                    stack.append((i + 1, pos + n, full + (n == len(reading))))
+        return best
+
+    @staticmethod
+    def _is_subsequence(query, text):
+        it = iter(text)
+        return all(ch in it for ch in query)
+
+    def _score(self, query, key, text, syllables):
+        if query == key.lower() or query == text:
+            return 100
+        if key.lower().startswith(query):
+            return 90
+        if text.startswith(query):
+            return 85
+        total = len(syllables)
+        match = self._match_from(query, syllables, 0)
+        if match:
+            used, full = match
+            if used == total and full == total:
+                return 80  # 全拼
+            if used == total and full == 0:
+                return 75  # 首字母
+            if used == total:
+                return 70  # 全拼与首字母混合
+            return 60      # 前几个字
+        for start in range(1, total):
+            if self._match_from(query, syllables, start):
+                return 50  # 从名字中间开始匹配，如只输入名
+        if query in text:
+            return 45
+        if self._is_subsequence(query, ''.join(r[0] for r in syllables)):
+            return 20      # 全拼的子序列，容忍漏字母
+        return 0
+
+    def search(self, query, limit=10):
+        """模糊检索，返回按得分排序的 [(score, key, record)]"""
+        query = normalize_query(query)
+        if not query or limit <= 0:
+            return []
+        with self._lock:
+            self._materialize_locked()
+            keys = list(self._postings.get(query[0], ()))
+            entries = self._entries
+            scored = []
+            for key in keys:
+                text, syllables, record = entries[key]
+                score = self._score(query, key, text, syllables)
+                if score:
+                    scored.append((-score, len(text), key, record))
+        scored.sort(key=lambda item: item[:3])
+        return [(-neg_score, key, record) for neg_score, _, key, record in scored[:limit]]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending) if self._pending is not None else len(self._entries)
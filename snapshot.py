@@ -0,0 +1,225 @@
+"""
+内存数据库快照
+使用 SQLite 在线备份 API 定期把内存数据库复制到快照文件，启动时从最新快照恢复，
+既保留内存数据库的查询速度，重启或冷启动后数据也不会丢失。
+
+所有会话共用同一个 sqlite3 连接，备份按页分步复制到一个临时内存数据库，每一步都持有写事务锁
+（db_engine.WriteTransactionLock）：等待进行中的写事务提交或回滚后再复制，只复制已提交的数据；
+两步之间释放锁，写操作最多等待一步（pages 页的内存复制）的时间。两步之间有写入提交时 SQLite 会从头重新备份，
+重新开始达到 max_restarts 次后持有锁完成剩余的复制，持续写入时快照也能完成，写操作最多等待一次整库的内存复制。
+内存中的副本再写入快照文件，写文件期间不持有锁。
+快照先写入临时文件，完成后原子替换，崩溃时不会留下损坏的快照。
+"""
+import atexit
+import glob
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+SNAPSHOT_PREFIX = 'snapshot-'
+SNAPSHOT_SUFFIX = '.db'
+
+
+class SnapshotManager:
+    """
+    connection 为内存数据库的 sqlite3 连接；
+    version_getter 返回当前数据版本，与上次快照时相同则跳过本次快照；
+    write_lock 为该连接的写事务锁，每一步备份期间持有
+    """
+
+    def __init__(self, directory, interval=60, keep=3, pages=1024, step_sleep=0.001, lock_timeout=30,
+                 max_restarts=3):
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        self.pages = pages
+        self.step_sleep = step_sleep
+        self.lock_timeout = lock_timeout
+        self.max_restarts = max_restarts
+        self.connection = None
+        self.version_getter = None
+        self.write_lock = None
+        self.last_version = None
+        self.last_snapshot_path = None
+        self.last_snapshot_at = None
+        self.last_duration_ms = None
+        self.last_max_pause_ms = None
+        self.last_restarts = None
+        self.last_error = None
+        self.snapshot_count = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _snapshot_files(self):
+        pattern = os.path.join(self.directory, SNAPSHOT_PREFIX + '*' + SNAPSHOT_SUFFIX)
+        return sorted(glob.glob(pattern))
+
+    def latest_snapshot(self):
+        files = self._snapshot_files()
+        return files[-1] if files else None
+
+    def restore_latest(self, connection):
+        """从最新快照恢复到内存数据库，返回快照路径；没有快照时返回 None"""
+        path = self.latest_snapshot()
+        if not path:
+            return None
+        source = sqlite3.connect(path)
+        try:
+            source.backup(connection)
+        finally:
+            source.close()
+        return path
+
+    def snapshot(self, force=False):
+        """执行一次快照；数据未变化且非强制时跳过，返回快照路径或 None"""
+        if self.connection is None:
+            return None
+        with self._lock:
+            version = self.version_getter() if self.version_getter else None
+            if not force and version is not None and version == self.last_version:
+                return None
+
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S-%f')
+            path = os.path.join(self.directory, f'{SNAPSHOT_PREFIX}{stamp}{SNAPSHOT_SUFFIX}')
+            tmp_path = path + '.tmp'
+            started = time.perf_counter()
+            staging = sqlite3.connect(':memory:')
+            step = _BackupStep(self)
+            try:
+                step.acquire()
+                try:
+                    self.connection.backup(staging, pages=self.pages, progress=step.progress)
+                finally:
+                    step.release()
+                target = sqlite3.connect(tmp_path)
+                try:
+                    staging.backup(target)
+                finally:
+                    target.close()
+            finally:
+                staging.close()
+            os.replace(tmp_path, path)
+
+            self.last_version = version
+            self.last_snapshot_path = path
+            self.last_snapshot_at = datetime.utcnow()
+            self.last_duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            self.last_max_pause_ms = round(step.max_pause * 1000, 2)
+            self.last_restarts = step.restarts
+            self.snapshot_count += 1
+            self._prune()
+            return path
+
+    def _acquire_write_lock(self):
+        """
+        获得写事务锁，并等待连接上没有未提交的事务
+        写事务在提交语句执行之前就会释放锁，拿到锁后仍可能有一个正在提交的事务，稍等后重试
+        """
+        if self.write_lock is None:
+            return
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            if not self.write_lock.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                raise TimeoutError('等待写事务结束超时，跳过本次快照')
+            if not self.connection.in_transaction:
+                return
+            self.write_lock.release()
+            if time.monotonic() >= deadline:
+                raise TimeoutError('等待写事务结束超时，跳过本次快照')
+            time.sleep(0.001)
+
+    def _prune(self):
+        for path in self._snapshot_files()[:-self.keep]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.snapshot()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+
+    def start(self, connection, version_getter=None, write_lock=None):
+        """开始定期快照，进程退出时再做一次最终快照"""
+        self.connection = connection
+        self.version_getter = version_getter
+        self.write_lock = write_lock
+        if version_getter is not None:
+            # 刚恢复/初始化完成的数据无需立即快照
+            self.last_version = version_getter()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='db-snapshot', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        self._stop.set()
+        try:
+            self.snapshot()
+        except Exception as e:
+            self.last_error = str(e)
+
+    def status(self):
+        return {
+            'directory': self.directory,
+            'interval_seconds': self.interval,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'snapshot_count': self.snapshot_count,
+            'last_snapshot': self.last_snapshot_path,
+            'last_snapshot_at': self.last_snapshot_at.isoformat() if self.last_snapshot_at else None,
+            'last_duration_ms': self.last_duration_ms,
+            'last_max_pause_ms': self.last_max_pause_ms,
+            'last_restarts': self.last_restarts,
+            'last_error': self.last_error,
+        }
+
+
+class _BackupStep:
+    """
+    一次快照的分步备份状态：每一步前获得写事务锁，两步之间释放
+    max_pause 为单次持有锁的最长时间，即写操作最长可能等待的时间
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.held = False
+        self.held_since = None
+        self.max_pause = 0.0
+        self.restarts = 0
+        self.last_remaining = None
+
+    def acquire(self):
+        self.manager._acquire_write_lock()
+        self.held = True
+        self.held_since = time.perf_counter()
+
+    def release(self):
+        if not self.held:
+            return
+        self.max_pause = max(self.max_pause, time.perf_counter() - self.held_since)
+        self.held = False
+        if self.manager.write_lock is not None:
+            self.manager.write_lock.release()
+
+    def progress(self, status, remaining, total):
+        """sqlite3 在每一步之后调用"""
+        if remaining == 0:
+            return
+        if self.last_remaining is not None and remaining >= self.last_remaining:
+            # 上一步之后有写入提交，SQLite 从头重新备份
+            self.restarts += 1
+        self.last_remaining = remaining
+        if self.manager.write_lock is None or self.restarts >= self.manager.max_restarts:
+            # 持续写入时不再让出，持有锁完成剩余的复制
+            return
+        self.release()
+        time.sleep(self.manager.step_sleep)
+        self.acquire()
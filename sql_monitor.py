@@ -0,0 +1,306 @@
+"""
+SQL 语句监控
+通过 SQLAlchemy 的 before/after_cursor_execute 事件统计每个请求执行的语句数和数据库耗时：
+    - 调试模式（app.debug 或 SQL_DEBUG_HEADERS=1）下通过响应头 X-DB-Query-Count / X-DB-Time-Ms 返回
+    - 写入 /api/metrics：每个请求的语句数、数据库耗时分布，以及疑似 N+1 的请求数
+同一请求中相同结构的语句（参数不同）执行超过 SQL_N_PLUS_ONE_THRESHOLD 次时视为疑似 N+1 查询，
+在日志中给出语句和次数，调试模式下附带 X-DB-N-Plus-One 响应头
+
+慢查询：执行时间超过 SQL_SLOW_QUERY_MS 毫秒（默认 100，负数关闭）的语句记录语句、参数结构、耗时和路由，
+按语句结构汇总；每种结构第一次变慢时执行 EXPLAIN QUERY PLAN（SQLite）/ EXPLAIN 记录执行计划，
+计划中出现全表扫描（SCAN）时标记 full_scan。汇总通过 /api/admin/slow_queries 查看
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', '10'))
+SLOW_QUERY_MS = float(os.environ.get('SQL_SLOW_QUERY_MS', '100'))
+SLOW_QUERY_RECENT = int(os.environ.get('SQL_SLOW_QUERY_RECENT', '200'))
+
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+queries_per_request = registry.histogram(
+    'db_queries_per_request', '每个请求执行的 SQL 语句数', ('route',), QUERY_COUNT_BUCKETS)
+db_time_per_request = registry.histogram(
+    'db_time_per_request_seconds', '每个请求的数据库耗时（秒）', ('route',), DB_TIME_BUCKETS)
+queries_total = registry.counter(
+    'db_queries_total', 'SQL 语句总数', ('route',))
+n_plus_one_total = registry.counter(
+    'db_n_plus_one_requests_total', '疑似 N+1 查询的请求数', ('route',))
+slow_queries_total = registry.counter(
+    'db_slow_queries_total', '超过慢查询阈值的语句数', ('route',))
+
+# IN (?, ?, ?) 的参数个数随数据变化，归一化为同一结构
+_IN_LIST = re.compile(r'\((?:\s*(?:\?|%s|:\w+)\s*,)+\s*(?:\?|%s|:\w+)\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    """语句结构：去掉多余空白，IN 列表折叠为 (?...)"""
+    return _IN_LIST.sub('(?...)', _WHITESPACE.sub(' ', statement).strip())
+
+
+class RequestSQLStats:
+    __slots__ = ('route', 'count', 'seconds', 'shapes')
+
+    def __init__(self, route):
+        self.route = route
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = {}
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        shape = statement_shape(statement)
+        self.shapes[shape] = self.shapes.get(shape, 0) + 1
+
+    def repeated_shapes(self, threshold=None):
+        """执行次数超过阈值的语句结构，按次数从多到少排列"""
+        threshold = N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        repeated = [(count, shape) for shape, count in self.shapes.items() if count > threshold]
+        return sorted(repeated, reverse=True)
+
+
+def parameters_shape(parameters, executemany=False):
+    """参数结构：只保留参数名/位置和类型，不记录参数值"""
+    if executemany:
+        parameters = list(parameters or ())
+        return f'{len(parameters)} × {parameters_shape(parameters[0]) if parameters else "()"}'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{key}: {type(value).__name__}' for key, value in parameters.items()) + '}'
+    if isinstance(parameters, (list, tuple)):
+        # 连续相同的类型合并，IN 列表的几百个参数显示为 str × 500
+        runs = []
+        for value in parameters:
+            name = type(value).__name__
+            if runs and runs[-1][0] == name:
+                runs[-1][1] += 1
+            else:
+                runs.append([name, 1])
+        return '(' + ', '.join(name if count == 1 else f'{name} × {count}' for name, count in runs) + ')'
+    return type(parameters).__name__
+
+
+# 各数据库查看执行计划的语句前缀
+_EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+}
+
+
+def explain(dbapi_connection, dialect_name, statement, parameters):
+    """在同一连接上获取语句的执行计划，返回每行一个字符串的列表；不支持的数据库返回 None"""
+    prefix = _EXPLAIN_PREFIXES.get(dialect_name)
+    if prefix is None:
+        return None
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters or ())
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    if dialect_name == 'sqlite':
+        # (id, parent, notused, detail)，按 parent 缩进
+        depth = {0: -1}
+        lines = []
+        for node_id, parent, _, detail in rows:
+            depth[node_id] = depth.get(parent, -1) + 1
+            lines.append('  ' * depth[node_id] + detail)
+        return lines
+    return [' '.join(str(value) for value in row) for row in rows]
+
+
+class SlowQueryLog:
+    """慢查询记录：按语句结构汇总，另保留最近 recent_size 条明细"""
+
+    def __init__(self, threshold_ms=SLOW_QUERY_MS, recent_size=SLOW_QUERY_RECENT):
+        self.threshold_ms = threshold_ms
+        self._shapes = {}
+        self._recent = deque(maxlen=recent_size)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.threshold_ms >= 0
+
+    def record(self, shape, params_shape, duration_ms, route):
+        """记录一条慢查询，该结构第一次出现时返回 True，调用方据此获取执行计划"""
+        now = datetime.utcnow()
+        with self._lock:
+            summary = self._shapes.get(shape)
+            first = summary is None
+            if first:
+                summary = self._shapes[shape] = {
+                    'statement': shape,
+                    'params_shape': params_shape,
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'routes': {},
+                    'first_seen': now,
+                    'plan': None,
+                    'full_scan': None,
+                }
+            summary['count'] += 1
+            summary['total_ms'] += duration_ms
+            summary['max_ms'] = max(summary['max_ms'], duration_ms)
+            summary['last_seen'] = now
+            summary['routes'][route] = summary['routes'].get(route, 0) + 1
+            self._recent.append({
+                'statement': shape,
+                'params_shape': params_shape,
+                'duration_ms': round(duration_ms, 3),
+                'route': route,
+                'at': now,
+            })
+        return first
+
+    def set_plan(self, shape, plan):
+        with self._lock:
+            summary = self._shapes.get(shape)
+            if summary is not None:
+                summary['plan'] = plan
+                summary['full_scan'] = any(line.strip().startswith('SCAN ') for line in plan or ())
+
+    def summary(self, limit=50):
+        """按累计耗时从高到低排列的语句结构，以及最近的慢查询明细"""
+        with self._lock:
+            shapes = [dict(item, routes=dict(item['routes']), total_ms=round(item['total_ms'], 3),
+                           max_ms=round(item['max_ms'], 3),
+                           avg_ms=round(item['total_ms'] / item['count'], 3))
+                      for item in self._shapes.values()]
+            recent = list(self._recent)[-limit:]
+        shapes.sort(key=lambda item: item['total_ms'], reverse=True)
+        return {
+            'threshold_ms': self.threshold_ms,
+            'shape_count': len(shapes),
+            'shapes': shapes[:limit],
+            'recent': recent[::-1],
+        }
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
+            self._recent.clear()
+
+
+slow_query_log = SlowQueryLog()
+
+# 当前请求的统计；不在请求中（启动、后台线程）执行的语句不统计
+_current_stats = ContextVar('sql_stats', default=None)
+
+
+def current_stats():
+    return _current_stats.get()
+
+
+# 语句开始时间记录在执行上下文上：内存数据库的 StaticPool 下所有线程共用一个连接，
+# 记录在 conn.info 中会被并发执行的语句互相覆盖。少数内部语句没有执行上下文，记录在线程本地的栈中
+_local = threading.local()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = time.perf_counter()
+    if context is not None:
+        context._sql_monitor_started = started
+    else:
+        _local.__dict__.setdefault('started', []).append(started)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        started = context._sql_monitor_started
+    else:
+        started = _local.started.pop()
+    elapsed = time.perf_counter() - started
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    if slow_query_log.enabled and elapsed * 1000 >= slow_query_log.threshold_ms:
+        _record_slow_query(conn, cursor, statement, parameters, executemany, elapsed, stats)
+
+
+def _record_slow_query(conn, cursor, statement, parameters, executemany, elapsed, stats):
+    route = stats.route if stats is not None else 'background'
+    shape = statement_shape(statement)
+    slow_queries_total.inc((route,))
+    if not slow_query_log.record(shape, parameters_shape(parameters, executemany), elapsed * 1000, route):
+        logger.debug('慢查询 %.1fms [%s]: %s', elapsed * 1000, route, shape[:200])
+        return
+    # 每种结构只在第一次变慢时获取执行计划；EXPLAIN 直接在 DBAPI 连接上执行，不会再次触发事件
+    try:
+        plan_parameters = list(parameters)[0] if executemany and parameters else parameters
+        plan = explain(cursor.connection, conn.dialect.name, statement, plan_parameters)
+    except Exception as e:
+        plan = [f'获取执行计划失败: {e}']
+    slow_query_log.set_plan(shape, plan)
+    logger.warning('慢查询 %.1fms [%s]: %s\n执行计划:\n%s', elapsed * 1000, route, shape[:500],
+                   '\n'.join(plan) if plan else ('（无）' if plan is not None else '（不支持）'),
+                   extra={'route': route, 'duration_ms': round(elapsed * 1000, 3)})
+
+
+def _handle_error(exception_context):
+    # 没有执行上下文的语句失败时不会触发 after_cursor_execute，丢弃对应的开始时间
+    if exception_context.execution_context is None and getattr(_local, 'started', None):
+        _local.started.pop()
+
+
+def install_sql_monitor(app, engine):
+    """为引擎注册语句计时事件，为 Flask 应用注册按请求汇总的钩子"""
+    from flask import request
+
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+    debug_headers = os.environ.get('SQL_DEBUG_HEADERS', '').lower() in ('1', 'true', 'yes', 'on')
+
+    @app.before_request
+    def _sql_monitor_before_request():
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        request.environ['sql_monitor.token'] = _current_stats.set(RequestSQLStats(route))
+
+    @app.after_request
+    def _sql_monitor_after_request(response):
+        stats = _current_stats.get()
+        if stats is None:
+            return response
+        if app.debug or debug_headers:
+            response.headers['X-DB-Query-Count'] = str(stats.count)
+            response.headers['X-DB-Time-Ms'] = f'{stats.seconds * 1000:.2f}'
+            repeated = stats.repeated_shapes()
+            if repeated:
+                response.headers['X-DB-N-Plus-One'] = str(repeated[0][0])
+        return response
+
+    @app.teardown_request
+    def _sql_monitor_teardown_request(exc):
+        token = request.environ.pop('sql_monitor.token', None)
+        stats = _current_stats.get()
+        if token is None or stats is None:
+            return
+        _current_stats.reset(token)
+        queries_per_request.observe((stats.route,), stats.count)
+        db_time_per_request.observe((stats.route,), stats.seconds)
+        if stats.count:
+            queries_total.inc((stats.route,), stats.count)
+        repeated = stats.repeated_shapes()
+        if repeated:
+            n_plus_one_total.inc((stats.route,))
+            count, shape = repeated[0]
+            logger.warning('疑似 N+1 查询: %s %s 中相同语句执行 %d 次: %s', request.method, stats.route, count, shape[:200],
+                           extra={'route': stats.route, 'repeat_count': count})
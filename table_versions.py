@@ -0,0 +1,232 @@
+"""
+数据表版本号
+每次提交写操作后递增，用于列表接口的 ETag 和检索索引的失效判断。
+内存数据库只在本进程可见，版本号存放在进程内；
+多个进程共享数据库文件时，版本号存放在数据库旁边的内存映射文件中，所有进程看到同一组数值；
+连接数据库服务器（DATABASE_URL）时，版本号存放在数据库的 table_versions 表中，与数据在同一事务中递增
+"""
+import mmap
+import os
+import secrets
+import struct
+import threading
+
+from sqlalchemy import BigInteger, Column, MetaData, String, Table, exc, insert, inspect, select, update
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，只能使用进程内版本号
+    fcntl = None
+
+
+class LocalTableVersions:
+    """进程内版本号，适用于每个进程独立的内存数据库"""
+
+    # 版本号在事务提交后递增，不需要数据库连接
+    transactional = False
+
+    def __init__(self, table_names):
+        self._versions = {name: 0 for name in table_names}
+        self._lock = threading.Lock()
+        # 实例标识区分不同进程，避免多个 worker 之间版本号相同但数据不同
+        self.token = secrets.token_hex(4)
+
+    def setup(self):
+        pass
+
+    def get(self, table_name):
+        return self._versions.get(table_name, 0)
+
+    def bump(self, table_names):
+        """递增版本号，返回 {表名: 新版本号}"""
+        result = {}
+        with self._lock:
+            for name in table_names:
+                self._versions[name] = self._versions.get(name, 0) + 1
+                result[name] = self._versions[name]
+        return result
+
+
+class SharedTableVersions:
+    """
+    跨进程共享的版本号
+    文件布局：8 字节实例标识 + 每个数据表一个 8 字节无符号计数器，
+    读取直接访问内存映射，递增时用文件锁保证多进程互斥
+    """
+
+    _HEADER = 8
+    _SLOT = struct.Struct('<Q')
+    transactional = False
+
+    def __init__(self, path, table_names):
+        self.path = path
+        self._slots = {name: i for i, name in enumerate(table_names)}
+        self._size = self._HEADER + self._SLOT.size * len(table_names)
+        self._pid = None
+        self._fd = None
+        self._map = None
+        self._open_lock = threading.Lock()
+        self._open()
+        self.token = self._map[:self._HEADER].hex()
+
+    def _open(self):
+        """
+        打开版本号文件并建立内存映射；fork 后在子进程中重新打开
+        flock 锁属于打开的文件描述，继承自父进程的描述符与父进程共用同一把锁，无法在进程间互斥
+        """
+        with self._open_lock:
+            if self._pid == os.getpid():
+                return
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size < self._size:
+                    header = os.pread(fd, self._HEADER, 0)
+                    if len(header) < self._HEADER or header == b'\0' * self._HEADER:
+                        os.pwrite(fd, secrets.token_bytes(self._HEADER), 0)
+                    os.ftruncate(fd, self._size)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            # 继承来的描述符和映射只关闭本进程的副本，不影响父进程
+            if self._map is not None:
+                self._map.close()
+            if self._fd is not None:
+                os.close(self._fd)
+            self._fd, self._map = fd, mmap.mmap(fd, self._size)
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+
+    def setup(self):
+        pass
+
+    def _offset(self, table_name):
+        return self._HEADER + self._SLOT.size * self._slots[table_name]
+
+    def get(self, table_name):
+        if table_name not in self._slots:
+            return 0
+        if self._pid != os.getpid():
+            self._open()
+        return self._SLOT.unpack_from(self._map, self._offset(table_name))[0]
+
+    def bump(self, table_names):
+        """递增版本号，返回 {表名: 新版本号}"""
+        if self._pid != os.getpid():
+            self._open()
+        result = {}
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                for name in table_names:
+                    if name not in self._slots:
+                        continue
+                    offset = self._offset(name)
+                    version = self._SLOT.unpack_from(self._map, offset)[0] + 1
+                    self._SLOT.pack_into(self._map, offset, version)
+                    result[name] = version
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return result
+
+
+# 数据库中的版本号表；$token 行保存随机生成的实例标识
+_metadata = MetaData()
+versions_table = Table(
+    'table_versions', _metadata,
+    Column('table_name', String(64), primary_key=True),
+    Column('version', BigInteger, nullable=False),
+)
+_TOKEN_ROW = '$token'
+
+
+class DatabaseTableVersions:
+    """
+    存放在数据库中的版本号，适用于多个 worker 连接同一个数据库服务器
+    bump 在写事务提交前、使用该事务的连接执行，数据和版本号同时对其他进程可见，回滚时一并撤销；
+    get 每次查询一行，其他 worker 的写入立即使 ETag 和检索索引失效；
+    get_all 一次查询读出全部版本号，请求内多次读取时由调用方缓存（见 app.get_table_version）
+    """
+
+    transactional = True
+
+    def __init__(self, engine, table_names):
+        self._engine = engine
+        self._table_names = list(table_names)
+        self._token = None
+
+    def setup(self):
+        """创建版本号表并补齐缺少的行；多个 worker 同时启动时以先插入的为准"""
+        try:
+            _metadata.create_all(self._engine, tables=[versions_table])
+        except exc.DBAPIError:
+            # 其他 worker 同时建表
+            if not inspect(self._engine).has_table(versions_table.name):
+                raise
+        for name in [_TOKEN_ROW] + self._table_names:
+            try:
+                with self._engine.begin() as conn:
+                    exists = conn.execute(
+                        select(versions_table.c.version).where(versions_table.c.table_name == name)
+                    ).first()
+                    if exists is None:
+                        version = secrets.randbits(62) if name == _TOKEN_ROW else 0
+                        conn.execute(insert(versions_table).values(table_name=name, version=version))
+            except exc.IntegrityError:
+                pass
+
+    @property
+    def token(self):
+        if self._token is None:
+            self._token = format(self.get(_TOKEN_ROW), 'x')
+        return self._token
+
+    def get(self, table_name):
+        with self._engine.connect() as conn:
+            version = conn.execute(
+                select(versions_table.c.version).where(versions_table.c.table_name == table_name)
+            ).scalar()
+        return version or 0
+
+    def get_all(self, connection=None):
+        """读出全部数据表的版本号，返回 {表名: 版本号}；传入 connection 时使用调用方的连接，不另取连接"""
+        query = select(versions_table.c.table_name, versions_table.c.version).where(
+            versions_table.c.table_name.in_(self._table_names)
+        )
+        if connection is not None:
+            rows = connection.execute(query).all()
+        else:
+            with self._engine.connect() as conn:
+                rows = conn.execute(query).all()
+        versions = {name: 0 for name in self._table_names}
+        versions.update((name, version) for name, version in rows)
+        return versions
+
+    def bump(self, table_names, connection):
+        """在 connection 所在的事务中递增版本号，返回 {表名: 新版本号}"""
+        # 按固定顺序加行锁，避免两个事务交叉等待
+        names = sorted(name for name in set(table_names) if name in self._table_names)
+        for name in names:
+            connection.execute(
+                update(versions_table)
+                .where(versions_table.c.table_name == name)
+                .values(version=versions_table.c.version + 1)
+            )
+        if not names:
+            return {}
+        rows = connection.execute(
+            select(versions_table.c.table_name, versions_table.c.version)
+            .where(versions_table.c.table_name.in_(names))
+        )
+        return {name: version for name, version in rows}
+
+
+def create_table_versions(database_path, table_names, engine=None):
+    """
+    数据库文件可被多个进程共享时使用共享版本号，连接数据库服务器时（传入 engine）版本号存放在数据库中，
+    否则使用进程内版本号
+    """
+    if database_path and fcntl is not None:
+        return SharedTableVersions(database_path + '.versions', table_names)
+    if engine is not None:
+        return DatabaseTableVersions(engine, table_names)
+    return LocalTableVersions(table_names)
@@ -0,0 +1,88 @@
+"""
+测试公共夹具
+测试使用默认的内存数据库，整个测试会话共用一个 app 模块；每个用例开始前清空管理员以外的数据
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 导入 app 前清除会改变部署方式的环境变量，保证使用内存数据库且不启用快照、录制、剖析
+for name in ('DATABASE_URL', 'DB_MODE', 'DB_PATH', 'SNAPSHOT_DIR', 'TRAFFIC_RECORD_DIR', 'PROFILE_SECRET',
+             'PROFILE_SAMPLE_RATE', 'METRICS_TOKEN', 'ADMIN_PASSWORD_HASH'):
+    os.environ.pop(name, None)
+
+ADMIN = {'admin_username': 'admin', 'admin_password': 'admin123'}
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    import app as app_module
+
+    app_module.init_db()
+    return app_module
+
+
+@pytest.fixture
+def client(app_module):
+    """清空管理员以外的学号和用户，恢复管理员密码，返回测试客户端"""
+    from sqlalchemy import delete, update
+
+    StudentID, User = app_module.StudentID, app_module.User
+    with app_module.app.app_context():
+        session = app_module.db.session
+        session.execute(delete(User).where(User.username != 'admin'))
+        session.execute(delete(StudentID).where(StudentID.student_id != '00000000'))
+        session.execute(update(User).where(User.username == 'admin')
+                        .values(password_hash=app_module.ADMIN_PASSWORD_HASH))
+        session.commit()
+        app_module.rebuild_search_indexes()
+    app_module.invalidate_admin_auth()
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def admin_post(client):
+    """以默认管理员身份调用管理接口：admin_post(路径, 其他参数..., headers=None)"""
+    def post(path, headers=None, **data):
+        return client.post(path, json=dict(ADMIN, **data), headers=headers)
+    return post
+
+
+def make_students(count, start=0, **fields):
+    """生成导入用的学号数据"""
+    return [dict({
+        'student_id': f'2024{index:06d}',
+        'name': f'学生{index}',
+        'department': '计算机学院',
+        'major': '软件工程',
+        'class_name': '软工2401班'
+    }, **fields) for index in range(start, start + count)]
+
+
+@pytest.fixture
+def add_users(app_module):
+    """直接写入数据库的用户及其学号（共用管理员的密码哈希，不做密码哈希计算），返回用户名列表"""
+    def add(count, start=0, **student_fields):
+        StudentID, User = app_module.StudentID, app_module.User
+        usernames = []
+        with app_module.app.app_context():
+            session = app_module.db.session
+            for index in range(start, start + count):
+                student = make_students(1, start=index + 500000, **student_fields)[0]
+                session.add(StudentID(is_used=True, **student))
+                session.add(User(
+                    username=f'user{index:04d}',
+                    email=f'user{index}@example.com',
+                    phone=f'139{index:08d}',
+                    student_id=student['student_id'],
+                    password_hash=app_module.ADMIN_PASSWORD_HASH
+                ))
+                usernames.append(f'user{index:04d}')
+            session.commit()
+            app_module.rebuild_search_indexes()
+        return usernames
+    return add
@@ -0,0 +1,81 @@
+"""ASGI 模式：原生异步的登录/注册，其余请求转交 Flask"""
+import asyncio
+import json
+
+import pytest
+
+from conftest import make_students
+
+
+def call(application, method, path, body=b'', headers=()):
+    """执行一次 ASGI 请求，返回 (状态码, 响应头, 响应体)"""
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'http_version': '1.1',
+             'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers]}
+    asyncio.run(application(scope, receive, send))
+    start, body_message = sent
+    return start['status'], dict(start['headers']), body_message['body']
+
+
+def post_json(application, path, data):
+    status, headers, body = call(application, 'POST', path, json.dumps(data).encode('utf-8'),
+                                 [('content-type', 'application/json')])
+    return status, json.loads(body)
+
+
+@pytest.fixture
+def asgi(client):
+    import asgi
+
+    return asgi
+
+
+def test_register_and_login(asgi, admin_post):
+    admin_post('/api/admin/import_students', students=make_students(1))
+    user = {'student_id': '2024000000', 'username': 'alice', 'email': 'alice@example.com',
+            'phone': '13912345678', 'password': 'secret123'}
+
+    status, payload = post_json(asgi.application, '/api/register', user)
+    assert status == 201, payload
+    assert payload['data']['user']['username'] == 'alice'
+
+    status, payload = post_json(asgi.application, '/api/register', user)
+    assert status == 400
+    assert payload['message'] == '该学号已被注册使用'
+
+    status, payload = post_json(asgi.application, '/api/login', {'student_id': '2024000000', 'password': 'secret123'})
+    assert status == 200
+    assert payload['data']['user']['last_login'] is not None
+
+    status, payload = post_json(asgi.application, '/api/login', {'student_id': '2024000000', 'password': 'wrong'})
+    assert status == 401
+
+
+def test_async_route_errors(asgi, monkeypatch):
+    assert post_json(asgi.application, '/api/login', {}) == (400, {'success': False, 'message': '请求数据为空'})
+    status, payload = post_json(asgi.application, '/api/login', {'student_id': '1'})
+    assert (status, payload['message']) == (400, '请输入学号和密码')
+
+    monkeypatch.setattr(asgi, 'MAX_BODY_SIZE', 8)
+    status, payload = post_json(asgi.application, '/api/login', {'student_id': '2024000000', 'password': 'x'})
+    assert status == 413
+
+
+def test_other_routes_go_through_flask(asgi):
+    status, headers, body = call(asgi.application, 'GET', '/api/health/live')
+    assert status == 200
+    assert json.loads(body) == {'success': True, 'data': {'status': 'alive'}}
+
+    # 非 JSON 的登录请求交给 Flask 处理，响应与同步模式一致
+    status, _, body = call(asgi.application, 'POST', '/api/login', b'student_id=1', [('content-type', 'text/plain')])
+    flask_response = asgi.app.test_client().post('/api/login', data=b'student_id=1', content_type='text/plain')
+    assert status == flask_response.status_code
+    assert body == flask_response.data
@@ -0,0 +1,94 @@
+"""/api/batch：每个操作一个保存点，atomic 全部回滚，chunk_size 分段提交"""
+from conftest import make_students
+
+
+def student_ids(admin_post):
+    students = admin_post('/api/admin/list_students').get_json()['data']['students']
+    return sorted(s['student_id'] for s in students if s['student_id'] != '00000000')
+
+
+def autocomplete(admin_post, query):
+    matches = admin_post('/api/admin/autocomplete_students', q=query).get_json()['data']['matches']
+    return [m['student_id'] for m in matches]
+
+
+def test_failed_operations_do_not_stop_the_batch(admin_post):
+    response = admin_post('/api/batch', operations=[
+        {'op': 'import_students', 'students': make_students(3)},
+        {'op': 'delete_student', 'student_id': 'missing'},
+        {'op': 'delete_student', 'student_id': '2024000001'},
+        {'op': 'rename_student'},
+    ])
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert (data['succeeded'], data['failed'], data['commits']) == (2, 2, 1)
+    assert [(r['index'], r['status']) for r in data['results']] == [(0, 200), (1, 404), (2, 200), (3, 400)]
+    assert student_ids(admin_post) == ['2024000000', '2024000002']
+    assert autocomplete(admin_post, '2024') == ['2024000000', '2024000002']
+
+
+def test_failed_operation_rolls_back_to_its_savepoint(app_module, admin_post, monkeypatch):
+    def half_done(operation, admin_user):
+        app_module.add_students(make_students(1, start=100))
+        raise RuntimeError('失败')
+
+    monkeypatch.setitem(app_module.BATCH_OPERATIONS, 'half_done', half_done)
+    data = admin_post('/api/batch', operations=[
+        {'op': 'import_students', 'students': make_students(1)},
+        {'op': 'half_done'},
+        {'op': 'import_students', 'students': make_students(1, start=1)},
+    ]).get_json()['data']
+    assert [r['success'] for r in data['results']] == [True, False, True]
+    assert data['results'][1]['status'] == 500
+    # 失败操作中已执行的写入只回滚到它自己的保存点
+    assert student_ids(admin_post) == ['2024000000', '2024000001']
+
+
+def test_atomic_batch_rolls_back_everything(admin_post):
+    response = admin_post('/api/batch', atomic=True, operations=[
+        {'op': 'import_students', 'students': make_students(2)},
+        {'op': 'delete_student', 'student_id': 'missing'},
+        {'op': 'import_students', 'students': make_students(2, start=2)},
+    ])
+    assert response.status_code == 404
+    body = response.get_json()
+    assert body['success'] is False
+    assert body['data']['rolled_back'] is True
+    # 失败后不再执行后续操作
+    assert len(body['data']['results']) == 2
+    assert student_ids(admin_post) == []
+    assert autocomplete(admin_post, '2024') == []
+
+
+def test_chunked_commits(admin_post):
+    operations = [{'op': 'import_students', 'students': make_students(1, start=i)} for i in range(5)]
+    data = admin_post('/api/batch', chunk_size=2, operations=operations).get_json()['data']
+    assert (data['succeeded'], data['commits']) == (5, 3)
+    assert len(student_ids(admin_post)) == 5
+    assert len(autocomplete(admin_post, '2024')) == 5
+
+    # atomic 时忽略 chunk_size，只在最后提交一次
+    operations = [{'op': 'delete_student', 'student_id': f'202400000{i}'} for i in range(4)]
+    data = admin_post('/api/batch', chunk_size=2, atomic=True, operations=operations).get_json()['data']
+    assert data['commits'] == 1
+    assert student_ids(admin_post) == ['2024000004']
+
+
+def test_delete_user_in_batch(admin_post, add_users):
+    add_users(2)
+    data = admin_post('/api/batch', operations=[
+        {'op': 'delete_user', 'target_username': 'user0000'},
+        {'op': 'delete_user', 'target_username': 'admin'},
+    ]).get_json()['data']
+    assert [r['status'] for r in data['results']] == [200, 400]
+    users = admin_post('/api/admin/list_users').get_json()['data']['users']
+    assert sorted(u['username'] for u in users) == ['admin', 'user0001']
+
+
+def test_invalid_batch_requests(app_module, admin_post, client):
+    assert admin_post('/api/batch', operations={'op': 'delete_student'}).status_code == 400
+    assert admin_post('/api/batch', operations=[], chunk_size='x').status_code == 400
+    too_many = [{'op': 'delete_student', 'student_id': 'x'}] * (app_module.BATCH_MAX_OPERATIONS + 1)
+    assert admin_post('/api/batch', operations=too_many).status_code == 400
+    assert client.post('/api/batch', json={'admin_username': 'admin', 'admin_password': 'wrong',
+                                           'operations': []}).status_code == 401
@@ -0,0 +1,80 @@
+"""API 基准测试：百分位数统计、场景执行和进程内运行"""
+import json
+
+import pytest
+
+from benchmarks import bench_api
+from benchmarks.bench_api import percentile, run_scenario, summarize
+
+
+def test_percentile_interpolates():
+    values = [1.0, 2.0, 3.0, 4.0]
+    assert percentile(values, 0.0) == 1.0
+    assert percentile(values, 0.5) == 2.5
+    assert percentile(values, 1.0) == 4.0
+    assert percentile([5.0], 0.99) == 5.0
+    assert percentile([], 0.5) is None
+
+
+def test_summarize():
+    summary = summarize([0.003, 0.001, 0.002], errors=1, statuses={200: 3, None: 1}, wall_seconds=0.5)
+    assert (summary['count'], summary['errors']) == (3, 1)
+    assert summary['statuses'] == {'200': 3, 'None': 1}
+    assert (summary['p50_ms'], summary['max_ms'], summary['mean_ms']) == (2.0, 3.0, 2.0)
+    assert summary['throughput_rps'] == 6.0
+    assert summary['samples_ms'] == [3.0, 1.0, 2.0]  # 原始样本保持请求顺序
+    assert summarize([], 0, {}, 0)['p50_ms'] is None
+
+
+class FakeTarget:
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.calls = []
+
+    def request(self, method, path, payload=None):
+        self.calls.append(payload)
+        status = self.statuses[(len(self.calls) - 1) % len(self.statuses)]
+        if status is None:
+            raise OSError('connection refused')
+        return status, 0.001
+
+
+@pytest.mark.parametrize('concurrency', [1, 4])
+def test_run_scenario_counts_server_errors(concurrency):
+    target = FakeTarget([200, 401, 500, None])
+    scenario = ('x', 'POST', '/api/x', lambda ctx, i: {'i': i}, 'read')
+    summary = run_scenario(target, scenario, {}, iterations=8, concurrency=concurrency, warmup=2)
+    assert len(target.calls) == 10  # 预热请求不计入统计
+    assert summary['count'] == 6  # 连接失败没有耗时
+    assert summary['errors'] == 4  # 5xx 和连接失败计为错误，4xx 不计
+    assert sum(summary['statuses'].values()) == 8
+
+
+def test_write_scenarios_skip_warmup():
+    target = FakeTarget([200])
+    run_scenario(target, ('x', 'POST', '/api/x', lambda ctx, i: {'i': i}, 'write'), {}, 3, 1, warmup=2)
+    assert target.calls == [{'i': 0}, {'i': 1}, {'i': 2}]
+
+
+def test_in_process_run(client, tmp_path, capsys):
+    output = tmp_path / 'result.json'
+    assert bench_api.main([
+        '--sizes', '30', '--users', '3', '--iterations', '3', '--kdf-iterations', '2', '--warmup', '1',
+        '--only', 'health', 'login', 'list_students_page', 'register', 'bulk_delete_students',
+        '--output', str(output)]) == 0
+    result = json.loads(output.read_text(encoding='utf-8'))
+    assert result['meta']['mode'] == 'in-process'
+    scenarios = result['results']['30']
+    assert set(scenarios) == {'health', 'login', 'list_students_page', 'register', 'bulk_delete_students'}
+    assert all(summary['errors'] == 0 for summary in scenarios.values())
+    assert scenarios['login']['statuses'] == {'200': 2}
+    assert scenarios['register']['count'] == 2
+    assert scenarios['bulk_delete_students']['statuses'] == {'200': 3}
+
+    bench_api.compare_to_baseline(result['results'], result)
+    assert 'list_students_page' in capsys.readouterr().out
+
+
+def test_unknown_scenario():
+    with pytest.raises(SystemExit):
+        bench_api.main(['--only', 'no_such_scenario'])
@@ -0,0 +1,89 @@
+"""批量删除学号和用户：按列表或院系/专业/班级筛选，一次集合操作完成"""
+import pytest
+
+from conftest import make_students
+
+
+def list_students(admin_post):
+    students = admin_post('/api/admin/list_students').get_json()['data']['students']
+    return {s['student_id']: s for s in students if s['student_id'] != '00000000'}
+
+
+def test_bulk_delete_students_by_id(admin_post, add_users):
+    admin_post('/api/admin/import_students', students=make_students(3))
+    add_users(1)  # 学号 2024500000 已被使用
+    response = admin_post('/api/admin/bulk_delete_students', student_ids=[
+        '2024000000', '2024000001', '2024000002', '2024000001', '2024500000', 'missing'])
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['deleted_count'] == 3
+    assert sorted(data['deleted_student_ids']) == ['2024000000', '2024000001', '2024000002']
+    assert data['used_count'] == 1
+    assert data['not_found_count'] == 1
+    assert list(list_students(admin_post)) == ['2024500000']
+
+    matches = admin_post('/api/admin/autocomplete_students', q='2024').get_json()['data']['matches']
+    assert [m['student_id'] for m in matches] == ['2024500000']
+
+
+def test_bulk_delete_students_in_chunks(app_module, admin_post, monkeypatch):
+    monkeypatch.setattr(app_module, 'IN_CHUNK_SIZE', 2)
+    admin_post('/api/admin/import_students', students=make_students(5))
+    data = admin_post('/api/admin/bulk_delete_students',
+                      student_ids=[f'202400000{i}' for i in range(6)]).get_json()['data']
+    assert (data['deleted_count'], data['not_found_count']) == (5, 1)
+    assert list_students(admin_post) == {}
+
+
+def test_bulk_delete_students_by_filter(admin_post, add_users):
+    admin_post('/api/admin/import_students', students=make_students(2, class_name='毕业班')
+               + make_students(2, start=2, class_name='在读班'))
+    add_users(1, class_name='毕业班')
+    data = admin_post('/api/admin/bulk_delete_students', filter={'class_name': '毕业班'}).get_json()['data']
+    assert (data['deleted_count'], data['used_count']) == (2, 1)
+    assert 'not_found_count' not in data
+    assert sorted(list_students(admin_post)) == ['2024000002', '2024000003', '2024500000']
+
+
+@pytest.mark.parametrize('target', [
+    {'student_ids': ['1'], 'filter': {'major': 'x'}},
+    {'student_ids': []},
+    {'student_ids': ['  ']},
+    {'student_ids': [1, 2]},
+    {'student_ids': '2024000000'},
+    {'filter': {}},
+    {'filter': {'name': '张三'}},
+    {},
+])
+def test_bulk_delete_invalid_target(admin_post, target):
+    response = admin_post('/api/admin/bulk_delete_students', **target)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+def test_bulk_delete_users_by_name(admin_post, add_users):
+    usernames = add_users(3)
+    response = admin_post('/api/admin/bulk_delete_users', usernames=usernames[:2] + ['admin', 'missing'])
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert sorted(data['deleted_usernames']) == usernames[:2]
+    assert data['released_student_count'] == 2
+    assert data['not_deleted_count'] == 2
+
+    users = admin_post('/api/admin/list_users').get_json()['data']['users']
+    assert sorted(u['username'] for u in users) == ['admin', 'user0002']
+    students = list_students(admin_post)
+    assert [students[f'202450000{i}']['is_used'] for i in range(3)] == [False, False, True]
+
+
+def test_bulk_delete_users_by_filter(admin_post, add_users):
+    add_users(2, department='化学学院')
+    add_users(1, start=2)
+    data = admin_post('/api/admin/bulk_delete_users', filter={'department': '化学学院'}).get_json()['data']
+    assert sorted(data['deleted_usernames']) == ['user0000', 'user0001']
+    assert 'not_deleted_count' not in data
+    # 筛选条件匹配管理员自己的学号时也不会删除管理员
+    data = admin_post('/api/admin/bulk_delete_users', filter={'department': '系统管理'}).get_json()['data']
+    assert data['deleted_count'] == 0
+    users = admin_post('/api/admin/list_users').get_json()['data']['users']
+    assert sorted(u['username'] for u in users) == ['admin', 'user0002']
@@ -0,0 +1,86 @@
+"""基准结果对比：秩和检验、回归判定、样本不足和 --strict"""
+import json
+
+import pytest
+
+from benchmarks import compare
+from benchmarks.compare import compare_scenario, mann_whitney_u, rank
+
+BASE = [10.0 + i * 0.1 for i in range(20)]
+
+
+def scenario(samples, errors=0):
+    return {'samples_ms': samples, 'errors': errors}
+
+
+def check(base, current, max_regression=10, max_p95_regression=25, alpha=0.05, min_samples=5):
+    return compare_scenario(base, current, max_regression, max_p95_regression, alpha, min_samples)
+
+
+def test_rank_averages_ties():
+    assert rank([3, 1, 3, 2]) == ([3.5, 1.0, 3.5, 2.0], [2])
+
+
+def test_mann_whitney_u():
+    u, p_value = mann_whitney_u(list(range(1, 11)), list(range(11, 21)))
+    assert u == 0 and p_value < 0.001
+    _, p_value = mann_whitney_u(BASE, list(BASE))
+    assert p_value > 0.9
+    assert mann_whitney_u([1.0] * 5, [1.0] * 5) == (12.5, 1.0)
+    assert mann_whitney_u([], [1.0]) == (None, None)
+
+
+def test_verdicts():
+    assert check(scenario(BASE), scenario(BASE))['verdict'] == 'unchanged'
+    result = check(scenario(BASE), scenario([v * 1.5 for v in BASE]))
+    assert result['verdict'] == 'regression'
+    assert result['reasons'][0].startswith('p50 +')
+    assert round(result['p50_change']) == 50
+    # 超过默认阈值但在单独设置的阈值之内
+    assert check(scenario(BASE), scenario([v * 1.5 for v in BASE]), 60, 60)['verdict'] == 'slower'
+    assert check(scenario(BASE), scenario([v * 0.5 for v in BASE]))['verdict'] == 'improved'
+    # 只有尾部变慢
+    tail = BASE[:17] + [v * 3 for v in BASE[17:]]
+    assert check(scenario(BASE), scenario(tail), alpha=1.0)['reasons'][0].startswith('p95 +')
+
+
+def test_errors_and_insufficient_samples():
+    result = check(scenario(BASE), scenario(BASE, errors=2))
+    assert result['verdict'] == 'regression' and result['reasons'] == ['errors 0 -> 2']
+    result = check(scenario(BASE[:3]), scenario(BASE[:3]))
+    assert result['verdict'] == 'insufficient' and 'p_value' not in result
+    # 样本不足时错误增多仍判定为回归
+    assert check(scenario(BASE[:3]), scenario(BASE[:3], errors=1))['verdict'] == 'regression'
+
+
+def write_results(path, scenarios, mode='in-process'):
+    path.write_text(json.dumps({'meta': {'mode': mode, 'cpu_count': 4}, 'results': {'100': scenarios}}),
+                    encoding='utf-8')
+    return str(path)
+
+
+def test_main_exit_codes(tmp_path, capsys):
+    base = write_results(tmp_path / 'base.json', {
+        'health': scenario(BASE), 'register': scenario(BASE[:3]), 'removed': scenario(BASE)})
+    current = write_results(tmp_path / 'current.json', {
+        'health': scenario(BASE), 'register': scenario(BASE[:3]), 'added': scenario(BASE)})
+    output = tmp_path / 'rows.json'
+
+    assert compare.main([base, current, '--output', str(output)]) == 0
+    assert '1 个场景样本不足' in capsys.readouterr().out
+    verdicts = {row['scenario']: row['verdict'] for row in json.loads(output.read_text(encoding='utf-8'))}
+    assert verdicts == {'health': 'unchanged', 'register': 'insufficient', 'added': 'new', 'removed': 'missing'}
+
+    assert compare.main([base, current, '--strict']) == 1
+    assert compare.main([base, current, '--strict', '--min-samples', '3']) == 0
+
+    slower = write_results(tmp_path / 'slower.json', {'health': scenario([v * 1.3 for v in BASE])}, mode='http')
+    assert compare.main([base, slower]) == 1
+    out = capsys.readouterr().out
+    assert '结果可能不可比' in out and 'health@100' in out
+    assert compare.main([base, slower, '--threshold', 'health=40']) == 0
+
+
+def test_invalid_threshold():
+    with pytest.raises(SystemExit):
+        compare.main(['a.json', 'b.json', '--threshold', 'health'])
@@ -0,0 +1,86 @@
+"""/api/* 响应压缩：编码协商、大小阈值、流式响应和 ETag"""
+import gzip
+import json
+import zlib
+
+import pytest
+from werkzeug.test import Client
+
+import compression
+from compression import CompressionMiddleware, parse_accept_encoding
+
+from conftest import make_students
+
+BODY = json.dumps({'items': [{'id': i, 'name': f'学生{i}'} for i in range(200)]}).encode('utf-8')
+
+
+def wsgi_app(body=BODY, content_type='application/json', headers=(), stream=False):
+    def app(environ, start_response):
+        response_headers = [('Content-Type', content_type)] + list(headers)
+        if stream:
+            start_response('200 OK', response_headers)
+            return (body[i:i + 500] for i in range(0, len(body), 500))
+        start_response('200 OK', response_headers + [('Content-Length', str(len(body)))])
+        return [body]
+    return app
+
+
+def get(app, path='/api/items', accept='gzip', **options):
+    return Client(CompressionMiddleware(app, **options)).get(path, headers={'Accept-Encoding': accept})
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding('gzip, br;q=0.5, identity;q=bad, ') == {'gzip': 1.0, 'br': 0.5, 'identity': 0.0}
+
+
+def test_gzip_response(monkeypatch):
+    monkeypatch.setattr(compression, 'brotli', None)
+    response = get(wsgi_app(), accept='gzip, deflate, br')
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert int(response.headers['Content-Length']) == len(response.data) < len(BODY)
+    assert gzip.decompress(response.data) == BODY
+
+
+def test_brotli_preferred_when_available():
+    brotli = pytest.importorskip('brotli')
+    response = get(wsgi_app(), accept='gzip, br')
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data) == BODY
+    assert get(wsgi_app(), accept='gzip;q=1, br;q=0.5').headers['Content-Encoding'] == 'gzip'
+
+
+@pytest.mark.parametrize('app, path, accept', [
+    (wsgi_app(b'{"ok": true}'), '/api/items', 'gzip'),   # 小于 min_size
+    (wsgi_app(), '/', 'gzip'),                             # 不在压缩路径下
+    (wsgi_app(), '/api/items', 'gzip;q=0'),                # 客户端拒绝 gzip
+    (wsgi_app(), '/api/items', ''),
+    (wsgi_app(content_type='image/png'), '/api/items', 'gzip'),
+    (wsgi_app(headers=[('Cache-Control', 'no-transform')]), '/api/items', 'gzip'),
+])
+def test_uncompressed_responses(monkeypatch, app, path, accept):
+    monkeypatch.setattr(compression, 'brotli', None)
+    response = get(app, path, accept)
+    assert 'Content-Encoding' not in response.headers
+    assert response.data in (BODY, b'{"ok": true}')
+
+
+def test_streamed_response(monkeypatch):
+    monkeypatch.setattr(compression, 'brotli', None)
+    response = get(wsgi_app(stream=True))
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert zlib.decompress(response.data, 31) == BODY
+
+
+def test_etag_after_compression(monkeypatch):
+    monkeypatch.setattr(compression, 'brotli', None)
+    assert get(wsgi_app(headers=[('ETag', '"abc"')])).headers['ETag'] == '"abc-gzip"'
+    assert get(wsgi_app(headers=[('ETag', 'W/"abc"')])).headers['ETag'] == 'W/"abc"'
+
+
+def test_app_list_response_is_compressed(admin_post):
+    admin_post('/api/admin/import_students', students=make_students(50))
+    response = admin_post('/api/admin/list_students', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert len(json.loads(gzip.decompress(response.data))['data']['students']) == 51
@@ -0,0 +1,85 @@
+"""压测数据生成：确定性、唯一性、文件输出和写入数据库"""
+import csv
+import json
+import re
+
+import pytest
+
+from benchmarks import datagen
+from benchmarks.datagen import RosterGenerator
+
+
+def test_generator_is_deterministic():
+    first = list(RosterGenerator(7).roster(200, 50))
+    assert first == list(RosterGenerator(7).roster(200, 50))
+    assert first != list(RosterGenerator(8).roster(200, 50))
+    # 从中间开始生成时学号和班级与完整生成的一致
+    assert [s['student_id'] for s in RosterGenerator(7).students(10, start=100)] == \
+        [student['student_id'] for student, _ in first[100:110]]
+
+
+def test_generated_values_are_unique_and_consistent():
+    generator = RosterGenerator(0)
+    students = list(generator.students(5000))
+    assert len({s['student_id'] for s in students}) == 5000
+    assert all(re.fullmatch(r'\d{10,}', s['student_id']) for s in students)
+    majors = {major: department for _, _, department, major, _ in datagen.MAJORS}
+    assert all(majors[s['major']] == s['department'] for s in students)
+    # 同一班级的学生属于同一专业
+    classes = {}
+    for s in students:
+        classes.setdefault((s['department'], s['class_name']), set()).add(s['major'])
+    assert all(len(majors_in_class) == 1 for majors_in_class in classes.values())
+
+    users = [generator.user(s, i) for i, s in enumerate(students)]
+    assert len({u['phone'] for u in users}) == len({u['email'] for u in users}) == len({u['username'] for u in users}) == 5000
+    assert all(re.fullmatch(r'1[3-9]\d{9}', u['phone']) for u in users)
+
+
+def test_write_files(tmp_path):
+    assert datagen.main(['--students', '30', '--users', '5', '--format', 'json', '--output', str(tmp_path)]) == 0
+    students = json.loads((tmp_path / 'students.json').read_text(encoding='utf-8'))
+    users = json.loads((tmp_path / 'users.json').read_text(encoding='utf-8'))
+    assert len(students) == 30 and len(users) == 5
+    assert [u['student_id'] for u in users] == [s['student_id'] for s in students[:5]]
+
+    assert datagen.main(['--students', '30', '--users', '5', '--format', 'csv', '--output', str(tmp_path)]) == 0
+    with open(tmp_path / 'students.csv', encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert rows == students
+    with open(tmp_path / 'users.csv', encoding='utf-8', newline='') as f:
+        assert list(csv.DictReader(f)) == users
+
+
+def test_users_cannot_exceed_students():
+    with pytest.raises(SystemExit):
+        datagen.main(['--students', '3', '--users', '4'])
+
+
+def test_db_format_refuses_memory_database(capsys):
+    with pytest.raises(SystemExit) as exc:
+        datagen.main(['--students', '3', '--format', 'db'])
+    assert exc.value.code == 2
+    assert 'DATABASE_URL' in capsys.readouterr().err
+
+
+def test_uses_memory_db(monkeypatch, tmp_path):
+    assert datagen.uses_memory_db()
+    monkeypatch.setenv('DB_MODE', 'file')
+    monkeypatch.setenv('DB_PATH', str(tmp_path / 'kb.db'))
+    assert not datagen.uses_memory_db()
+    monkeypatch.delenv('DB_MODE')
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'other.db'}")
+    assert not datagen.uses_memory_db()
+
+
+def test_load_database(app_module, client, admin_post):
+    pairs = RosterGenerator(3).roster(20, 4)
+    assert datagen.load_database(pairs, password_hash=app_module.ADMIN_PASSWORD_HASH) == (20, 4)
+    students = admin_post('/api/admin/list_students').get_json()['data']['students']
+    assert sum(1 for s in students if s['is_used']) == 5  # 含管理员
+    user = RosterGenerator(3).user(next(RosterGenerator(3).students(1)), 0)
+    response = client.post('/api/login', json={'student_id': user['student_id'], 'password': 'admin123'})
+    assert response.get_json()['success'] is True
+    matches = admin_post('/api/admin/autocomplete_students', q=user['student_id'][:6]).get_json()['data']['matches']
+    assert matches  # 写入后重建了检索索引
@@ -0,0 +1,75 @@
+"""数据库地址、SQLite 文件模式的 PRAGMA 和连接池配置"""
+from sqlalchemy import create_engine, text
+
+from db_engine import (MeteredQueuePool, database_uri, engine_options, install_sqlite_pragmas, is_sqlite_file,
+                       pool_metrics, pool_status)
+
+
+def test_database_uri_modes(monkeypatch, tmp_path):
+    for name in ('DATABASE_URL', 'DB_MODE', 'DB_PATH'):
+        monkeypatch.delenv(name, raising=False)
+    assert database_uri(str(tmp_path)) == 'sqlite:///:memory:'
+
+    monkeypatch.setenv('DB_MODE', 'file')
+    assert database_uri(str(tmp_path)) == 'sqlite:///' + str(tmp_path / 'users.db')
+    monkeypatch.setenv('DB_PATH', str(tmp_path / 'data.db'))
+    assert database_uri(str(tmp_path)) == 'sqlite:///' + str(tmp_path / 'data.db')
+
+    # DATABASE_URL 优先，postgres:// 前缀改写为 postgresql://
+    monkeypatch.setenv('DATABASE_URL', 'postgres://app:secret@db/app')
+    assert database_uri(str(tmp_path)) == 'postgresql://app:secret@db/app'
+
+
+def test_memory_database_uses_default_pool():
+    assert engine_options('sqlite:///:memory:') == {}
+    assert engine_options('sqlite://') == {}
+
+
+def test_file_database_pragmas(tmp_path):
+    uri = f'sqlite:///{tmp_path}/users.db'
+    engine = create_engine(uri, **engine_options(uri))
+    assert is_sqlite_file(engine.url)
+    install_sqlite_pragmas(engine)
+    try:
+        with engine.connect() as conn:
+            assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert conn.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+            assert conn.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+            assert conn.execute(text('PRAGMA temp_store')).scalar() == 2  # MEMORY
+    finally:
+        engine.dispose()
+
+
+def test_file_database_pool_options(monkeypatch, tmp_path):
+    monkeypatch.setenv('DB_POOL_SIZE', '3')
+    monkeypatch.delenv('DB_POOL_PRE_PING', raising=False)
+    options = engine_options(f'sqlite:///{tmp_path}/users.db')
+    assert options['poolclass'] is MeteredQueuePool
+    assert options['pool_size'] == 3
+    assert options['pool_pre_ping'] is False
+    assert engine_options('postgresql://app@db/app')['pool_pre_ping'] is True
+
+
+def test_pool_status_reports_checkouts(tmp_path):
+    uri = f'sqlite:///{tmp_path}/users.db'
+    engine = create_engine(uri, **engine_options(uri))
+    try:
+        before = pool_metrics.snapshot()['checkouts']
+        with engine.connect() as conn:
+            status = pool_status(engine)
+            assert status['pool_class'] == 'MeteredQueuePool'
+            assert status['checked_out'] == 1
+            conn.execute(text('SELECT 1'))
+        with engine.connect():
+            pass
+        status = pool_status(engine)
+        assert status['checked_out'] == 0
+        assert status['metrics']['checkouts'] == before + 2
+    finally:
+        engine.dispose()
+
+
+def test_memory_pool_status(app_module):
+    with app_module.app.app_context():
+        status = pool_status(app_module.db.engine)
+    assert status == {'backend': 'sqlite', 'pool_class': 'StaticPool'}
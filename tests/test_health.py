@@ -0,0 +1,86 @@
+"""健康检查：存活 / 就绪状态、数据库探测结果和详细信息的令牌保护"""
+import pytest
+
+import health
+
+TOKEN = {'Authorization': 'Bearer token-123'}
+
+
+@pytest.fixture
+def metrics_token(monkeypatch):
+    monkeypatch.setenv('METRICS_TOKEN', 'token-123')
+
+
+def test_health_without_token_keeps_original_fields(client):
+    response = client.get('/api/health')
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert set(data) == {'status', 'timestamp', 'database', 'deployment'}
+    assert (data['status'], data['database']) == ('healthy', 'connected')
+
+
+def test_health_details_with_token(client, metrics_token):
+    assert 'database_latency_ms' not in client.get('/api/health').get_json()['data']
+    data = client.get('/api/health', headers=TOKEN).get_json()['data']
+    assert data['database_latency_ms'] >= 0
+    assert 'import_ms' in data['startup']
+
+
+def test_live_and_ready_details_require_token(client, metrics_token):
+    assert client.get('/api/health/live').get_json()['data'] == {'status': 'alive'}
+    assert client.get('/api/health/ready').get_json()['data'] == {'status': 'healthy'}
+
+    live = client.get('/api/health/live', headers=TOKEN).get_json()['data']
+    assert live['uptime_seconds'] >= 0 and live['pid'] > 0
+    ready = client.get('/api/health/ready', headers=TOKEN).get_json()['data']
+    assert ready['database']['status'] == 'connected'
+    assert 'pool' in ready['database'] and 'process' in ready and 'startup' in ready
+    assert client.get('/api/health/ready', headers={'Authorization': 'Bearer wrong'}).get_json()['data'] == {
+        'status': 'healthy'}
+
+
+def test_slow_database_is_degraded(client, monkeypatch):
+    monkeypatch.setattr(health, 'DB_SLOW_MS', -1)
+    response = client.get('/api/health')
+    assert response.status_code == 200  # 兼容接口只在数据库不可用时返回 503
+    assert response.get_json()['data']['status'] == 'degraded'
+    response = client.get('/api/health/ready')
+    assert response.status_code == 503
+    assert response.get_json() == {'success': False, 'data': {'status': 'degraded'}}
+
+
+def test_unavailable_database(client, monkeypatch, metrics_token):
+    monkeypatch.setattr(health, 'probe_database', lambda engine: (False, 1.5, 'OperationalError'))
+    response = client.get('/api/health')
+    assert response.status_code == 503
+    assert response.get_json()['data']['database'] == 'error'
+    response = client.get('/api/health/ready', headers=TOKEN)
+    assert response.status_code == 503
+    assert response.get_json()['data']['database']['error'] == 'OperationalError'
+    assert client.get('/api/health/live').status_code == 200
+
+
+def test_probe_database_reports_error_type():
+    class BrokenEngine:
+        def connect(self):
+            raise ConnectionError('postgresql://user:secret@db/kb')
+
+    ok, latency_ms, error = health.probe_database(BrokenEngine())
+    assert (ok, error) == (False, 'ConnectionError')
+    assert latency_ms >= 0
+
+
+def test_reporters_and_cache_stats(monkeypatch):
+    monkeypatch.setattr(health, '_caches', {})
+    monkeypatch.setattr(health, '_reporters', {})
+    stats = health.cache_stats('test-cache')
+    assert health.cache_stats('test-cache') is stats
+    stats.hit()
+    stats.hit()
+    stats.miss()
+    assert stats.status() == {'hits': 2, 'misses': 1, 'hit_ratio': 0.6667}
+
+    health.register_reporter('test-ok', lambda: {'queued': 0})
+    health.register_reporter('test-broken', lambda: 1 / 0)
+    status = health.reporter_status()
+    assert status == {'test-ok': {'queued': 0}, 'test-broken': {'error': 'ZeroDivisionError'}}
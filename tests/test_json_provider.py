@@ -0,0 +1,72 @@
+"""JSON 编码：orjson 与标准库输出一致，datetime 直接编码为 ISO 8601"""
+import json
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+
+import json_provider
+from json_provider import FastJSONProvider
+
+DATA = {
+    'name': '张三',
+    'created_at': datetime(2024, 9, 1, 8, 30, 15, 123456),
+    'login_at': datetime(2024, 9, 1, 8, 30),
+    'birthday': date(2006, 5, 4),
+    'amount': Decimal('12.50'),
+    'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'tags': {'新生'},
+    'b': [1, 2.5, None, True],
+    'a': {'z': 1, 'y': 2},
+}
+EXPECTED = json.dumps({
+    'name': '张三',
+    'created_at': '2024-09-01T08:30:15.123456',
+    'login_at': '2024-09-01T08:30:00',
+    'birthday': '2006-05-04',
+    'amount': '12.50',
+    'id': '12345678-1234-5678-1234-567812345678',
+    'tags': ['新生'],
+    'b': [1, 2.5, None, True],
+    'a': {'z': 1, 'y': 2},
+}, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def provider(request, monkeypatch):
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setattr(json_provider, 'orjson', None)
+    provider = FastJSONProvider(Flask(__name__))
+    assert provider.backend == request.param
+    return provider
+
+
+def test_backends_produce_same_output(provider):
+    assert provider.dumps_bytes(DATA) == EXPECTED.encode('utf-8')
+    assert provider.dumps(DATA) == EXPECTED
+    assert provider.loads(EXPECTED.encode('utf-8'))['name'] == '张三'
+    assert provider.loads(EXPECTED)['a'] == {'y': 2, 'z': 1}
+
+
+def test_large_integers_fall_back_to_stdlib(provider):
+    assert provider.dumps_bytes({'n': 2 ** 70}) == b'{"n":1180591620717411303424}'
+
+
+def test_unsupported_type(provider):
+    with pytest.raises(TypeError):
+        provider.dumps_bytes({'value': object()})
+
+
+def test_invalid_json_raises_value_error(provider):
+    with pytest.raises(ValueError):
+        provider.loads(b'{"a":')
+
+
+def test_app_responses_encode_datetimes(admin_post):
+    students = admin_post('/api/admin/list_students').get_json()['data']['students']
+    created_at = students[0]['created_at']
+    assert datetime.fromisoformat(created_at).isoformat() == created_at
@@ -0,0 +1,52 @@
+"""列表接口的数据表版本 ETag 和 304 响应"""
+import pytest
+
+from conftest import ADMIN, make_students
+
+
+def test_unchanged_list_returns_304(admin_post):
+    first = admin_post('/api/admin/list_students')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert etag.startswith('W/')
+
+    second = admin_post('/api/admin/list_students', headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.data == b''
+    assert second.headers['ETag'] == etag
+
+
+def test_write_invalidates_etag(admin_post):
+    etag = admin_post('/api/admin/list_students').headers['ETag']
+    admin_post('/api/admin/import_students', students=make_students(1))
+
+    response = admin_post('/api/admin/list_students', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.get_json()['data']['total'] == 2
+
+
+def test_user_changes_invalidate_users_etag(admin_post, add_users):
+    add_users(2)
+    etag = admin_post('/api/admin/list_users').headers['ETag']
+    assert admin_post('/api/admin/list_users', headers={'If-None-Match': etag}).status_code == 304
+
+    admin_post('/api/admin/delete_user', target_username='user0000')
+    response = admin_post('/api/admin/list_users', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['data']['total'] == 2
+
+
+def test_page_params_are_part_of_etag(admin_post):
+    etag_all = admin_post('/api/admin/list_students').headers['ETag']
+    etag_page = admin_post('/api/admin/list_students', limit=10).headers['ETag']
+    assert etag_all != etag_page
+    assert admin_post('/api/admin/list_students', limit=10, headers={'If-None-Match': etag_all}).status_code == 200
+
+
+@pytest.mark.parametrize('path', ['/api/admin/list_students', '/api/admin/list_users'])
+def test_authentication_runs_before_304(client, admin_post, path):
+    etag = admin_post(path).headers['ETag']
+    response = client.post(path, json=dict(ADMIN, admin_password='wrong-password'), headers={'If-None-Match': etag})
+    assert response.status_code == 401
+    assert 'ETag' not in response.headers
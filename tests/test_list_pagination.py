@@ -0,0 +1,93 @@
+"""管理员列表接口的键集分页（after_id / limit）和管理员身份验证缓存"""
+from conftest import ADMIN, make_students
+
+
+def walk_pages(admin_post, path, key, limit):
+    """按 next_after_id 逐页读取，返回 (全部记录, 页数)"""
+    items, pages, after_id = [], 0, 0
+    while True:
+        response = admin_post(path, after_id=after_id, limit=limit)
+        assert response.status_code == 200
+        data = response.get_json()['data']
+        items.extend(data[key])
+        pages += 1
+        if not data['has_more']:
+            return items, pages
+        assert data['next_after_id'] == data[key][-1]['id']
+        after_id = data['next_after_id']
+
+
+def test_list_students_pages_cover_full_list(admin_post):
+    admin_post('/api/admin/import_students', students=make_students(7))
+
+    full = admin_post('/api/admin/list_students').get_json()['data']
+    assert 'has_more' not in full
+    assert full['total'] == 8  # 含管理员学号
+
+    items, pages = walk_pages(admin_post, '/api/admin/list_students', 'students', 3)
+    assert pages == 3
+    assert [s['id'] for s in items] == sorted(s['id'] for s in full['students'])
+
+
+def test_list_students_page_counts(admin_post):
+    admin_post('/api/admin/import_students', students=make_students(4))
+
+    data = admin_post('/api/admin/list_students', limit=2).get_json()['data']
+    assert len(data['students']) == 2
+    assert data['has_more'] is True
+    assert (data['total'], data['used_count'], data['available_count']) == (5, 1, 4)
+
+    # 最后一页之后再取：空列表，next_after_id 保持不变
+    last = admin_post('/api/admin/list_students', after_id=10 ** 9, limit=2).get_json()['data']
+    assert last['students'] == [] and last['has_more'] is False
+    assert last['next_after_id'] == 10 ** 9
+
+
+def test_list_users_pages_cover_full_list(admin_post, add_users):
+    add_users(5)
+
+    full = admin_post('/api/admin/list_users').get_json()['data']
+    assert full['total'] == 6
+
+    items, pages = walk_pages(admin_post, '/api/admin/list_users', 'users', 4)
+    assert pages == 2
+    assert [u['username'] for u in items] == [u['username'] for u in sorted(full['users'], key=lambda u: u['id'])]
+    assert admin_post('/api/admin/list_users', limit=4).get_json()['data']['total'] == 6
+
+
+def test_invalid_page_params(admin_post):
+    response = admin_post('/api/admin/list_students', limit='abc')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+def test_admin_auth_is_cached(app_module, client, monkeypatch):
+    checks = []
+    original = app_module.User.check_password
+
+    def counting_check(self, password):
+        checks.append(password)
+        return original(self, password)
+
+    monkeypatch.setattr(app_module.User, 'check_password', counting_check)
+    with app_module.app.app_context():
+        assert app_module.verify_admin('admin', 'admin123') is not None
+        assert app_module.verify_admin('admin', 'admin123') is not None
+        assert app_module.verify_admin('admin', 'wrong') is None
+        assert app_module.verify_admin('admin', 'wrong') is None
+    # 正确密码只验证一次，错误密码不缓存
+    assert checks == ['admin123', 'wrong', 'wrong']
+
+
+def test_admin_auth_cache_invalidated_on_password_change(app_module, client):
+    with app_module.app.app_context():
+        assert app_module.verify_admin('admin', 'admin123') is not None
+        admin = app_module.User.query.filter_by(username='admin').first()
+        admin.set_password('changed-password')
+        app_module.db.session.commit()
+
+        assert app_module.verify_admin('admin', 'admin123') is None
+        assert app_module.verify_admin('admin', 'changed-password') is not None
+
+    response = client.post('/api/admin/list_students', json=ADMIN)
+    assert response.status_code == 401
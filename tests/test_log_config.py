@@ -0,0 +1,91 @@
+"""日志配置：JSON 格式、按模块设置级别、非阻塞队列和 fork 后的写出线程"""
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+
+from conftest import ROOT
+from log_config import JSONFormatter, NonBlockingQueueHandler, parse_levels, summarize_values
+
+
+def test_parse_levels():
+    assert parse_levels(' sql_monitor=warning, profiling=DEBUG,bad, x=LOUD, =INFO') == {
+        'sql_monitor': 'WARNING', 'profiling': 'DEBUG'}
+    assert parse_levels(None) == {}
+
+
+def test_summarize_values():
+    assert summarize_values(['a', 'b']) == 'a, b'
+    assert summarize_values(range(12), limit=3) == '0, 1, 2 等 12 个'
+
+
+def test_json_formatter_includes_extra_fields():
+    record = logging.LogRecord('app', logging.WARNING, __file__, 1, '导入 %d 个', (3,), None)
+    record.duplicate_count = 2
+    record._private = 'hidden'
+    entry = json.loads(JSONFormatter().format(record))
+    assert (entry['level'], entry['logger'], entry['message']) == ('WARNING', 'app', '导入 3 个')
+    assert entry['duplicate_count'] == 2
+    assert '_private' not in entry and 'args' not in entry
+    assert entry['time'].endswith('Z')
+
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        record = logging.LogRecord('app', logging.ERROR, __file__, 1, 'failed', (), sys.exc_info())
+    assert 'ValueError: boom' in json.loads(JSONFormatter().format(record))['exception']
+
+
+def test_queue_handler_drops_when_full():
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    logger = logging.getLogger('test_log_config.drop')
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        logger.warning('first')
+        logger.warning('second')
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+
+
+SCRIPT = r'''
+import logging, os
+from log_config import configure_logging, logging_status, stop_logging
+handler = configure_logging()
+assert configure_logging() is handler
+logging.getLogger('noisy').info('hidden')
+logging.getLogger('noisy').warning('shown', extra={'route': '/api/x'})
+pid = os.fork()
+if pid == 0:
+    logging.getLogger('child').info('from child')
+    stop_logging()
+    os._exit(0 if logging_status()['configured'] else 1)
+os.waitpid(pid, 0)
+logging.getLogger('parent').info('done')
+'''
+
+
+def test_configure_logging_json_and_fork():
+    env = dict(os.environ, LOG_FORMAT='json', LOG_LEVEL='INFO', LOG_LEVELS='noisy=WARNING')
+    result = subprocess.run([sys.executable, '-c', SCRIPT], cwd=ROOT, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    entries = [json.loads(line) for line in result.stderr.splitlines()]
+    messages = {entry['message']: entry for entry in entries}
+    assert 'hidden' not in messages
+    assert messages['shown']['route'] == '/api/x'
+    # fork 出的子进程重新启动了写出线程
+    assert messages['from child']['pid'] != messages['done']['pid']
+
+
+def test_logging_status_in_ready_report(client, monkeypatch):
+    monkeypatch.setenv('METRICS_TOKEN', 'token-123')
+    workers = client.get('/api/health/ready', headers={'Authorization': 'Bearer token-123'}).get_json()['data']['workers']
+    status = workers['logging']
+    assert status['configured'] and status['running']
+    assert status['capacity'] == 10000
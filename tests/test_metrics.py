@@ -0,0 +1,89 @@
+"""请求指标：Prometheus 文本输出、多进程汇总和 /api/metrics"""
+import json
+import os
+import subprocess
+import sys
+
+from metrics import MetricsRegistry
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    counter = registry.counter('requests_total', '请求数', ('route', 'status'))
+    histogram = registry.histogram('latency_seconds', '耗时', ('route',), buckets=(0.1, 1.0))
+    gauge = registry.gauge('in_flight', '进行中')
+    counter.inc(('/api/"x"', 200))
+    counter.inc(('/api/"x"', 200), 2)
+    histogram.observe(('/a',), 0.05)
+    histogram.observe(('/a',), 0.5)
+    histogram.observe(('/a',), 5.0)
+    gauge.inc(())
+    gauge.dec(())
+
+    assert registry.render().splitlines() == [
+        '# HELP in_flight 进行中',
+        '# TYPE in_flight gauge',
+        'in_flight 0',
+        '# HELP latency_seconds 耗时',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1.0"} 2',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'latency_seconds_sum{route="/a"} 5.55',
+        'latency_seconds_count{route="/a"} 3',
+        '# HELP requests_total 请求数',
+        '# TYPE requests_total counter',
+        'requests_total{route="/api/\\"x\\"",status="200"} 3',
+    ]
+
+
+def test_multiprocess_merge(tmp_path):
+    registry = MetricsRegistry(directory=str(tmp_path))
+    counter = registry.counter('requests_total', '请求数', ('route',))
+    gauge = registry.gauge('in_flight', '进行中', ('route',))
+    histogram = registry.histogram('latency_seconds', '耗时', ('route',), buckets=(1.0,))
+    counter.inc(('/a',))
+    gauge.inc(('/a',))
+    histogram.observe(('/a',), 0.5)
+    registry.flush()
+
+    # 已退出的 worker 留下的指标文件：计数器、直方图继续累加，进行中请求数不再计入
+    state = json.loads((tmp_path / f'metrics-{os.getpid()}.json').read_text(encoding='utf-8'))
+    state['pid'] = dead_pid()
+    (tmp_path / f"metrics-{state['pid']}.json").write_text(json.dumps(state), encoding='utf-8')
+
+    merged = registry.collect()
+    assert merged['requests_total']['values'] == {'/a': 2}
+    assert merged['in_flight']['values'] == {'/a': 1}
+    assert merged['latency_seconds']['values'] == {'/a': [2, 0, 1.0]}
+
+
+def metric_value(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return 0.0
+
+
+def test_metrics_endpoint(client, monkeypatch):
+    name = 'http_requests_total{method="GET",route="/api/health/live",status="200"}'
+    before = metric_value(client.get('/api/metrics').get_data(as_text=True), name)
+    client.get('/api/health/live')
+    client.get('/api/health/live')
+    client.get('/api/no-such-route')
+    response = client.get('/api/metrics')
+    assert response.content_type.startswith('text/plain')
+    text = response.get_data(as_text=True)
+    assert metric_value(text, name) == before + 2
+    assert metric_value(text, 'http_requests_total{method="GET",route="unmatched",status="404"}') >= 1
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/health/live",le="0.005"}' in text
+
+    monkeypatch.setenv('METRICS_TOKEN', 'token-123')
+    assert client.get('/api/metrics').status_code == 401
+    assert client.get('/api/metrics', headers={'Authorization': 'Bearer token-123'}).status_code == 200
@@ -0,0 +1,94 @@
+"""结构迁移：幂等、并发执行和索引服务的查询"""
+import threading
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+import migrations
+from migrations import MIGRATIONS, applied_versions, index_report, latest_version, run_migrations
+
+INDEX_NAMES = {op.name for m in MIGRATIONS for op in m.operations if isinstance(op, migrations.AddIndex)}
+
+
+@pytest.fixture
+def engine(app_module, tmp_path):
+    """只有数据表、没有迁移记录的 SQLite 文件数据库"""
+    engine = create_engine(f'sqlite:///{tmp_path}/migrate.db', connect_args={'timeout': 30})
+    app_module.db.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def index_names(engine):
+    inspector = inspect(engine)
+    return {index['name'] for table in ('student_id', 'user') for index in inspector.get_indexes(table)}
+
+
+def test_run_migrations_is_idempotent(engine):
+    assert applied_versions(engine) == set()
+    assert run_migrations(engine) == [latest_version()]
+    assert INDEX_NAMES <= index_names(engine)
+
+    assert run_migrations(engine) == []
+    assert applied_versions(engine) == {latest_version()}
+
+
+def test_existing_index_is_skipped(engine):
+    with engine.begin() as conn:
+        conn.execute(text('CREATE INDEX ix_student_id_is_used ON student_id (is_used)'))
+    assert run_migrations(engine) == [latest_version()]
+    assert INDEX_NAMES <= index_names(engine)
+
+
+def test_applied_versions_does_not_create_table(engine):
+    applied_versions(engine)
+    assert not inspect(engine).has_table(migrations.MIGRATIONS_TABLE)
+
+
+def test_migration_applied_by_another_process(engine, monkeypatch):
+    """读取迁移记录之后另一个进程完成了迁移：插入迁移记录冲突，按已执行跳过"""
+    run_migrations(engine)
+    reads = []
+    real_applied_versions = migrations.applied_versions
+
+    def stale_applied_versions(engine):
+        reads.append(1)
+        return set() if len(reads) == 1 else real_applied_versions(engine)
+
+    monkeypatch.setattr(migrations, 'applied_versions', stale_applied_versions)
+    assert run_migrations(engine) == []
+    assert len(reads) == 2
+
+
+def test_concurrent_runs(engine):
+    results, errors = [], []
+    barrier = threading.Barrier(4)
+
+    def worker():
+        try:
+            barrier.wait()
+            results.append(run_migrations(engine))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    # 每个迁移只被一个进程计入
+    assert sorted(v for executed in results for v in executed) == [latest_version()]
+    assert INDEX_NAMES <= index_names(engine)
+
+
+def test_index_report_plans_use_indexes(engine):
+    run_migrations(engine)
+    report = {item['index']: item for item in index_report(engine)}
+    assert set(report) == INDEX_NAMES
+    for name, item in report.items():
+        assert item['exists']
+        for query in item['queries']:
+            # 每个示例查询的执行计划都用到了对应的索引
+            assert any(name in line for line in query['plan']), (name, query['plan'])
@@ -0,0 +1,99 @@
+"""按请求剖析：令牌校验、折叠调用栈、后台写入和 X-Profile-Id"""
+import cProfile
+import pstats
+import threading
+import time
+
+from flask import Flask
+
+import profiling
+from profiling import RequestProfiler, collapsed_stacks, install_profiler, sign_profile_token, verify_profile_token
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def busy():
+    return sum(i * i for i in range(20000))
+
+
+def make_profile():
+    profile = cProfile.Profile()
+    profile.enable()
+    busy()
+    profile.disable()
+    return profile
+
+
+def test_profile_token_path_prefix():
+    token = sign_profile_token('secret', '/api/admin')
+    assert verify_profile_token('secret', token, '/api/admin/list_students', 60)
+    assert not verify_profile_token('secret', token, '/api/login', 60)
+    assert not verify_profile_token('other', token, '/api/admin/list_students', 60)
+    assert verify_profile_token('secret', sign_profile_token('secret'), '/api/login', 60)
+
+
+def test_collapsed_stacks():
+    lines = collapsed_stacks(pstats.Stats(make_profile()))
+    assert lines
+    for line in lines:
+        stack, weight = line.rsplit(' ', 1)
+        assert int(weight) > 0
+    assert any('busy (test_profiling.py' in line for line in lines)
+
+
+def test_submit_saves_in_background(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), max_files=2)
+    for i in range(3):
+        profiler.submit(make_profile(), f'p{i}', 0.01)
+        assert wait_for(lambda: (tmp_path / f'p{i}.collapsed').exists())
+        time.sleep(0.02)  # 保证修改时间不同，按时间轮换
+    assert wait_for(lambda: not (tmp_path / 'p0.prof').exists())
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['p1.collapsed', 'p1.prof', 'p2.collapsed', 'p2.prof']
+    assert pstats.Stats(str(tmp_path / 'p2.prof')).total_calls > 0
+
+
+def test_submit_drops_when_queue_full(tmp_path, monkeypatch):
+    profiler = RequestProfiler(str(tmp_path), queue_size=1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_save(profile, name):
+        started.set()
+        release.wait(5)
+
+    monkeypatch.setattr(profiler, 'save', slow_save)
+    profile = make_profile()
+    profiler.submit(profile, 'a', 0.01)
+    assert started.wait(5)  # 写入线程正在处理 a
+    profiler.submit(profile, 'b', 0.01)  # 排队
+    profiler.submit(profile, 'c', 0.01)  # 丢弃
+    release.set()
+    assert profiler.dropped == 1
+
+
+def test_install_profiler_sets_profile_id(tmp_path):
+    app = Flask(__name__)
+
+    @app.route('/api/items/<int:item_id>')
+    def item(item_id):
+        return {'id': item_id, 'value': busy()}
+
+    assert install_profiler(app, RequestProfiler(str(tmp_path))).enabled is False
+    assert 'X-Profile-Id' not in app.test_client().get('/api/items/1').headers
+
+    app = Flask(__name__)
+    app.add_url_rule('/api/items/<int:item_id>', view_func=item)
+    install_profiler(app, RequestProfiler(str(tmp_path), secret='secret'))
+    client = app.test_client()
+    assert 'X-Profile-Id' not in client.get('/api/items/1').headers
+    response = client.get('/api/items/1', headers={profiling.PROFILE_HEADER: sign_profile_token('secret', '/api/items')})
+    name = response.headers['X-Profile-Id']
+    assert name.endswith('-GET-api_items_int_item_id')
+    assert wait_for(lambda: (tmp_path / f'{name}.collapsed').exists())
+    assert 'item (test_profiling.py' in (tmp_path / f'{name}.collapsed').read_text(encoding='utf-8')
@@ -0,0 +1,121 @@
+"""内存检索索引"""
+import pytest
+
+from search_index import PinyinIndex, PrefixIndex
+
+from conftest import make_students
+
+
+def student(student_id, name, **fields):
+    return dict({'student_id': student_id, 'name': name}, **fields)
+
+
+def test_prefix_search_by_student_id_and_name():
+    index = PrefixIndex()
+    index.build([student('20240101', 'Alice'), student('20240102', 'Bob'), student('20250101', 'alan')])
+
+    assert [r['student_id'] for r in index.search('2024')] == ['20240101', '20240102']
+    assert [r['name'] for r in index.search('AL')] == ['alan', 'Alice']
+    assert index.search('2026') == []
+    assert index.search('  ') == []
+
+
+def test_prefix_search_limit_and_deduplication():
+    index = PrefixIndex()
+    # 学号和姓名都以 2024 开头的记录只返回一次
+    index.build([student('2024%02d' % i, '2024同学%d' % i) for i in range(10)])
+
+    results = index.search('2024', limit=4)
+    assert len(results) == 4
+    assert len({r['student_id'] for r in results}) == 4
+    assert index.search('2024', limit=0) == []
+
+
+def test_prefix_incremental_add_and_remove():
+    index = PrefixIndex()
+    index.build([student('20240101', 'Alice')])
+    index.add_many([student('2024%04d' % i, 'n%d' % i) for i in range(200, 300)])  # 大批量：合并后整体排序
+    index.add(student('20240102', 'Bob', department='数学学院'))
+
+    assert len(index) == 102
+    assert index.search('bob')[0]['department'] == '数学学院'
+
+    # 更新同一学号时替换旧的检索键
+    index.add(student('20240102', 'Bobby'))
+    assert [r['name'] for r in index.search('bob')] == ['Bobby']
+
+    index.remove('20240102')
+    index.remove('missing')
+    assert index.search('bob') == []
+    assert len(index) == 101
+
+
+def test_autocomplete_endpoint_follows_imports_and_deletes(admin_post):
+    admin_post('/api/admin/import_students', students=make_students(3))
+
+    matches = admin_post('/api/admin/autocomplete_students', q='2024000000').get_json()['data']['matches']
+    assert [m['student_id'] for m in matches] == ['2024000000']
+
+    admin_post('/api/admin/delete_student', student_id='2024000000')
+    matches = admin_post('/api/admin/autocomplete_students', q='20240000').get_json()['data']['matches']
+    assert [m['student_id'] for m in matches] == ['2024000001', '2024000002']
+
+    assert admin_post('/api/admin/autocomplete_students', q='2024', mode='regex').status_code == 400
+
+
+@pytest.fixture
+def names():
+    pytest.importorskip('pypinyin')
+    index = PinyinIndex()
+    index.build([('s1', '张建豪', {'id': 1}), ('s2', '张三', None), ('s3', '李建', None), ('s4', 'Zoe', None)])
+    return index
+
+
+@pytest.mark.parametrize('query, score', [
+    ('zhangjianhao', 80),  # 全拼
+    ('zjh', 75),           # 首字母
+    ('zhangjh', 70),       # 全拼与首字母混合
+    ('zhjh', 75),
+    ('jianhao', 50),       # 只输入名
+])
+def test_pinyin_match_kinds(names, query, score):
+    assert names.search(query) == [(score, 's1', {'id': 1})]
+
+
+def test_pinyin_ranking(names):
+    # 得分相同时较短的名称在前
+    assert [key for _, key, _ in names.search('zhang')] == ['s2', 's1']
+    assert [key for _, key, _ in names.search('张')] == ['s2', 's1']
+    assert names.search('Zo')[0] == (85, 's4', None)
+    assert [key for _, key, _ in names.search('zhang', limit=1)] == ['s2']
+    assert names.search(' ') == []
+
+
+def test_pinyin_heteronyms_and_updates(names):
+    names.add('s5', '曾小明')
+    assert names.search('zxm')[0][1] == 's5'
+    assert names.search('cxm')[0][1] == 's5'
+
+    names.remove('s5')
+    assert names.search('zxm') == []
+    assert len(names) == 4
+
+
+def test_pinyin_build_is_lazy():
+    index = PinyinIndex()
+    index.build([('s1', '王五', None)])
+    index.add('s2', '赵六')
+    index.remove('s1')
+    # 第一次检索前只暂存数据
+    assert index._pending is not None and len(index) == 1
+    assert [key for _, key, _ in index.search('wangwu')] == []
+    assert index._pending is None
+
+
+def test_pinyin_autocomplete_endpoint(admin_post):
+    pytest.importorskip('pypinyin')
+    admin_post('/api/admin/import_students', students=[
+        {'student_id': '20240001', 'name': '张建豪'}, {'student_id': '20240002', 'name': '李四'}])
+
+    data = admin_post('/api/admin/autocomplete_students', q='zjh', mode='pinyin').get_json()['data']
+    assert [(m['student_id'], m['score']) for m in data['matches']] == [('20240001', 75)]
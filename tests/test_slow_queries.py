@@ -0,0 +1,82 @@
+"""慢查询记录：按语句结构汇总、执行计划和全表扫描标记、/api/admin/slow_queries"""
+import sqlite3
+
+import pytest
+
+from sql_monitor import SlowQueryLog, explain, parameters_shape, slow_query_log
+
+
+def test_parameters_shape_hides_values():
+    assert parameters_shape(('a', 'b', 'c', 1, None)) == '(str × 3, int, NoneType)'
+    assert parameters_shape({'id': 1, 'name': '张三'}) == '{id: int, name: str}'
+    assert parameters_shape([('a', 1), ('b', 2)], executemany=True) == '2 × (str, int)'
+    assert parameters_shape([], executemany=True) == '0 × ()'
+
+
+def test_record_and_summary():
+    log = SlowQueryLog(threshold_ms=50, recent_size=2)
+    assert log.record('SELECT a', '()', 120.0, '/api/a') is True
+    assert log.record('SELECT a', '()', 80.0, '/api/b') is False
+    assert log.record('SELECT b', '(str)', 300.0, '/api/a') is True
+    log.set_plan('SELECT a', ['SCAN t'])
+    log.set_plan('SELECT b', ['SEARCH t USING INDEX ix_t_b (b=?)'])
+    log.set_plan('SELECT missing', ['SCAN t'])
+
+    summary = log.summary()
+    assert (summary['threshold_ms'], summary['shape_count']) == (50, 2)
+    first, second = summary['shapes']
+    assert first['statement'] == 'SELECT b' and first['full_scan'] is False
+    assert (second['count'], second['total_ms'], second['max_ms'], second['avg_ms']) == (2, 200.0, 120.0, 100.0)
+    assert second['routes'] == {'/api/a': 1, '/api/b': 1}
+    assert second['full_scan'] is True
+    assert [item['duration_ms'] for item in summary['recent']] == [300.0, 80.0]  # 最近的在前，只保留 2 条
+    assert len(log.summary(limit=1)['shapes']) == 1
+
+    log.reset()
+    assert log.summary()['shape_count'] == 0 and log.summary()['recent'] == []
+    assert SlowQueryLog(threshold_ms=-1).enabled is False
+
+
+def test_explain_sqlite():
+    connection = sqlite3.connect(':memory:')
+    connection.execute('CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT, grade TEXT)')
+    connection.execute('CREATE INDEX ix_t_name ON t (name)')
+    plan = explain(connection, 'sqlite', 'SELECT * FROM t WHERE grade = ?', ('x',))
+    assert plan[0].startswith('SCAN t')
+    plan = explain(connection, 'sqlite', 'SELECT * FROM t WHERE name = ?', ('x',))
+    assert 'USING INDEX ix_t_name' in plan[0]
+    assert explain(connection, 'oracle', 'SELECT 1', ()) is None
+
+
+@pytest.fixture
+def slow_log(monkeypatch):
+    """把所有语句都当作慢查询记录"""
+    slow_query_log.reset()
+    monkeypatch.setattr(slow_query_log, 'threshold_ms', 0)
+    yield slow_query_log
+    slow_query_log.reset()
+
+
+def test_slow_queries_endpoint(admin_post, slow_log):
+    admin_post('/api/admin/list_users', limit=10)
+    data = admin_post('/api/admin/slow_queries', reset=True).get_json()['data']
+    assert data['threshold_ms'] == 0
+    shapes = {item['statement']: item for item in data['shapes']}
+    page = next(item for statement, item in shapes.items() if 'FROM user WHERE user.id > ?' in statement)
+    assert page['routes'] == {'/api/admin/list_users': 1}
+    assert page['full_scan'] is False  # 按主键分页
+    count = next(item for statement, item in shapes.items() if statement.startswith('SELECT count(user.id)'))
+    assert count['full_scan'] is True
+    assert all('admin123' not in item['params_shape'] for item in data['recent'])
+
+    slow_log.threshold_ms = -1
+    assert admin_post('/api/admin/slow_queries').get_json()['data']['shape_count'] == 0
+
+
+@pytest.mark.parametrize('data, status', [
+    ({'admin_username': 'admin', 'admin_password': 'wrong'}, 401),
+    ({'admin_username': 'admin', 'admin_password': 'admin123', 'limit': 'many'}, 400),
+    ({'admin_username': 'admin'}, 400),
+])
+def test_slow_queries_endpoint_errors(client, data, status):
+    assert client.post('/api/admin/slow_queries', json=data).status_code == status
@@ -0,0 +1,138 @@
+"""内存数据库快照：备份/恢复、只包含已提交的数据、分步复制期间的并发写入"""
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from db_engine import install_write_lock
+from snapshot import SnapshotManager
+
+
+@pytest.fixture
+def memory_db():
+    """与 app 相同的内存数据库配置：StaticPool 下所有会话共用一个 sqlite3 连接，并注册写事务锁"""
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    lock = install_write_lock(engine)
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE item (id INTEGER PRIMARY KEY, payload TEXT NOT NULL)'))
+        conn.execute(text('INSERT INTO item (payload) VALUES (:payload)'),
+                     [{'payload': f'{i:08d}' * 25} for i in range(2000)])
+    pooled = engine.raw_connection()
+    connection = pooled.dbapi_connection
+    pooled.close()
+    yield engine, connection, lock
+    engine.dispose()
+
+
+def make_manager(tmp_path, memory_db, **options):
+    engine, connection, lock = memory_db
+    manager = SnapshotManager(str(tmp_path / 'snapshots'), interval=3600, **options)
+    manager.connection = connection
+    manager.write_lock = lock
+    return manager
+
+
+def count_rows(path, where=''):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute('SELECT count(*) FROM item ' + where).fetchone()[0]
+    finally:
+        connection.close()
+
+
+def test_snapshot_and_restore(tmp_path, memory_db):
+    manager = make_manager(tmp_path, memory_db, keep=2)
+    paths = [manager.snapshot(force=True) for _ in range(3)]
+    assert all(os.path.exists(path) for path in paths[1:])
+    assert not os.path.exists(paths[0])  # 只保留最近 keep 份
+    assert manager.latest_snapshot() == paths[-1]
+    assert count_rows(paths[-1]) == 2000
+
+    restored = sqlite3.connect(':memory:')
+    assert manager.restore_latest(restored) == paths[-1]
+    assert restored.execute('SELECT count(*) FROM item').fetchone()[0] == 2000
+    assert manager.status()['snapshot_count'] == 3
+
+
+def test_unchanged_version_is_skipped(tmp_path, memory_db):
+    manager = make_manager(tmp_path, memory_db)
+    version = [1]
+    manager.version_getter = lambda: version[0]
+    assert manager.snapshot() is not None
+    assert manager.snapshot() is None
+    assert manager.snapshot(force=True) is not None
+    version[0] = 2
+    assert manager.snapshot() is not None
+
+
+def test_snapshot_excludes_uncommitted_rows(tmp_path, memory_db):
+    engine = memory_db[0]
+    manager = make_manager(tmp_path, memory_db)
+    started = threading.Event()
+
+    def open_transaction():
+        with engine.connect() as conn:
+            transaction = conn.begin()
+            conn.execute(text("INSERT INTO item (payload) VALUES ('uncommitted')"))
+            started.set()
+            time.sleep(0.3)
+            transaction.rollback()
+
+    thread = threading.Thread(target=open_transaction)
+    thread.start()
+    started.wait()
+    path = manager.snapshot(force=True)
+    thread.join()
+
+    assert count_rows(path, "WHERE payload = 'uncommitted'") == 0
+    assert count_rows(path) == 2000
+
+
+def test_snapshot_times_out_while_transaction_open(tmp_path, memory_db):
+    engine = memory_db[0]
+    manager = make_manager(tmp_path, memory_db, lock_timeout=0.1)
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        conn.execute(text("INSERT INTO item (payload) VALUES ('pending')"))
+        with pytest.raises(TimeoutError):
+            manager.snapshot(force=True)
+        transaction.rollback()
+    assert manager.snapshot(force=True) is not None
+
+
+def test_paged_snapshot_with_concurrent_writes(tmp_path, memory_db):
+    """分步复制之间写操作可以提交；SQLite 从头重新备份，达到 max_restarts 次后持有锁完成复制"""
+    engine = memory_db[0]
+    manager = make_manager(tmp_path, memory_db, pages=1, step_sleep=0.001, max_restarts=3)
+    stop = threading.Event()
+    committed = []
+
+    def writer():
+        while not stop.is_set():
+            with engine.begin() as conn:
+                conn.execute(text("INSERT INTO item (payload) VALUES ('written')"))
+            committed.append(1)
+            time.sleep(0.002)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        time.sleep(0.02)
+        path = manager.snapshot(force=True)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert committed
+    assert manager.last_restarts <= 3
+    assert manager.last_max_pause_ms is not None
+    connection = sqlite3.connect(path)
+    try:
+        assert connection.execute('PRAGMA integrity_check').fetchone()[0] == 'ok'
+    finally:
+        connection.close()
+    assert 2000 <= count_rows(path) <= 2000 + len(committed)
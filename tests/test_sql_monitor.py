@@ -0,0 +1,103 @@
+"""每请求 SQL 统计：语句结构、计时、调试响应头，以及导入学号时的分段存在性查询"""
+import math
+import time
+import types
+
+from sqlalchemy import event
+
+import sql_monitor
+from sql_monitor import RequestSQLStats, statement_shape
+
+from conftest import make_students
+
+
+def test_statement_shape_folds_in_lists():
+    assert statement_shape('SELECT *\n  FROM t WHERE id IN (?, ?, ?)') == 'SELECT * FROM t WHERE id IN (?...)'
+    assert statement_shape('SELECT * FROM t WHERE id IN (?)') == 'SELECT * FROM t WHERE id IN (?)'
+    assert statement_shape('DELETE FROM t WHERE a IN (:a_1, :a_2)') == 'DELETE FROM t WHERE a IN (?...)'
+
+
+def test_repeated_shapes():
+    stats = RequestSQLStats('/api/x')
+    for i in range(12):
+        stats.record(f'SELECT * FROM t WHERE id IN ({", ".join("?" * (i + 2))})', 0.001)
+    stats.record('SELECT 1', 0.001)
+    assert stats.count == 13
+    assert stats.repeated_shapes(threshold=10) == [(12, 'SELECT * FROM t WHERE id IN (?...)')]
+    assert stats.repeated_shapes(threshold=12) == []
+
+
+class RecordingStats:
+    route = 'test'
+
+    def __init__(self):
+        self.recorded = []
+
+    def record(self, statement, seconds):
+        self.recorded.append((statement, seconds))
+
+
+def test_interleaved_statements_keep_their_own_start_time(monkeypatch):
+    """StaticPool 下多个线程共用一个连接：后开始的语句不能覆盖先开始的语句的开始时间"""
+    monkeypatch.setattr(sql_monitor.slow_query_log, 'threshold_ms', -1)
+    stats = RecordingStats()
+    token = sql_monitor._current_stats.set(stats)
+    try:
+        conn = types.SimpleNamespace(info={})
+        first, second = types.SimpleNamespace(), types.SimpleNamespace()
+        sql_monitor._before_cursor_execute(conn, None, 'A', (), first, False)
+        time.sleep(0.05)
+        sql_monitor._before_cursor_execute(conn, None, 'B', (), second, False)
+        sql_monitor._after_cursor_execute(conn, None, 'A', (), first, False)
+        sql_monitor._after_cursor_execute(conn, None, 'B', (), second, False)
+
+        # 没有执行上下文的语句使用线程本地的栈
+        sql_monitor._before_cursor_execute(conn, None, 'C', (), None, False)
+        sql_monitor._after_cursor_execute(conn, None, 'C', (), None, False)
+    finally:
+        sql_monitor._current_stats.reset(token)
+
+    elapsed = dict(stats.recorded)
+    assert elapsed['A'] >= 0.05
+    assert elapsed['B'] < 0.05
+    assert 'C' in elapsed and not sql_monitor._local.started
+
+
+def test_failed_statement_without_context_is_discarded():
+    conn = types.SimpleNamespace(info={})
+    sql_monitor._before_cursor_execute(conn, None, 'D', (), None, False)
+    sql_monitor._handle_error(types.SimpleNamespace(execution_context=None))
+    assert not sql_monitor._local.started
+
+
+def test_debug_headers(app_module, admin_post, monkeypatch):
+    assert 'X-DB-Query-Count' not in admin_post('/api/admin/list_students').headers
+    monkeypatch.setattr(app_module.app, 'debug', True)
+    response = admin_post('/api/admin/list_students')
+    assert int(response.headers['X-DB-Query-Count']) >= 2
+    assert float(response.headers['X-DB-Time-Ms']) >= 0
+
+
+def test_import_checks_existing_ids_in_chunks(app_module, admin_post, monkeypatch):
+    admin_post('/api/admin/import_students', students=make_students(2))
+    monkeypatch.setattr(app_module, 'IN_CHUNK_SIZE', 3)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement.split()[0].upper(), 'student_id IN' in statement, executemany))
+
+    with app_module.app.app_context():
+        engine = app_module.db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        # 8 条记录：2 个已存在，1 个在本批中重复，1 条缺少姓名，1 条不是对象
+        students = make_students(6) + [make_students(1, start=5)[0], {'student_id': '2024000099'}, 'bad']
+        data = admin_post('/api/admin/import_students', students=students).get_json()['data']
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert (data['imported_count'], data['duplicate_count'], data['error_count']) == (4, 3, 1)
+    lookups = [s for s in statements if s[0] == 'SELECT' and s[1]]
+    assert len(lookups) == math.ceil(7 / 3)  # 7 个不同的学号，每段 3 个
+    inserts = [s for s in statements if s[0] == 'INSERT']
+    assert inserts == [('INSERT', False, True)]  # 一条 executemany 插入全部新记录
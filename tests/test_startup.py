@@ -0,0 +1,49 @@
+"""冷启动：导入时不访问数据库，第一个 API 请求时初始化；预先计算的管理员密码哈希"""
+import os
+import sqlite3
+import subprocess
+import sys
+
+from werkzeug.security import check_password_hash
+
+from conftest import ROOT
+
+COLD_START = '''
+import app
+assert not app._db_initialized
+client = app.app.test_client()
+assert client.get('/api/health/live').status_code == 200
+assert not app._db_initialized
+assert client.get('/api/health').status_code == 200
+assert app._db_initialized
+print(sorted(app.startup_timings))
+'''
+
+
+def run_python(code, **env):
+    env = dict(os.environ, **env)
+    for name in ('DATABASE_URL', 'SNAPSHOT_DIR', 'TRAFFIC_RECORD_DIR'):
+        env.pop(name, None)
+    return subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True,
+                          timeout=60)
+
+
+def test_database_initialized_on_first_api_request():
+    result = run_python(COLD_START, DB_MODE='memory')
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == str(sorted(
+        ['import_ms', 'restore_ms', 'ddl_ms', 'seed_ms', 'index_ms', 'init_total_ms']))
+
+
+def test_precomputed_admin_hash_matches_default_password(app_module):
+    assert check_password_hash(app_module.ADMIN_PASSWORD_HASH, 'admin123')
+
+
+def test_migrations_status_is_read_only(tmp_path):
+    path = tmp_path / 'users.db'
+    result = run_python('import sys, migrations; sys.exit(migrations.main(["migrations.py", "status"]))',
+                        DB_MODE='file', DB_PATH=str(path))
+    assert result.returncode == 0, result.stderr
+    assert '待执行' in result.stdout
+    tables = sqlite3.connect(path).execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+    assert tables == []
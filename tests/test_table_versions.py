@@ -0,0 +1,117 @@
+"""数据表版本号：进程内、跨进程共享和存放在数据库中的三种实现"""
+import os
+
+import pytest
+from sqlalchemy import create_engine, event
+
+import table_versions
+from table_versions import DatabaseTableVersions, LocalTableVersions, SharedTableVersions, create_table_versions
+
+TABLES = ['student_id', 'user']
+
+
+def test_local_versions():
+    versions = LocalTableVersions(TABLES)
+    assert versions.get('student_id') == 0
+    assert versions.bump(['student_id', 'user']) == {'student_id': 1, 'user': 1}
+    assert versions.bump(['user']) == {'user': 2}
+    assert versions.get('user') == 2
+    assert versions.transactional is False
+
+
+@pytest.mark.skipif(table_versions.fcntl is None, reason='需要 fcntl')
+def test_shared_versions_across_processes(tmp_path):
+    path = str(tmp_path / 'users.db.versions')
+    versions = SharedTableVersions(path, TABLES)
+    versions.bump(['student_id'])
+
+    pid = os.fork()
+    if pid == 0:
+        # 子进程：重新打开版本号文件后递增
+        try:
+            versions.bump(['student_id', 'user'])
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+
+    assert versions.get('student_id') == 2
+    assert versions.get('user') == 1
+    # 同一个文件的其他实例看到同样的数值和实例标识
+    other = SharedTableVersions(path, TABLES)
+    assert other.get('student_id') == 2
+    assert other.token == versions.token
+
+
+def test_create_table_versions_selects_store(tmp_path):
+    engine = create_engine('sqlite://')
+    if table_versions.fcntl is not None:
+        assert isinstance(create_table_versions(str(tmp_path / 'users.db'), TABLES), SharedTableVersions)
+    assert isinstance(create_table_versions(None, TABLES, engine=engine), DatabaseTableVersions)
+    assert isinstance(create_table_versions(None, TABLES), LocalTableVersions)
+
+
+@pytest.fixture
+def database_versions(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/versions.db')
+    versions = DatabaseTableVersions(engine, TABLES)
+    versions.setup()
+    yield versions
+    engine.dispose()
+
+
+def test_database_versions_setup_is_idempotent(database_versions):
+    token = database_versions.token
+    database_versions.setup()
+    assert DatabaseTableVersions(database_versions._engine, TABLES).token == token
+    assert database_versions.get_all() == {'student_id': 0, 'user': 0}
+
+
+def test_database_versions_follow_transaction(database_versions):
+    engine = database_versions._engine
+    with engine.begin() as conn:
+        assert database_versions.bump(['user', 'unknown'], conn) == {'user': 1}
+        # 同一事务中读取能看到递增后的值
+        assert database_versions.get_all(conn)['user'] == 1
+
+    conn = engine.connect()
+    transaction = conn.begin()
+    database_versions.bump(['student_id', 'user'], conn)
+    transaction.rollback()
+    conn.close()
+    assert database_versions.get_all() == {'student_id': 0, 'user': 1}
+    assert database_versions.get('user') == 1
+
+
+def test_database_versions_read_once_per_request(app_module, admin_post, monkeypatch):
+    """版本号存放在数据库中时，每个请求只查询一次全部版本号"""
+    db = app_module.db
+    with app_module.app.app_context():
+        versions = DatabaseTableVersions(db.engine, TABLES)
+        versions.setup()
+        engine = db.engine
+    monkeypatch.setattr(app_module, 'table_versions', versions)
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'table_versions' in statement:
+            statements.append(statement.split()[0].upper())
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        etag = admin_post('/api/admin/list_students').headers['ETag']
+        statements.clear()
+        assert admin_post('/api/admin/list_students', headers={'If-None-Match': etag}).status_code == 304
+        assert statements == ['SELECT']
+
+        statements.clear()
+        admin_post('/api/admin/autocomplete_students', q='0000')
+        assert statements == ['SELECT']
+
+        # 写入在同一事务中递增版本号，之后的 ETag 随之变化
+        assert admin_post('/api/admin/import_students', students=[{'student_id': '20249999', 'name': 'x'}]) \
+            .status_code == 200
+        assert 'UPDATE' in statements
+        assert admin_post('/api/admin/list_students', headers={'If-None-Match': etag}).status_code == 200
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
@@ -0,0 +1,158 @@
+"""流量录制与回放：匿名化、gzip 分段写入、截断文件的读取和 ASGI 原生接口的录制"""
+import gzip
+import time
+import types
+import zlib
+
+from flask import Flask, jsonify, request
+
+from benchmarks.replay import expand, load_recording, plan_dependencies, plan_fixtures, prepare_requests
+from traffic_recorder import Anonymizer, TrafficRecorder, _RecordWriter
+
+from conftest import make_students
+from test_asgi import post_json
+
+
+def test_anonymizer_is_stable_and_keeps_formats():
+    anonymizer = Anonymizer('secret', max_list=3)
+    body = {
+        'student_id': '2024000001', 'username': 'alice', 'phone': '13912345678', 'email': 'alice@example.com',
+        'password': 'p@ss', 'admin_password': '', 'q': 'zhang', 'department': '计算机学院',
+        'student_ids': ['2024000001', '2024000002'], 'usernames': ['alice', 'bob', 'carol', 'dave'],
+    }
+    record = anonymizer.anonymize(body)
+    assert record == anonymizer.anonymize(body)
+    assert record != Anonymizer('other', max_list=3).anonymize(body)
+    assert record['student_ids'][0] == record['student_id'] != '2024000001'
+    assert record['usernames'] == {'$repeat': 4, '$sample': record['username']}
+    assert (record['password'], record['admin_password']) == ('$password', '')
+    assert len(record['phone']) == 11 and record['phone'].startswith('13')
+    assert record['email'].endswith('@example.com') and 'alice' not in record['email']
+    assert len(record['q']) == 5
+    assert record['department'] == '计算机学院'
+
+
+def read_members(path):
+    """gzip 文件中的成员数"""
+    data = path.read_bytes()
+    members = 0
+    while data:
+        decompressor = zlib.decompressobj(31)
+        decompressor.decompress(data)
+        data = decompressor.unused_data
+        members += 1
+    return members
+
+
+def test_writer_ends_a_gzip_member_per_interval(tmp_path):
+    path = tmp_path / 'traffic-1-x.jsonl.gz'
+    writer = _RecordWriter(str(path), flush_interval=0.05)
+    for i in range(3):
+        writer.put({'ts': i, 'path': '/api/x'})
+        time.sleep(0.2)
+    # 没有关闭写入线程，已结束的成员就可以完整读出
+    assert read_members(path) == 3
+    assert [entry['ts'] for entry in load_recording([str(path)])] == [0, 1, 2]
+    writer.close()
+    assert writer.written == 3
+
+
+def test_truncated_recording_keeps_earlier_entries(tmp_path, capsys):
+    path = tmp_path / 'traffic-1-x.jsonl.gz'
+    complete = b''.join(gzip.compress(f'{{"ts": {i}}}\n'.encode()) for i in range(2))
+    partial = gzip.compress(b'{"ts": 2}\n{"ts": 3}\n')
+    path.write_bytes(complete + partial[:len(partial) // 2])
+    (tmp_path / 'traffic-2-x.jsonl.gz').write_bytes(gzip.compress(b'{"ts": 0.5}\n{"ts": 1'))
+
+    entries = load_recording([str(tmp_path)])
+    assert [entry['ts'] for entry in entries] == [0, 0.5, 1]
+    out = capsys.readouterr().out
+    assert 'traffic-1-x.jsonl.gz 不完整（EOFError），使用前 2 个请求' in out
+    assert 'traffic-2-x.jsonl.gz 不完整（JSONDecodeError），使用前 1 个请求' in out
+
+
+class ListWriter:
+    def __init__(self):
+        self.entries = []
+
+    def put(self, entry):
+        self.entries.append(entry)
+
+
+def recorder_for(application):
+    recorder = TrafficRecorder(application, 'unused', 'secret')
+    writer = ListWriter()
+    recorder._get_writer = lambda: writer
+    return recorder, writer
+
+
+def test_wsgi_middleware_records_api_requests():
+    app = Flask(__name__)
+
+    @app.route('/api/echo', methods=['POST'])
+    def echo():
+        return jsonify(request.get_json()), 201
+
+    @app.route('/')
+    def index():
+        return 'ok'
+
+    recorder, writer = recorder_for(app.wsgi_app)
+    app.wsgi_app = recorder
+    client = app.test_client()
+    response = client.post('/api/echo?page=2&sort=id', json={'username': 'alice', 'password': 'secret'})
+    assert response.get_json() == {'username': 'alice', 'password': 'secret'}  # 应用仍能读到原始请求体
+    client.get('/')
+
+    [entry] = writer.entries
+    assert (entry['method'], entry['path'], entry['status']) == ('POST', '/api/echo', 201)
+    assert entry['query'] == ['page', 'sort']
+    assert entry['body']['password'] == '$password' and entry['body']['username'] != 'alice'
+    assert entry['response_bytes'] == len(response.data)
+    assert entry['concurrency'] == 1 and recorder._in_flight == 0
+
+
+def test_asgi_login_is_recorded(client, admin_post, monkeypatch):
+    import asgi
+
+    admin_post('/api/admin/import_students', students=make_students(1))
+    recorder, writer = recorder_for(None)
+    monkeypatch.setattr(asgi, 'traffic_recorder', recorder)
+    user = {'student_id': '2024000000', 'username': 'alice', 'email': 'alice@example.com',
+            'phone': '13912345678', 'password': 'secret123'}
+    assert post_json(asgi.application, '/api/register', user)[0] == 201
+    assert post_json(asgi.application, '/api/login', {'student_id': '2024000000', 'password': 'wrong'})[0] == 401
+
+    register, login = writer.entries
+    assert (register['path'], register['status'], login['path'], login['status']) == (
+        '/api/register', 201, '/api/login', 401)
+    assert login['body'] == {'student_id': register['body']['student_id'], 'password': '$password'}
+    assert login['response_bytes'] > 0
+
+
+def test_replay_plan_from_recording():
+    anonymizer = Anonymizer('secret')
+    entries = [
+        {'ts': 10.0, 'method': 'POST', 'path': '/api/register', 'status': 201, 'query': [],
+         'body': anonymizer.anonymize({'student_id': '2024000000', 'username': 'alice', 'password': 'x'})},
+        {'ts': 10.5, 'method': 'POST', 'path': '/api/login', 'status': 401, 'query': [],
+         'body': anonymizer.anonymize({'student_id': '2024000000', 'password': 'y'})},
+        {'ts': 11.0, 'method': 'POST', 'path': '/api/admin/bulk_delete_students', 'status': 200, 'query': [],
+         'body': anonymizer.anonymize({'admin_username': 'admin', 'admin_password': 'z',
+                                       'student_ids': [f'2024{i:06d}' for i in range(25)]})},
+    ]
+    args = types.SimpleNamespace(admin_username='admin', admin_password='admin123', password='replay123')
+    requests = prepare_requests(entries, args)
+    assert [offset for offset, *_ in requests] == [0.0, 0.5, 1.0]
+    assert requests[0][3]['password'] == 'replay123'
+    assert requests[1][3]['password'] == 'replay123-wrong'  # 录制时登录失败，回放时保留失败路径
+    student_ids = requests[2][3]['student_ids']
+    assert len(student_ids) == len(set(student_ids)) == 25
+
+    assert plan_dependencies(requests) == {1: [0]}
+    students, users = plan_fixtures(requests)
+    # 注册使用的学号和批量删除的学号需要预先写入（批量删除的第一项就是注册的学号），注册创建的用户不需要
+    assert requests[0][3]['student_id'] == student_ids[0]
+    assert sorted(students) == sorted(student_ids)
+    assert users == {}
+    assert expand({'a': '$code'}, {'$code': '000000'}) == {'a': '000000'}
@@ -0,0 +1,44 @@
+"""生产环境启动器：worker 数量、主进程不导入应用、worker 预热"""
+import os
+import subprocess
+import sys
+
+import wsgi
+
+from conftest import ROOT
+
+
+def test_memory_database_runs_single_worker(monkeypatch):
+    for name in ('DATABASE_URL', 'DB_MODE'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('WORKERS', '4')
+    assert wsgi.server_options()['workers'] == 1
+
+
+def test_file_database_options(monkeypatch, tmp_path):
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    monkeypatch.setenv('DB_MODE', 'file')
+    monkeypatch.setenv('DB_PATH', str(tmp_path / 'users.db'))
+    monkeypatch.setenv('WORKERS', '4')
+    monkeypatch.setenv('THREADS', '1')
+    monkeypatch.setenv('PORT', '8000')
+    options = wsgi.server_options()
+    assert options['workers'] == 4
+    assert options['worker_class'] == 'sync'
+    assert options['bind'].endswith(':8000')
+    assert options['preload_app'] is False
+
+
+def test_master_does_not_import_app():
+    code = 'import sys, wsgi; wsgi.server_options(); print("app" in sys.modules)'
+    env = {key: value for key, value in os.environ.items() if key not in ('DATABASE_URL', 'DB_MODE')}
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True,
+                            timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == 'False'
+
+
+def test_warm_up(client, app_module):
+    wsgi.warm_up()
+    assert app_module._db_initialized
+    assert wsgi.app is app_module.app
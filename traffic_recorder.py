@@ -0,0 +1,294 @@
+"""
+请求流量录制中间件
+设置 TRAFFIC_RECORD_DIR 后启用，把 /api/* 请求记录到 TRAFFIC_RECORD_DIR/traffic-<pid>-<时间>.jsonl.gz，
+每行一个请求：到达时间、方法、路径、匿名化后的请求体、状态码、耗时、响应大小和到达时正在处理的请求数，
+用 benchmarks/replay.py 按原速度或加速回放。
+
+匿名化：
+    - 密码、管理员账号、验证码、重置令牌替换为占位符（如 "$password"），回放时再替换为测试账号
+    - 学号、用户名、邮箱、手机号、姓名、检索词替换为 HMAC 假名：同一个值总是得到同一个假名，
+      注册后再登录等请求之间的关联得以保留，但无法还原原值；假名保持原字段的格式（手机号仍为 11 位）
+    - 超过 TRAFFIC_RECORD_MAX_LIST 项的列表（如批量导入的学号）只记录长度和第一项
+多 worker 时各进程应使用相同的 TRAFFIC_RECORD_SECRET，否则同一个值在不同进程中的假名不同。
+
+写文件在后台线程中进行，队列满时丢弃记录，不阻塞请求。每个 flush 间隔结束一个 gzip 成员（多个成员依次
+追加在同一文件中，gzip 可以直接连续读出），进程被强制结束时只丢失最后一个间隔内的记录，之前的内容仍可完整读取。
+ASGI 模式（asgi.py）下原生处理的登录、注册不经过 WSGI 中间件，由 asgi.py 调用 start / finish 记录。
+"""
+import atexit
+import gzip
+import hashlib
+import hmac
+import io
+import json
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+from datetime import datetime
+
+# 替换为占位符的字段
+PLACEHOLDER_FIELDS = {
+    'password': '$password',
+    'new_password': '$password',
+    'admin_username': '$admin_username',
+    'admin_password': '$admin_password',
+    'code': '$code',
+    'reset_token': '$reset_token',
+}
+# 替换为假名的字段 -> 假名类别；同一类别的字段共用假名，如 username 与 target_username
+PSEUDONYM_FIELDS = {
+    'student_id': 'student_id',
+    'student_ids': 'student_id',
+    'username': 'username',
+    'target_username': 'username',
+    'usernames': 'username',
+    'email': 'email',
+    'phone': 'phone',
+    'name': 'name',
+    'q': 'q',
+}
+REPEAT_KEY = '$repeat'
+SAMPLE_KEY = '$sample'
+
+
+class Anonymizer:
+    def __init__(self, secret, max_list=20):
+        self._key = secret.encode('utf-8') if isinstance(secret, str) else secret
+        self.max_list = max_list
+
+    def _digest(self, kind, value):
+        return hmac.new(self._key, f'{kind}\0{value}'.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def pseudonym(self, kind, value):
+        if not isinstance(value, str) or not value:
+            return value
+        digest = self._digest(kind, value)
+        if kind == 'phone':
+            return '13' + f'{int(digest[:15], 16) % 10 ** 9:09d}'
+        if kind == 'email':
+            return f'u{digest[:10]}@example.com'
+        if kind == 'student_id':
+            return 'S' + digest[:12]
+        if kind == 'username':
+            return 'u' + digest[:10]
+        if kind == 'q':
+            # 检索词保留长度，便于回放时检索代价相近
+            return digest[:max(len(value), 1)]
+        return 'N' + digest[:8]
+
+    def anonymize(self, value, field=None):
+        """递归替换敏感字段；field 为当前值所在的字段名"""
+        if isinstance(value, dict):
+            result = {}
+            for key, item in value.items():
+                if key in PLACEHOLDER_FIELDS:
+                    result[key] = PLACEHOLDER_FIELDS[key] if item not in (None, '') else item
+                else:
+                    result[key] = self.anonymize(item, key)
+            return result
+        if isinstance(value, list):
+            items = value if len(value) <= self.max_list else value[:1]
+            items = [self.anonymize(item, field) for item in items]
+            if len(value) > self.max_list:
+                return {REPEAT_KEY: len(value), SAMPLE_KEY: items[0]}
+            return items
+        if field in PSEUDONYM_FIELDS:
+            return self.pseudonym(PSEUDONYM_FIELDS[field], value)
+        return value
+
+
+class _RecordWriter:
+    """后台线程把记录写入 gzip 压缩的 JSONL 文件，每 flush_interval 秒结束一个 gzip 成员"""
+
+    def __init__(self, path, queue_size=10000, flush_interval=1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(queue_size)
+        self._thread = threading.Thread(target=self._run, name='traffic-recorder', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, entry):
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        f = None
+        opened_at = 0
+        try:
+            while True:
+                try:
+                    entry = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    entry = None
+                if entry is _CLOSE:
+                    break
+                if entry is not None:
+                    if f is None:
+                        f = gzip.open(self.path, 'at', encoding='utf-8')
+                        opened_at = time.monotonic()
+                    f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+                    self.written += 1
+                if f is not None and time.monotonic() - opened_at >= self.flush_interval:
+                    # 关闭即写出 gzip 成员的结尾，下一条记录追加新的成员
+                    f.close()
+                    f = None
+        finally:
+            if f is not None:
+                f.close()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_CLOSE)
+            self._thread.join(timeout=5)
+
+
+_CLOSE = object()
+
+
+class TrafficRecorder:
+    """WSGI 中间件：记录匹配路径前缀的请求，请求和响应内容原样传递"""
+
+    def __init__(self, app, directory, secret, paths=('/api/',), max_body=1024 * 1024, max_list=20,
+                 sample_rate=1.0):
+        self.app = app
+        self.directory = directory
+        self.paths = tuple(paths)
+        self.max_body = max_body
+        self.sample_rate = sample_rate
+        self.anonymizer = Anonymizer(secret, max_list)
+        self._writer = None
+        self._writer_pid = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _get_writer(self):
+        # 每个进程写自己的文件；fork 出的 worker 第一次录制时创建
+        if self._writer_pid != os.getpid():
+            with self._lock:
+                if self._writer_pid != os.getpid():
+                    os.makedirs(self.directory, exist_ok=True)
+                    name = f"traffic-{os.getpid()}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.jsonl.gz"
+                    self._writer = _RecordWriter(os.path.join(self.directory, name))
+                    self._writer_pid = os.getpid()
+        return self._writer
+
+    def status(self):
+        writer = self._writer if self._writer_pid == os.getpid() else None
+        return {
+            'directory': self.directory,
+            'file': writer.path if writer else None,
+            'written': writer.written if writer else 0,
+            'dropped': writer.dropped if writer else 0,
+        }
+
+    def _read_body(self, environ):
+        """读出请求体后替换 wsgi.input，应用仍能正常读取"""
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if length <= 0 or length > self.max_body:
+            return None, length
+        body = environ['wsgi.input'].read(length)
+        environ['wsgi.input'] = io.BytesIO(body)
+        return body, length
+
+    def _body_record(self, content_type, body):
+        if body is None or 'json' not in (content_type or ''):
+            return None
+        try:
+            return self.anonymizer.anonymize(json.loads(body))
+        except ValueError:
+            return None
+
+    def should_record(self, path):
+        """路径匹配且被抽中的请求才记录"""
+        return path.startswith(self.paths) and (self.sample_rate >= 1 or random.random() < self.sample_rate)
+
+    def start(self, method, path, query_string, content_type, body, body_bytes):
+        """
+        请求到达时调用，返回记录；响应发送后把记录交给 finish
+        WSGI 请求由 __call__ 调用，ASGI 模式下原生处理的接口（asgi.py）直接调用
+        """
+        with self._lock:
+            self._in_flight += 1
+            concurrency = self._in_flight
+        if body is not None and len(body) > self.max_body:
+            body = None
+        return {
+            'ts': round(time.time(), 6),
+            'method': method,
+            'path': path,
+            'query': sorted({part.split('=', 1)[0] for part in query_string.split('&') if part}),
+            'content_type': content_type or None,
+            'body': self._body_record(content_type, body),
+            'body_bytes': body_bytes,
+            'concurrency': concurrency,
+        }
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if not self.should_record(path):
+            return self.app(environ, start_response)
+
+        started = time.perf_counter()
+        body, body_bytes = self._read_body(environ)
+        entry = self.start(environ.get('REQUEST_METHOD', 'GET'), path, environ.get('QUERY_STRING', ''),
+                           environ.get('CONTENT_TYPE'), body, body_bytes)
+        response = {}
+
+        def recording_start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            return start_response(status, headers, exc_info)
+
+        try:
+            result = self.app(environ, recording_start_response)
+        except Exception:
+            self.finish(entry, started, 500, 0)
+            raise
+        return self._iterate(result, entry, started, response)
+
+    def _iterate(self, result, entry, started, response):
+        response_bytes = 0
+        try:
+            for chunk in result:
+                response_bytes += len(chunk)
+                yield chunk
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+            self.finish(entry, started, response.get('status', 500), response_bytes)
+
+    def finish(self, entry, started, status, response_bytes):
+        """响应发送后调用；started 为请求到达时的 time.perf_counter()"""
+        with self._lock:
+            self._in_flight -= 1
+        entry['status'] = status
+        entry['duration_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        entry['response_bytes'] = response_bytes
+        self._get_writer().put(entry)
+
+
+def install_traffic_recorder(app):
+    """设置了 TRAFFIC_RECORD_DIR 时为 Flask 应用包上录制中间件，返回中间件（未启用时返回 None）"""
+    directory = os.environ.get('TRAFFIC_RECORD_DIR')
+    if not directory:
+        return None
+    secret = os.environ.get('TRAFFIC_RECORD_SECRET') or secrets.token_hex(32)
+    recorder = TrafficRecorder(
+        app.wsgi_app,
+        directory,
+        secret,
+        max_list=int(os.environ.get('TRAFFIC_RECORD_MAX_LIST', '20')),
+        sample_rate=float(os.environ.get('TRAFFIC_RECORD_SAMPLE_RATE', '1.0'))
+    )
+    app.wsgi_app = recorder
+    return recorder
@@ -1,4 +1,143 @@
-from app import app
+"""
+生产环境 WSGI 入口
+    python wsgi.py            以多进程 + 多线程方式启动（需要 gunicorn）
+    gunicorn wsgi:app         也可以直接交给 gunicorn / 其他 WSGI 服务器加载
+
+环境变量：
+    HOST / PORT           监听地址，默认 0.0.0.0:5000
+    WORKERS               worker 进程数，默认 CPU 核数 * 2 + 1
+    THREADS               每个 worker 的线程数，默认 4
+    WORKER_TIMEOUT        请求超时（秒），默认 30
+    GRACEFUL_TIMEOUT      重载/退出时等待进行中请求的时间（秒），默认 30
+    MAX_REQUESTS          每个 worker 处理多少请求后自动重启，默认 0（不重启）
+
+每个 worker 启动后先执行 warm_up()，完成数据库初始化、连接池预连接等再开始接收请求。
+主进程不导入 app.py：应用在每个 worker fork 之后才导入，数据库连接、版本号文件等都属于各自的进程。
+平滑重载：向主进程发送 SIGHUP（kill -HUP <pid>），新 worker 预热完成后替换旧 worker，
+进行中的请求在 GRACEFUL_TIMEOUT 内正常完成。
+
+注意：默认的内存数据库在每个进程中各自独立，多 worker 时请设置 DB_MODE=file 或 DATABASE_URL，
+内存模式下启动器只会运行一个 worker。
+"""
+import logging
+import os
+import time
+
+from sqlalchemy.engine import make_url
+
+from db_engine import database_uri, is_sqlite_file
+from log_config import configure_logging
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # 未安装 gunicorn 时退化为 werkzeug 的多线程服务器
+    BaseApplication = None
+
+logger = logging.getLogger(__name__)
+
+
+def __getattr__(name):
+    # gunicorn wsgi:app 等方式加载时才导入应用
+    if name == 'app':
+        from app import app
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def warm_up():
+    """
+    worker 接收请求前的预热：
+    初始化数据库和检索索引、预先建立连接池中的连接、加载拼音词典、
+    生成首页背景图片缓存、预热 JSON 编码器
+    """
+    from app import (app, db, get_background_style, init_db, pool_status,
+                     student_name_index, username_index)
+
+    started = time.perf_counter()
+    init_db()
+    with app.app_context():
+        engine = db.engine
+        pool_size = pool_status(engine).get('pool_size', 1)
+        connections = []
+        try:
+            for _ in range(pool_size):
+                connections.append(engine.connect())
+        finally:
+            for connection in connections:
+                connection.close()
+        app.json.dumps({'warm_up': True, 'items': [1, 2, 3]})
+    # 拼音检索在第一次查询时才计算拼音，提前触发
+    student_name_index.search('a', limit=1)
+    username_index.search('a', limit=1)
+    get_background_style('img1.png')
+    elapsed = (time.perf_counter() - started) * 1000
+    logger.info('worker %d 预热完成，耗时 %.1fms', os.getpid(), elapsed)
+
+
+def uses_memory_db():
+    """根据环境变量判断是否为内存数据库，不导入 app.py"""
+    url = make_url(database_uri(os.path.dirname(os.path.abspath(__file__))))
+    return url.get_backend_name() == 'sqlite' and not is_sqlite_file(url)
+
+
+def server_options():
+    workers = int(os.environ.get('WORKERS', str((os.cpu_count() or 1) * 2 + 1)))
+    is_memory_db = uses_memory_db()
+    if is_memory_db and workers > 1:
+        logger.warning('内存数据库无法在多个进程间共享，只启动 1 个 worker；'
+                       '多 worker 请设置 DB_MODE=file 或 DATABASE_URL')
+        workers = 1
+    threads = int(os.environ.get('THREADS', '4'))
+    return {
+        'bind': f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '5000')}",
+        'workers': workers,
+        'threads': threads,
+        'worker_class': 'gthread' if threads > 1 else 'sync',
+        'timeout': int(os.environ.get('WORKER_TIMEOUT', '30')),
+        'graceful_timeout': int(os.environ.get('GRACEFUL_TIMEOUT', '30')),
+        'max_requests': int(os.environ.get('MAX_REQUESTS', '0')),
+        'max_requests_jitter': int(os.environ.get('MAX_REQUESTS', '0')) // 10,
+        # 不预加载应用：每个 worker 各自导入，SIGHUP 重载时可以加载新代码
+        'preload_app': False,
+        'post_worker_init': lambda worker: warm_up(),
+    }
+
+
+if BaseApplication is not None:
+    class ProductionServer(BaseApplication):
+        """以代码方式配置 gunicorn，worker 启动后执行 warm_up()"""
+
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                if key in self.cfg.settings and value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            # 在 worker 中导入，SIGHUP 重载后新 worker 加载的是新代码
+            from app import app
+            return app
+
+
+def main():
+    configure_logging()
+    options = server_options()
+    if BaseApplication is not None:
+        logger.info('启动知识库问答系统: %s，%d 个 worker × %d 个线程',
+                    options['bind'], options['workers'], options['threads'])
+        ProductionServer(options).run()
+        return
+
+    from werkzeug.serving import run_simple
+    host, port = options['bind'].rsplit(':', 1)
+    logger.warning('未安装 gunicorn，使用单进程多线程服务器；生产环境请执行 pip install gunicorn')
+    warm_up()
+    from app import app
+    run_simple(host, int(port), app, threaded=True)
+
 
 if __name__ == "__main__":
-    app.run()
\ No newline at end of file
+    main()